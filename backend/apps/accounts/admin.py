@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
+from apps.core.response_cache import invalidate
+
 from .models import User
 
 
@@ -30,3 +32,7 @@ class UserAdmin(BaseUserAdmin):
     )
     
     readonly_fields = ('date_joined', 'last_login')
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate(*obj.invalidation_scopes())
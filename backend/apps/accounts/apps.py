@@ -4,3 +4,7 @@ class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.accounts'
     verbose_name = 'User Accounts'
+
+    def ready(self):
+        # cache invalidation receivers
+        from . import auth  # noqa: F401
@@ -0,0 +1,93 @@
+"""
+Cached JWT authentication, plugged in through django-graphql-jwt's handler
+settings (``JWT_DECODE_HANDLER`` and ``JWT_GET_USER_BY_NATURAL_KEY_HANDLER``).
+
+* Verified token payloads are kept in a per-process LRU until the token
+  expires, or for ``GRAPHENE['AUTH_TOKEN_CACHE_TIMEOUT']`` seconds if that
+  is sooner or the token has no expiry, so a client sending the same token
+  skips the signature check. Failed tokens are never cached.
+* Users are kept in Django's cache by email for
+  ``GRAPHENE['AUTH_USER_CACHE_TIMEOUT']`` seconds, and dropped whenever the
+  user is saved or deleted, so a deactivated account or a new password takes
+  effect on the next request. ``QuerySet.update()`` sends no signals: call
+  ``forget_user()`` after updating users that way.
+
+With both caches warm an authenticated request runs no SQL to find its user.
+"""
+
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from graphql_jwt.settings import jwt_settings
+from graphql_jwt.utils import get_user_by_natural_key as load_user_by_natural_key, jwt_decode
+
+from apps.core.conf import graphene_setting
+from apps.core.documents import LRUCache
+
+from .models import User
+
+token_cache = LRUCache(graphene_setting('AUTH_TOKEN_CACHE_SIZE', 1024))
+
+
+def decode_token(token, context=None):
+    """``JWT_DECODE_HANDLER``: ``jwt_decode()`` with verified payloads cached until they expire."""
+    entry = token_cache.get(token)
+    if entry is not None and entry[1] > time.time():
+        return dict(entry[0])
+    payload = jwt_decode(token, context)
+    if not jwt_settings.JWT_VERIFY:
+        return payload
+    expires = time.time() + graphene_setting('AUTH_TOKEN_CACHE_TIMEOUT', 300)
+    exp = payload.get('exp')
+    if isinstance(exp, (int, float)):
+        expires = min(expires, exp + _leeway())
+    if expires > time.time():
+        token_cache.set(token, (dict(payload), expires))
+    return payload
+
+
+def _leeway():
+    leeway = jwt_settings.JWT_LEEWAY
+    return leeway.total_seconds() if hasattr(leeway, 'total_seconds') else leeway
+
+
+def _user_key(email):
+    return 'auth:user:' + hashlib.sha256(email.encode('utf-8')).hexdigest()
+
+
+def get_user_by_natural_key(email):
+    """``JWT_GET_USER_BY_NATURAL_KEY_HANDLER``: the user with ``email``, cached."""
+    timeout = graphene_setting('AUTH_USER_CACHE_TIMEOUT', 300)
+    if not timeout:
+        return load_user_by_natural_key(email)
+    key = _user_key(email)
+    user = cache.get(key)
+    if user is None:
+        user = load_user_by_natural_key(email)
+        if user is not None:
+            cache.set(key, user, timeout=timeout)
+    return user
+
+
+def forget_user(*emails):
+    """Drop the cached users with these emails."""
+    cache.delete_many([_user_key(email) for email in emails if email])
+
+
+@receiver(pre_save, sender=User)
+def _remember_old_email(sender, instance, update_fields=None, **kwargs):
+    # a token issued for the old address must stop resolving to this user
+    if instance._state.adding or (update_fields is not None and 'email' not in update_fields):
+        return
+    instance._previous_email = (
+        User.objects.filter(pk=instance.pk).values_list('email', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _forget_saved_user(sender, instance, **kwargs):
+    forget_user(instance.email, getattr(instance, '_previous_email', None))
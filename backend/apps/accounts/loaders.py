@@ -0,0 +1,19 @@
+from apps.core.dataloader import DataLoader
+
+from .models import User
+
+
+class UserLoader(DataLoader):
+    model = 'accounts.User'
+    sources = (
+        ('projects.Project', 'owner_id'),
+        ('tasks.Task', 'assignee_id'),
+        ('tasks.ArchivedTask', 'assignee_id'),
+        ('tasks.TaskEvent', 'actor_id'),
+    )
+
+    def batch_load(self, keys):
+        return {user.id: user for user in User.objects.filter(id__in=keys)}
+
+    async def abatch_load(self, keys):
+        return {user.id: user async for user in User.objects.filter(id__in=keys)}
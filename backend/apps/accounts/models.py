@@ -3,6 +3,8 @@ from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
 from django.utils import timezone
 
+from apps.core.response_cache import user_scope
+
 from .managers import UserManager
 
 
@@ -57,10 +59,20 @@ class User(AbstractBaseUser, PermissionsMixin):
         verbose_name = 'user'
         verbose_name_plural = 'users'
         ordering = ['-date_joined']
+        indexes = [
+            # users
+            models.Index(fields=['-date_joined', '-id'], name='user_joined_idx'),
+        ]
     
     def __str__(self):
         return self.email
     
+    def cache_scope(self):
+        return user_scope(self.pk)
+    
+    def invalidation_scopes(self):
+        return ['users', user_scope(self.pk)]
+    
     def get_full_name(self):
         full_name = f"{self.first_name} {self.last_name}".strip()
         return full_name if full_name else self.email
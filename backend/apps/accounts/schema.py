@@ -2,6 +2,10 @@ import graphene
 from graphene_django import DjangoObjectType
 import graphql_jwt
 
+from apps.core.dataloader import get_loader
+from apps.core.pagination import KeysetConnectionField
+from apps.core.response_cache import depends_on, invalidate, user_scope
+from .loaders import UserLoader
 from .models import User
 
 
@@ -22,32 +26,40 @@ class UserType(DjangoObjectType):
     
     full_name = graphene.String()
     
+    column_dependencies = {'full_name': ('first_name', 'last_name', 'email')}
+    
     def resolve_full_name(self, info):
         return self.get_full_name()
 
 
+class UserConnection(graphene.relay.Connection):
+    class Meta:
+        node = UserType
+
+
 # QUERIES
 class Query(graphene.ObjectType):
     me = graphene.Field(UserType)
     
-    users = graphene.List(UserType)
+    users = KeysetConnectionField(UserConnection)
     
     user = graphene.Field(UserType, id=graphene.UUID(required=True))
     
     def resolve_me(self, info):
         user = info.context.user
         if user.is_authenticated:
+            depends_on(info.context, user_scope(user.id))
+            get_loader(info.context, UserLoader).prime_value(user.id, user)
             return user
         return None
     
     def resolve_users(self, info):
+        depends_on(info.context, 'users')
         return User.objects.all()
     
     def resolve_user(self, info, id):
-        try:
-            return User.objects.get(id=id)
-        except User.DoesNotExist:
-            return None
+        depends_on(info.context, user_scope(id))
+        return get_loader(info.context, UserLoader).load(id)
 
 # MUTATIONS
 
@@ -77,6 +89,7 @@ class CreateUserMutation(graphene.Mutation):
                 first_name=first_name,
                 last_name=last_name
             )
+            invalidate(*user.invalidation_scopes())
             
             return CreateUserMutation(
                 user=user,
@@ -1,3 +1,96 @@
-from django.test import TestCase
+import json
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from graphql_jwt.shortcuts import get_token
+
+from apps.core.testing import capture_sql
+
+from . import auth
+from .auth import decode_token, token_cache
+from .models import User
+
+
+class CreateUserMutationTests(TestCase):
+
+    def test_create_user(self):
+        with self.assertNumQueries(2):
+            result, _ = capture_sql(
+                'mutation { createUser(email: "new@example.com", password: "secret") '
+                '{ success user { email } } }'
+            )
+        self.assertTrue(result.data['createUser']['success'])
+        self.assertTrue(User.objects.filter(email='new@example.com').exists())
+
+    def test_duplicate_email(self):
+        User.objects.create_user(email='new@example.com', password='secret')
+        with self.assertNumQueries(1):
+            result, _ = capture_sql(
+                'mutation { createUser(email: "new@example.com", password: "secret") '
+                '{ success message } }'
+            )
+        self.assertFalse(result.data['createUser']['success'])
+
+
+@override_settings(GRAPHENE={
+    **settings.GRAPHENE, 'AUTH_USER_CACHE_TIMEOUT': 300, 'RESPONSE_CACHE': False,
+})
+class CachedAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = User.objects.create_user(email='me@example.com', password='secret')
+        self.token = get_token(self.user)
+
+    def me(self, token=None):
+        response = self.client.post(
+            '/graphql/', json.dumps({'query': '{ me { email } }'}),
+            content_type='application/json', HTTP_AUTHORIZATION=f'JWT {token or self.token}',
+        )
+        return response.json()
+
+    def test_warm_request_runs_no_auth_sql(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.me()['data']['me'], {'email': 'me@example.com'})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.me()['data']['me'], {'email': 'me@example.com'})
+
+    def test_deactivated_user_is_rejected(self):
+        self.me()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.me()['errors'][0]['message'], 'User is disabled')
+
+    def test_password_change_reloads_user(self):
+        self.me()
+        self.user.set_password('changed')
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.me()
+
+    def test_token_for_old_email_stops_working(self):
+        self.me()
+        self.user.email = 'renamed@example.com'
+        self.user.save()
+        self.assertIsNone(self.me()['data']['me'])
+        self.assertEqual(
+            self.me(get_token(self.user))['data']['me'], {'email': 'renamed@example.com'}
+        )
+
+    def test_verified_token_is_decoded_once(self):
+        with mock.patch.object(auth, 'jwt_decode', wraps=auth.jwt_decode) as jwt_decode:
+            payload = decode_token(self.token)
+            self.assertEqual(decode_token(self.token), payload)
+        self.assertEqual(jwt_decode.call_count, 1)
+
+    def test_cached_payload_expires_after_the_timeout(self):
+        decode_token(self.token)
+        later = time.time() + settings.GRAPHENE['AUTH_TOKEN_CACHE_TIMEOUT'] + 1
+        with mock.patch.object(auth, 'jwt_decode', wraps=auth.jwt_decode) as jwt_decode, \
+                mock.patch.object(auth.time, 'time', return_value=later):
+            decode_token(self.token)
+        self.assertEqual(jwt_decode.call_count, 1)
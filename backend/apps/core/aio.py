@@ -0,0 +1,57 @@
+"""
+Helpers that let one set of resolvers serve both GraphQL views.
+
+Under ``AsyncGraphQLView`` queries execute on the event loop, where Django
+refuses blocking ORM calls. There the helpers below return awaitables built
+on the async ORM, which graphql-core awaits; under the sync view (and in
+the worker thread that runs mutations) they return plain values.
+"""
+
+import asyncio
+import inspect
+
+
+def running_async():
+    """True when called from a coroutine running on an event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def then(value, callback):
+    """Apply ``callback`` to ``value``, awaiting it first if it is awaitable."""
+    if inspect.isawaitable(value):
+        async def chain():
+            return callback(await value)
+        return chain()
+    return callback(value)
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+def fetch(queryset):
+    """Evaluate ``queryset`` into a list (awaitable under the async view)."""
+    if running_async():
+        return _alist(queryset)
+    return list(queryset)
+
+
+def fetch_first(queryset):
+    """``queryset.first()`` (awaitable under the async view)."""
+    if running_async():
+        return queryset.afirst()
+    return queryset.first()
+
+
+def fetch_all(querysets):
+    """Evaluate each of ``querysets`` into a list (awaitable under the async view)."""
+    if running_async():
+        async def gather():
+            # one connection per thread: the queries cannot overlap anyway
+            return [await _alist(queryset) for queryset in querysets]
+        return gather()
+    return [list(queryset) for queryset in querysets]
@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.core'
+    verbose_name = 'Core'
+
+    def ready(self):
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+
+        from . import dbpool  # noqa: F401 (registers the pool metrics)
+        from .tracing import install_sql_wrapper
+
+        connection_created.connect(install_sql_wrapper)
+        for connection in connections.all(initialized_only=True):
+            install_sql_wrapper(connection)
@@ -0,0 +1,378 @@
+"""
+Latency and SQL benchmarks for every root field of ``config.schema``.
+
+Each case is one query or mutation, run through ``GraphQLView`` like a real
+request (JWT header, middleware, document cache) against whatever data is in
+the database, normally what ``manage.py seed_data`` generated. Mutations run
+inside a transaction that is rolled back, so the data is the same for every
+iteration and every run. The response cache is switched off: the numbers are
+for executing the operation, not for replaying it.
+
+``manage.py run_benchmarks`` runs the suite and compares it with the
+baseline stored per database vendor in ``benchmarks/baseline.json``.
+"""
+
+import json
+import math
+import statistics
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+from graphql_jwt.refresh_token.shortcuts import create_refresh_token
+from graphql_jwt.shortcuts import get_token
+
+from apps.accounts.models import User
+from apps.projects.models import Project
+from apps.tasks.models import Task, TaskEvent
+
+from .views import GraphQLView
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+# tasks touched by the bulk mutation cases
+BULK_SIZE = 20
+
+TASK_FIELDS = 'id title status priority createdAt project { id name } assignee { id email }'
+PROJECT_FIELDS = 'id name owner { id email } taskCount taskCountByStatus { backlog todo doing done }'
+USER_FIELDS = 'id email fullName dateJoined'
+EVENT_FIELDS = 'id taskId field oldValue newValue createdAt actor { id email }'
+
+
+def _page(fields):
+    return f'edges {{ cursor node {{ {fields} }} }} pageInfo {{ hasNextPage endCursor }}'
+
+
+class Case:
+    """
+    One benchmarked operation. ``variables`` is called with the fixtures
+    inside the rolled-back transaction, before the clock starts, so it may
+    also create rows the operation needs. A case named after something
+    other than a root field must alias the field to its name.
+    """
+
+    def __init__(self, query, variables=None, settings=None):
+        self.query = query
+        self.variables = variables or (lambda fixtures: {})
+        # GRAPHENE settings changed for this case only
+        self.settings = settings or {}
+
+
+class Fixtures:
+    """
+    Rows the cases run against: the largest project, its owner (the viewer
+    of every case) and a project of median size owned by the same user.
+    """
+
+    def __init__(self, password):
+        self.project = (
+            Project.objects.select_related('owner')
+            .annotate(total=_task_total())
+            .order_by('-total', 'id')
+            .first()
+        )
+        if self.project is None:
+            raise LookupError('There are no projects; run `manage.py seed_data` first.')
+        self.user = self.project.owner
+        self.password = password
+        owned = list(
+            Project.objects.filter(owner=self.user)
+            .annotate(total=_task_total())
+            .order_by('total', 'id')
+            .values_list('id', flat=True)
+        )
+        self.median_project_id = owned[len(owned) // 2]
+        self.task_ids = list(
+            Task.objects.filter(project=self.project)
+            .order_by('-created_at', '-id')
+            .values_list('id', flat=True)[:BULK_SIZE]
+        )
+        if not self.task_ids:
+            raise LookupError('The largest project has no tasks; run `manage.py seed_data` first.')
+        self.task_id = self.task_ids[0]
+        self.token = get_token(self.user)
+
+    def events(self, count=100):
+        """History for the fixture tasks: ``count`` status changes, spread over them."""
+        now = timezone.now()
+        statuses = Task.Status.values
+        return TaskEvent.objects.bulk_create([
+            TaskEvent(
+                task_id=self.task_ids[i % len(self.task_ids)] if i % 2 else self.task_id,
+                project_id=self.project.id,
+                actor_id=self.user.id,
+                field='status',
+                old_value=statuses[i % len(statuses)],
+                new_value=statuses[(i + 1) % len(statuses)],
+                created_at=now - timedelta(minutes=count - i),
+            )
+            for i in range(count)
+        ])
+
+    def dataset(self):
+        return {
+            'users': User.objects.count(),
+            'projects': Project.objects.count(),
+            'tasks': Task.objects.count(),
+        }
+
+
+def _task_total():
+    stats = [F(f'task_stats__{name}') for name in ('backlog', 'todo', 'doing', 'done')]
+    return Coalesce(sum(stats[1:], stats[0]), Value(0))
+
+
+def _ids(values):
+    return [str(value) for value in values]
+
+
+CASES = {
+    # queries
+    'allTasks': Case(f'query AllTasks {{ allTasks(first: 50) {{ {_page(TASK_FIELDS)} }} }}'),
+    'tasksByProject': Case(
+        f'query TasksByProject($projectId: UUID!) {{ tasksByProject(projectId: $projectId, first: 50) '
+        f'{{ {_page(TASK_FIELDS)} }} }}',
+        lambda f: {'projectId': str(f.project.id)},
+    ),
+    'tasksByStatus': Case(
+        f'query TasksByStatus {{ tasksByStatus(status: DOING, first: 50) {{ {_page(TASK_FIELDS)} }} }}'
+    ),
+    'task': Case(
+        f'query Task($id: UUID!) {{ task(id: $id) {{ {TASK_FIELDS} description updatedAt }} }}',
+        lambda f: {'id': str(f.task_id)},
+    ),
+    'myTasks': Case(f'query MyTasks {{ myTasks(first: 50) {{ {_page(TASK_FIELDS)} }} }}'),
+    'boardColumn': Case(
+        f'query BoardColumn($projectId: UUID!) {{ boardColumn(projectId: $projectId, status: TODO, '
+        f'first: 50) {{ {_page(TASK_FIELDS + " rank")} }} }}',
+        lambda f: {'projectId': str(f.project.id)},
+    ),
+    'taskHistory': Case(
+        f'query TaskHistory($taskId: UUID!) {{ taskHistory(taskId: $taskId, first: 50) '
+        f'{{ {_page(EVENT_FIELDS)} }} }}',
+        lambda f: {'taskId': str(f.events()[0].task_id)},
+    ),
+    'projectActivity': Case(
+        f'query ProjectActivity($projectId: UUID!) {{ projectActivity(projectId: $projectId, first: 50) '
+        f'{{ {_page(EVENT_FIELDS)} }} }}',
+        lambda f: {'projectId': str(f.events()[0].project_id)},
+    ),
+    'allProjects': Case(f'query AllProjects {{ allProjects(first: 50) {{ {_page(PROJECT_FIELDS)} }} }}'),
+    'myProjects': Case(f'query MyProjects {{ myProjects(first: 50) {{ {_page(PROJECT_FIELDS)} }} }}'),
+    'project': Case(
+        'query Project($id: UUID!) { project(id: $id) { id name description taskCount '
+        'tasks { id title status priority assignee { id email } } } }',
+        lambda f: {'id': str(f.median_project_id)},
+    ),
+    'projectDeletion': Case(
+        'query ProjectDeletion($id: UUID!) { projectDeletion(id: $id) '
+        '{ projectId tasksTotal tasksDeleted progress } }',
+        lambda f: {'id': str(f.median_project_id)},
+    ),
+    'me': Case(f'query Me {{ me {{ {USER_FIELDS} }} }}'),
+    'users': Case(f'query Users {{ users(first: 50) {{ {_page(USER_FIELDS)} }} }}'),
+    'user': Case(
+        f'query User($id: UUID!) {{ user(id: $id) {{ {USER_FIELDS} }} }}',
+        lambda f: {'id': str(f.user.id)},
+    ),
+    'search': Case(
+        'query Search($query: String!) { search(query: $query, first: 20) { edges { node { kind rank '
+        'snippet task { id title status } project { id name } } } pageInfo { hasNextPage endCursor } } }',
+        lambda f: {'query': 'fix login'},
+    ),
+
+    # mutations
+    'createTask': Case(
+        'mutation CreateTask($projectId: UUID!) { createTask(projectId: $projectId, '
+        'title: "Benchmark task", priority: HIGH) { success message task { id title } } }',
+        lambda f: {'projectId': str(f.project.id)},
+    ),
+    'updateTask': Case(
+        'mutation UpdateTask($id: UUID!) { updateTask(id: $id, status: DOING, title: "Renamed") '
+        '{ success message task { id status } } }',
+        lambda f: {'id': str(f.task_id)},
+    ),
+    # the same with task history off; events are buffered and inserted after
+    # the request, so the difference is what history costs the mutation itself
+    'updateTaskWithoutHistory': Case(
+        'mutation UpdateTaskWithoutHistory($id: UUID!) { updateTaskWithoutHistory: updateTask(id: $id, '
+        'status: DOING, title: "Renamed") { success message task { id status } } }',
+        lambda f: {'id': str(f.task_id)},
+        settings={'TASK_HISTORY': False},
+    ),
+    'moveTask': Case(
+        'mutation MoveTask($id: UUID!) { moveTask(id: $id, status: DOING) '
+        '{ success message task { id status rank } } }',
+        lambda f: {'id': str(f.task_id)},
+    ),
+    'deleteTask': Case(
+        'mutation DeleteTask($id: UUID!) { deleteTask(id: $id) { success message } }',
+        lambda f: {'id': str(f.task_id)},
+    ),
+    'bulkCreateTasks': Case(
+        'mutation BulkCreateTasks($tasks: [TaskInput!]!) { bulkCreateTasks(tasks: $tasks) '
+        '{ success message results { id success message } } }',
+        lambda f: {'tasks': [
+            {'projectId': str(f.project.id), 'title': f'Benchmark task {i}'} for i in range(BULK_SIZE)
+        ]},
+    ),
+    'bulkUpdateTasks': Case(
+        'mutation BulkUpdateTasks($ids: [UUID!]!) { bulkUpdateTasks(ids: $ids, status: DONE) '
+        '{ success message results { id success message } } }',
+        lambda f: {'ids': _ids(f.task_ids)},
+    ),
+    'bulkDeleteTasks': Case(
+        'mutation BulkDeleteTasks($ids: [UUID!]!) { bulkDeleteTasks(ids: $ids) '
+        '{ success message results { id success message } } }',
+        lambda f: {'ids': _ids(f.task_ids)},
+    ),
+    'createProject': Case(
+        'mutation CreateProject { createProject(name: "Benchmark project") '
+        '{ success message project { id name } } }'
+    ),
+    'updateProject': Case(
+        'mutation UpdateProject($id: UUID!) { updateProject(id: $id, name: "Renamed") '
+        '{ success message project { id name } } }',
+        lambda f: {'id': str(f.project.id)},
+    ),
+    'deleteProject': Case(
+        'mutation DeleteProject($id: UUID!) { deleteProject(id: $id) '
+        '{ success message deletion { tasksTotal } } }',
+        lambda f: {'id': str(f.median_project_id)},
+    ),
+    'createUser': Case(
+        'mutation CreateUser { createUser(email: "benchmark@example.com", password: "benchmark-pass", '
+        'firstName: "Bench") { success message user { id email } } }'
+    ),
+    'tokenAuth': Case(
+        'mutation TokenAuth($email: String!, $password: String!) '
+        '{ tokenAuth(email: $email, password: $password) { token refreshToken } }',
+        lambda f: {'email': f.user.email, 'password': f.password},
+    ),
+    'verifyToken': Case(
+        'mutation VerifyToken($token: String!) { verifyToken(token: $token) { payload } }',
+        lambda f: {'token': f.token},
+    ),
+    'refreshToken': Case(
+        'mutation RefreshToken($refreshToken: String!) { refreshToken(refreshToken: $refreshToken) '
+        '{ token refreshToken } }',
+        lambda f: {'refreshToken': create_refresh_token(f.user).get_token()},
+    ),
+}
+
+
+def missing_cases(schema, cases=CASES):
+    """Query and mutation root fields without a case; subscriptions are not benchmarked."""
+    graphql_schema = schema.graphql_schema
+    fields = [
+        name
+        for root in (graphql_schema.query_type, graphql_schema.mutation_type) if root is not None
+        for name in root.fields
+    ]
+    return [name for name in fields if name not in cases]
+
+
+def _failures(name, body):
+    if body.get('errors'):
+        return [error['message'] for error in body['errors']]
+    payload = (body.get('data') or {}).get(name)
+    if isinstance(payload, dict) and payload.get('success') is False:
+        return [payload.get('message') or 'success is false']
+    return []
+
+
+def run_case(name, case, fixtures, view, iterations, warmup):
+    """Return ``{'p50_ms', 'p95_ms', 'sql'}`` for one case."""
+    factory = RequestFactory()
+    timings, statements = [], []
+
+    def count(execute, sql, params, many, context):
+        # savepoints come from the rollback wrapper, not the operation
+        if 'SAVEPOINT' not in sql:
+            statements[-1] += 1
+        return execute(sql, params, many, context)
+
+    for iteration in range(warmup + iterations):
+        with transaction.atomic():
+            payload = json.dumps({'query': case.query, 'variables': case.variables(fixtures)})
+            request = factory.post(
+                '/graphql/', payload, content_type='application/json',
+                HTTP_AUTHORIZATION=f'JWT {fixtures.token}',
+            )
+            request.user = AnonymousUser()
+            statements.append(0)
+            with connection.execute_wrapper(count):
+                started = time.perf_counter()
+                response = view(request)
+                elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+
+        failures = _failures(name, json.loads(response.content))
+        if response.status_code != 200 or failures:
+            raise AssertionError(f'{name} failed: {"; ".join(failures) or response.status_code}')
+        if iteration >= warmup:
+            timings.append(elapsed)
+
+    timings.sort()
+    return {
+        'p50_ms': round(statistics.median(timings) * 1000, 2),
+        'p95_ms': round(timings[math.ceil(len(timings) * 0.95) - 1] * 1000, 2),
+        # the most frequent count; the first run of a case can differ
+        'sql': statistics.mode(statements[warmup:]),
+    }
+
+
+def run(fixtures, cases=CASES, iterations=20, warmup=3, names=None, progress=None):
+    """Run ``cases`` (or the ones in ``names``) and return their results by name."""
+    view = GraphQLView.as_view()
+    graphene = {**settings.GRAPHENE, 'RESPONSE_CACHE': False}
+    results = {}
+    for name, case in cases.items():
+        if names and name not in names:
+            continue
+        with override_settings(GRAPHENE={**graphene, **case.settings}):
+            results[name] = run_case(name, case, fixtures, view, iterations, warmup)
+            if progress:
+                progress(name, results[name])
+    return results
+
+
+def compare(results, baseline, tolerance=0.25, slack_ms=2.0, latency=True):
+    """
+    Return a message for every regression against ``baseline``: any extra
+    SQL statement, or a p50 more than ``tolerance`` (a fraction) and
+    ``slack_ms`` above the stored one. Cases without a baseline are skipped.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result['sql'] > expected['sql']:
+            regressions.append(f"{name}: {result['sql']} SQL statements, baseline {expected['sql']}")
+        limit = expected['p50_ms'] * (1 + tolerance) + slack_ms
+        if latency and result['p50_ms'] > limit:
+            regressions.append(
+                f"{name}: p50 {result['p50_ms']:.2f} ms, baseline {expected['p50_ms']:.2f} ms"
+            )
+    return regressions
+
+
+def load_baseline(path=DEFAULT_BASELINE):
+    path = Path(path)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_baseline(baseline, path=DEFAULT_BASELINE):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
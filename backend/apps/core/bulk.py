@@ -0,0 +1,62 @@
+"""
+Helpers for loading many rows at once, shared by ``seed_data`` and
+``import_tasks``.
+"""
+
+import csv
+import io
+from contextlib import contextmanager
+
+from django.db import connections
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create() store the given created/updated times."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def supports_copy(using='default'):
+    return connections[using].vendor == 'postgresql'
+
+
+def copy_rows(model, fields, rows, using='default'):
+    """
+    Insert ``rows`` (tuples of ``fields`` values, as Python values) with
+    PostgreSQL ``COPY ... FROM STDIN``. No signals are sent and no defaults
+    are applied, as with bulk_create().
+    """
+    connection = connections[using]
+    fields = [model._meta.get_field(name) for name in fields]
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    statement = f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN'
+    prepared = (
+        [field.get_db_prep_save(value, connection) for field, value in zip(fields, row)]
+        for row in rows
+    )
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy'):
+            # psycopg 3
+            with raw.copy(statement) as copy:
+                for row in prepared:
+                    copy.write_row(row)
+            return
+        # psycopg2: one CSV buffer per call, so callers pass a batch at a time
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in prepared:
+            writer.writerow(['\\N' if value is None else value for value in row])
+        buffer.seek(0)
+        raw.copy_expert(f"{statement} WITH (FORMAT csv, NULL '\\N')", buffer)
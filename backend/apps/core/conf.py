@@ -0,0 +1,6 @@
+from django.conf import settings
+
+
+def graphene_setting(name, default=None):
+    """Read a project-specific key from the ``GRAPHENE`` settings dict."""
+    return getattr(settings, 'GRAPHENE', {}).get(name, default)
@@ -0,0 +1,170 @@
+"""
+Static cost and depth limits for GraphQL operations.
+
+The schema is cyclic (project -> tasks -> project -> ...), so a short query
+can ask for millions of rows. ``check_limits()`` walks a validated operation
+before it executes and estimates the work it requests:
+
+* a field that returns an object or list costs 1 each time it resolves (a
+  type can override this per field in its ``field_costs``, which also lets
+  scalar fields backed by a loader carry a cost);
+* a field resolves once per object returned by the fields above it;
+  paginated fields return ``first``/``last`` objects, or
+  ``RELAY_CONNECTION_MAX_LIMIT`` when neither is given, and other lists are
+  assumed to hold ``QUERY_LIST_SIZE`` items;
+* the fields of a Relay connection (``edges``, ``pageInfo``) are free, and
+  each edge's ``node`` costs 1 like any other object, so a connection's
+  cost grows with ``first``/``last`` even when only scalars are selected;
+* introspection is not counted.
+
+Depth counts the levels a client nests objects, so the ``edges`` and
+``node`` levels of a connection do not add to it.
+
+Operations deeper than ``QUERY_MAX_DEPTH`` or costlier than
+``QUERY_MAX_COST`` are rejected before any resolver runs.
+"""
+
+from graphene.relay import Connection
+from graphene.utils.str_converters import to_snake_case
+from graphene_django.settings import graphene_settings
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    GraphQLError,
+    GraphQLInt,
+    InlineFragmentNode,
+    get_named_type,
+    get_nullable_type,
+    is_list_type,
+    value_from_ast,
+)
+
+from .conf import graphene_setting
+
+
+def is_connection_type(graphql_type):
+    graphene_type = getattr(graphql_type, 'graphene_type', None)
+    return isinstance(graphene_type, type) and issubclass(graphene_type, Connection)
+
+
+class _CostWalker:
+
+    def __init__(self, schema, document, variables):
+        self.schema = schema
+        self.variables = variables or {}
+        self.list_size = graphene_setting('QUERY_LIST_SIZE', 10)
+        self.page_size = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+        # cost scales linearly with the number of parents, so each fragment
+        # is walked once however often it is spread
+        self.fragment_costs = {}
+
+    def selections(self, parent_type, selection_set, wrapper=False):
+        """``(cost, depth)`` of ``selection_set`` resolved once on ``parent_type``."""
+        cost = depth = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_cost, field_depth = self.field(parent_type, selection, wrapper)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition:
+                    fragment_type = self.schema.get_type(selection.type_condition.name.value)
+                field_cost, field_depth = self.selections(
+                    fragment_type, selection.selection_set, wrapper
+                )
+            else:
+                field_cost, field_depth = self.fragment(selection.name.value, wrapper)
+            cost += field_cost
+            depth = max(depth, field_depth)
+        return cost, depth
+
+    def fragment(self, name, wrapper):
+        key = (name, wrapper)
+        if key not in self.fragment_costs:
+            # guards against cycles; validation rejects those anyway
+            self.fragment_costs[key] = (0, 0)
+            fragment = self.fragments[name]
+            fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+            self.fragment_costs[key] = self.selections(
+                fragment_type, fragment.selection_set, wrapper
+            )
+        return self.fragment_costs[key]
+
+    def field(self, parent_type, node, wrapper):
+        name = node.name.value
+        field = getattr(parent_type, 'fields', {}).get(name)
+        if name.startswith('__') or field is None:
+            return 0, 0
+
+        field_costs = getattr(getattr(parent_type, 'graphene_type', None), 'field_costs', {})
+        free = is_connection_type(parent_type) or not node.selection_set
+        cost = field_costs.get(to_snake_case(name), 0 if free else 1)
+        if not node.selection_set:
+            return cost, 0
+
+        field_type = get_named_type(field.type)
+        child_cost, child_depth = self.selections(
+            field_type,
+            node.selection_set,
+            wrapper=is_connection_type(field_type) or is_connection_type(parent_type),
+        )
+        # edges and node are the levels of a connection, not of the query
+        return cost + self.size(field, node, wrapper) * child_cost, child_depth + (not wrapper)
+
+    def size(self, field, node, wrapper):
+        """How many objects ``field`` returns per resolution."""
+        if 'first' in field.args or 'last' in field.args:
+            requested = [
+                value for value in (self.argument(node, 'first'), self.argument(node, 'last'))
+                if isinstance(value, int) and value >= 0
+            ]
+            return min(requested + [self.page_size])
+        if is_list_type(get_nullable_type(field.type)) and not wrapper:
+            return self.list_size
+        return 1
+
+    def argument(self, node, name):
+        for argument in node.arguments:
+            if argument.name.value == name:
+                return value_from_ast(argument.value, GraphQLInt, self.variables)
+        return None
+
+
+def analyze(schema, document, operation_ast, variables=None):
+    """Return the estimated ``(cost, depth)`` of ``operation_ast``."""
+    root_type = schema.get_root_type(operation_ast.operation)
+    walker = _CostWalker(schema, document, variables)
+    return walker.selections(root_type, operation_ast.selection_set)
+
+
+def check_limits(schema, document, operation_ast, variables=None):
+    """
+    Return ``(cost, errors)`` for a validated operation; ``errors`` is empty
+    unless the operation exceeds ``QUERY_MAX_DEPTH`` or ``QUERY_MAX_COST``.
+    """
+    cost, depth = analyze(schema, document, operation_ast, variables)
+    errors = []
+    max_depth = graphene_setting('QUERY_MAX_DEPTH')
+    if max_depth is not None and depth > max_depth:
+        errors.append(GraphQLError(
+            f'Query depth of {depth} exceeds the limit of {max_depth}',
+            operation_ast,
+            extensions={'code': 'QUERY_TOO_DEEP'},
+        ))
+    max_cost = graphene_setting('QUERY_MAX_COST')
+    if max_cost is not None and cost > max_cost:
+        errors.append(GraphQLError(
+            f'Query cost of {cost} exceeds the limit of {max_cost}',
+            operation_ast,
+            extensions={'code': 'QUERY_TOO_COSTLY'},
+        ))
+    return cost, errors
+
+
+def cost_extension(cost):
+    """The ``extensions.cost`` entry reported with every response."""
+    return {'requestedQueryCost': cost, 'maxQueryCost': graphene_setting('QUERY_MAX_COST')}
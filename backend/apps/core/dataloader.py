@@ -0,0 +1,184 @@
+"""
+Per-request batching loaders for GraphQL resolvers.
+
+The GraphQL view executes synchronously, so loaders batch by look-ahead
+instead of by event-loop tick: whenever a resolver hands model instances
+back to GraphQL it calls ``prime()``, which queues every foreign key /
+reverse relation key those instances will need. The first ``load()`` on a
+loader then fetches all queued keys in a single query, so each nesting
+level of a query costs one round trip no matter how many rows it has.
+
+Under the async view ``load()`` returns an awaitable instead. It yields to
+the event loop once before fetching, so keys requested by sibling
+resolvers in the same tick join the batch as well, and it fetches through
+``abatch_load()``, which loaders implement with the async ORM.
+"""
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+
+from .aio import running_async
+from .response_cache import depends_on_rows
+
+_REGISTRY = []
+
+
+class DataLoader:
+    # ('app_label.Model', attribute) pairs: instances of that model carry
+    # keys for this loader in ``attribute``
+    sources = ()
+
+    # 'app_label.Model' for loaders keyed by primary key; instances of it
+    # passed to ``prime()`` are cached as already loaded
+    model = None
+
+    # True when a key maps to a list of rows (reverse relations)
+    many = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.sources or cls.model:
+            _REGISTRY.append(cls)
+
+    def __init__(self, context):
+        self.context = context
+        self._cache = {}
+        self._queue = set()
+        self._inflight = None
+
+    def batch_load(self, keys):
+        """Return a dict mapping each found key to its value."""
+        raise NotImplementedError
+
+    async def abatch_load(self, keys):
+        """Async counterpart of ``batch_load()``, used under the async view."""
+        return await sync_to_async(self.batch_load)(keys)
+
+    def default(self):
+        return [] if self.many else None
+
+    def queue(self, key):
+        if key is not None and key not in self._cache:
+            self._queue.add(key)
+
+    def load(self, key):
+        if key is None:
+            return self.default()
+        if key in self._cache:
+            return self._cache[key]
+        if running_async():
+            return self._aload(key)
+        self._queue.add(key)
+        self.dispatch()
+        return self._cache[key]
+
+    def load_many(self, keys):
+        for key in keys:
+            self.queue(key)
+        if running_async():
+            return asyncio.gather(*(self._aload(key) for key in keys))
+        if self._queue:
+            self.dispatch()
+        return [self.load(key) for key in keys]
+
+    async def _aload(self, key):
+        if key is None:
+            return self.default()
+        if key not in self._cache:
+            self._queue.add(key)
+            # let sibling resolvers queue their keys before fetching
+            await asyncio.sleep(0)
+        while key not in self._cache:
+            # one fetch at a time; keys queued meanwhile go in the next one
+            if self._inflight is None:
+                self._inflight = asyncio.ensure_future(self.adispatch())
+            inflight = self._inflight
+            try:
+                await inflight
+            finally:
+                if self._inflight is inflight:
+                    self._inflight = None
+        return self._cache[key]
+
+    def prime_value(self, key, value):
+        self._cache.setdefault(key, value)
+        self._queue.discard(key)
+
+    def clear(self, key):
+        self._cache.pop(key, None)
+
+    def dispatch(self):
+        keys = list(self._queue)
+        self._queue.clear()
+        self._store(keys, self.batch_load(keys))
+
+    async def adispatch(self):
+        keys = list(self._queue)
+        self._queue.clear()
+        self._store(keys, await self.abatch_load(keys) if keys else {})
+
+    def _store(self, keys, found):
+        loaded = []
+        for key in keys:
+            value = found.get(key, self.default())
+            self._cache[key] = value
+            if self.many:
+                loaded.extend(value)
+            elif value is not None:
+                loaded.append(value)
+        prime(self.context, loaded)
+
+
+def get_loader(context, loader_class):
+    loaders = getattr(context, '_dataloaders', None)
+    if loaders is None:
+        loaders = context._dataloaders = {}
+    loader = loaders.get(loader_class)
+    if loader is None:
+        loader = loaders[loader_class] = loader_class(context)
+    return loader
+
+
+def clear_loaders(context):
+    """Drop every loader cached on ``context``, e.g. between subscription events."""
+    context._dataloaders = {}
+
+
+def prime(context, instances):
+    """
+    Queue the relation keys of ``instances`` on every loader that can use
+    them, and record the response-cache scopes they were read from.
+    Returns ``instances`` evaluated as a list, so resolvers can
+    ``return prime(info.context, queryset)``.
+    """
+    instances = list(instances)
+    if not instances:
+        return instances
+    depends_on_rows(context, instances)
+    for loader_class in _REGISTRY:
+        if loader_class.model:
+            model = apps.get_model(loader_class.model)
+            # rows narrowed with only() would trigger a query per deferred field
+            loaded = [
+                obj for obj in instances
+                if isinstance(obj, model) and not obj.get_deferred_fields()
+            ]
+            if loaded:
+                loader = get_loader(context, loader_class)
+                for obj in loaded:
+                    loader.prime_value(obj.pk, obj)
+        for label, attr in loader_class.sources:
+            model = apps.get_model(label)
+            keys = [
+                getattr(obj, attr) for obj in instances
+                if isinstance(obj, model) and attr not in obj.get_deferred_fields()
+            ]
+            keys = [key for key in keys if key is not None]
+            if not keys:
+                continue
+            loader = get_loader(context, loader_class)
+            for key in keys:
+                loader.queue(key)
+    return instances
@@ -0,0 +1,75 @@
+"""
+Single-statement write helpers for mutations.
+
+``update_returning()`` and ``delete_returning()`` run a conditional UPDATE or
+DELETE and hand back the affected rows in the same round trip using
+``RETURNING`` (PostgreSQL, SQLite 3.35+), instead of the usual
+SELECT-then-save / SELECT-then-delete pair. On other backends they fall
+back to a transaction with one extra SELECT.
+"""
+
+from django.db import connections, transaction
+from django.db.models import sql
+
+
+def supports_returning(using):
+    connection = connections[using]
+    return (
+        connection.vendor in ('postgresql', 'sqlite')
+        and connection.features.can_return_columns_from_insert
+    )
+
+
+def _returning(queryset, compiler):
+    statement, params = compiler.as_sql()
+    manager = queryset.model._base_manager.db_manager(queryset.db)
+    # the model's columns only: not e.g. a database-maintained search vector
+    quote_name = connections[queryset.db].ops.quote_name
+    columns = ', '.join(quote_name(field.column) for field in queryset.model._meta.concrete_fields)
+    with transaction.mark_for_rollback_on_error(using=queryset.db):
+        return list(manager.raw(f'{statement} RETURNING {columns}', params))
+
+
+def update_returning(queryset, **values):
+    """
+    ``queryset.update(**values)`` that returns the updated instances. Like
+    update(), it skips save() and signals, so ``auto_now`` fields must be
+    passed explicitly.
+    """
+    queryset = queryset.order_by()
+    if not supports_returning(queryset.db):
+        with transaction.atomic(using=queryset.db):
+            pks = list(queryset.select_for_update().values_list('pk', flat=True))
+            rows = queryset.model._base_manager.using(queryset.db).filter(pk__in=pks)
+            rows.update(**values)
+            return list(rows)
+
+    query = queryset.query.chain(sql.UpdateQuery)
+    query.add_update_values(values)
+    if query.related_updates:
+        raise ValueError('update_returning() cannot update fields of parent models')
+    query.clear_select_clause()
+    # SQLUpdateCompiler.as_sql() runs pre_sql_setup(), which turns filters
+    # across joins into "pk IN (SELECT ...)"
+    return _returning(queryset, query.get_compiler(queryset.db))
+
+
+def delete_returning(queryset):
+    """
+    Delete the rows of ``queryset`` with one DELETE and return them. No
+    signals are sent and no cascades are collected: callers must remove
+    dependent rows themselves.
+    """
+    queryset = queryset.order_by()
+    if not supports_returning(queryset.db):
+        with transaction.atomic(using=queryset.db):
+            rows = list(queryset.select_for_update())
+            queryset.model._base_manager.using(queryset.db).filter(
+                pk__in=[row.pk for row in rows]
+            )._raw_delete(queryset.db)
+            return rows
+
+    query = queryset.query.clone()
+    query.__class__ = sql.DeleteQuery
+    # SQLDeleteCompiler itself turns filters across joins into a subquery
+    return _returning(queryset, query.get_compiler(queryset.db))
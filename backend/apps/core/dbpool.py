@@ -0,0 +1,79 @@
+"""
+Statistics of the psycopg connection pools Django keeps for PostgreSQL
+databases configured with ``OPTIONS['pool']``, served on ``/metrics``.
+
+Each worker process has its own pool per database, so like the other
+metrics these are per process. Pools are only reported once a request has
+opened them.
+"""
+
+from django.db import connections
+
+from .metrics import Sampled
+
+
+def pools():
+    """``{alias: ConnectionPool}`` for the pools opened in this process."""
+    opened = {}
+    for alias in connections:
+        pool = getattr(type(connections[alias]), '_connection_pools', {}).get(alias)
+        if pool is not None:
+            opened[alias] = pool
+    return opened
+
+
+def pool_stats():
+    """``{alias: stats}``, with the keys of psycopg_pool's ``get_stats()``."""
+    return {alias: pool.get_stats() for alias, pool in pools().items()}
+
+
+def _stat(key, scale=1):
+    def sample():
+        return [((alias,), stats.get(key, 0) * scale) for alias, stats in pool_stats().items()]
+    return sample
+
+
+# saturation: connections busy = open - idle, compared with the maximum, and
+# requests queued for a connection
+Sampled(
+    'db_pool_max_connections', 'Connections the pool may open.',
+    _stat('pool_max'), ('database',),
+)
+Sampled(
+    'db_pool_connections', 'Connections currently open, busy or idle.',
+    _stat('pool_size'), ('database',),
+)
+Sampled(
+    'db_pool_idle_connections', 'Open connections waiting in the pool.',
+    _stat('pool_available'), ('database',),
+)
+Sampled(
+    'db_pool_waiting_requests', 'Requests currently waiting for a connection.',
+    _stat('requests_waiting'), ('database',),
+)
+# wait time: rate(wait_seconds_total) / rate(requests_total) is the mean wait
+Sampled(
+    'db_pool_requests_total', 'Connections handed out by the pool.',
+    _stat('requests_num'), ('database',), type='counter',
+)
+Sampled(
+    'db_pool_queued_requests_total', 'Requests that had to wait for a connection.',
+    _stat('requests_queued'), ('database',), type='counter',
+)
+Sampled(
+    'db_pool_wait_seconds_total', 'Time requests spent waiting for a connection.',
+    _stat('requests_wait_ms', 0.001), ('database',), type='counter',
+)
+Sampled(
+    'db_pool_timeouts_total', 'Requests that gave up waiting for a connection.',
+    _stat('requests_errors'), ('database',), type='counter',
+)
+Sampled(
+    'db_pool_connections_lost_total',
+    'Broken connections found by the health check and replaced.',
+    _stat('connections_lost'), ('database',), type='counter',
+)
+Sampled(
+    'db_pool_connection_errors_total', 'Failed attempts to open a connection.',
+    _stat('connections_errors'), ('database',), type='counter',
+)
@@ -0,0 +1,125 @@
+"""
+Parsed-document cache and persisted query registry for the GraphQL view.
+
+The frontend sends the same handful of operations over and over, so the
+parse + validate step is cached per query text in a small LRU. Persisted
+queries follow Apollo's APQ protocol: clients send ``sha256Hash`` in
+``extensions.persistedQuery`` instead of the query text, and register the
+text on a miss. Registrations expire after ``PERSISTED_QUERIES_TIMEOUT``
+seconds, and texts longer than ``PERSISTED_QUERY_MAX_LENGTH`` are not stored.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.core.cache import caches
+from graphql import GraphQLError, parse, validate
+
+from .conf import graphene_setting
+
+PERSISTED_QUERY_NOT_FOUND = 'PersistedQueryNotFound'
+PERSISTED_QUERY_NOT_SUPPORTED = 'PersistedQueryNotSupported'
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+document_cache = LRUCache(graphene_setting('DOCUMENT_CACHE_SIZE', 512))
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+def get_document(schema, query, rules=None, max_errors=None):
+    """
+    Return ``(document, validation_errors)`` for ``query``, parsing and
+    validating it only the first time it is seen. Raises GraphQLError on
+    syntax errors, which are not cached.
+    """
+    key = (id(schema), tuple(rules or ()), query_hash(query))
+    cached = document_cache.get(key)
+    if cached is not None:
+        return cached
+    document = parse(query)
+    errors = validate(schema, document, rules, max_errors)
+    document_cache.set(key, (document, errors))
+    return document, errors
+
+
+def _registry():
+    return caches[graphene_setting('PERSISTED_QUERIES_CACHE', 'default')]
+
+
+def resolve_persisted_query(query, extensions):
+    """
+    Apply the APQ protocol: return the query text for the request, looking
+    it up by hash when only the hash was sent, and registering it when both
+    were sent. Raises GraphQLError when the hash is unknown or wrong.
+    """
+    if extensions is not None and not isinstance(extensions, dict):
+        raise GraphQLError('extensions must be an object')
+    persisted = (extensions or {}).get('persistedQuery')
+    if not persisted:
+        return query
+    if not isinstance(persisted, dict):
+        raise GraphQLError(
+            PERSISTED_QUERY_NOT_FOUND,
+            extensions={'code': 'PERSISTED_QUERY_NOT_FOUND'},
+        )
+    if not graphene_setting('PERSISTED_QUERIES', True):
+        raise GraphQLError(
+            PERSISTED_QUERY_NOT_SUPPORTED,
+            extensions={'code': 'PERSISTED_QUERY_NOT_SUPPORTED'},
+        )
+
+    sha256 = persisted.get('sha256Hash')
+    if not sha256 or not isinstance(sha256, str):
+        raise GraphQLError('persistedQuery.sha256Hash is required')
+    key = f'graphql:pq:{sha256}'
+
+    if not query:
+        query = _registry().get(key)
+        if query is None:
+            raise GraphQLError(
+                PERSISTED_QUERY_NOT_FOUND,
+                extensions={'code': 'PERSISTED_QUERY_NOT_FOUND'},
+            )
+        return query
+
+    if query_hash(query) != sha256:
+        raise GraphQLError('provided sha does not match query')
+    # longer queries still run, but every client could register them, so
+    # they are not stored; registrations expire and clients register again
+    if len(query) <= graphene_setting('PERSISTED_QUERY_MAX_LENGTH', 20000):
+        _registry().set(key, query, timeout=graphene_setting('PERSISTED_QUERIES_TIMEOUT', 86400))
+    return query
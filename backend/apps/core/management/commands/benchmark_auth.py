@@ -0,0 +1,67 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from graphql_jwt.shortcuts import get_token
+
+from apps.accounts.auth import forget_user, token_cache
+from apps.accounts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the per-request cost of resolving a JWT to a user, with the '
+        'token and user caches cold (every request verifies the token and loads '
+        'the user) and warm.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--email', help='User to authenticate as (default: the first user).')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('date_joined', 'id')
+        user = users.filter(email=options['email']).first() if options['email'] else users.first()
+        if user is None:
+            raise CommandError('No such user; create one or run `manage.py seed_data`.')
+        header = f'JWT {get_token(user)}'
+        factory = RequestFactory()
+
+        def run(cold):
+            timings = []
+            with CaptureQueriesContext(connection) as captured:
+                for _ in range(options['requests']):
+                    if cold:
+                        token_cache.clear()
+                        forget_user(user.email)
+                    request = factory.post('/graphql/', HTTP_AUTHORIZATION=header)
+                    started = time.perf_counter()
+                    resolved = authenticate(request=request)
+                    timings.append(time.perf_counter() - started)
+                    assert resolved is not None and resolved.pk == user.pk
+            return timings, len(captured) / options['requests']
+
+        # measure the user cache even where the settings turn it off
+        graphene = {**settings.GRAPHENE, 'AUTH_USER_CACHE_TIMEOUT': 300}
+        with override_settings(GRAPHENE=graphene):
+            results = [('cold caches', run(cold=True)), ('warm caches', run(cold=False))]
+        forget_user(user.email)
+
+        self.stdout.write(
+            f"{options['requests']} authentications as {user.email} "
+            f"({connection.vendor}, {type(caches['default']).__name__})"
+        )
+        self.stdout.write(f"{'':<14}{'mean us':>10}{'p95 us':>10}{'SQL/req':>10}")
+        for name, (timings, statements) in results:
+            timings.sort()
+            self.stdout.write(
+                f"{name:<14}{statistics.mean(timings) * 1e6:>10.1f}"
+                f"{timings[int(len(timings) * 0.95) - 1] * 1e6:>10.1f}{statements:>10.2f}"
+            )
+
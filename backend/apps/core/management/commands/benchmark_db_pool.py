@@ -0,0 +1,161 @@
+import json
+import queue
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory, override_settings
+
+from apps.core.dbpool import pool_stats
+from apps.core.views import GraphQLView
+
+DEFAULT_QUERY = '{ allProjects(first: 5) { edges { node { name taskCount } } } }'
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test short GraphQL queries with a new database connection per '
+        'request (CONN_MAX_AGE=0, no pool) and with pooled connections, and '
+        'compare latency. Pooling needs PostgreSQL; elsewhere each worker '
+        'keeps one persistent connection instead.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument(
+            '--concurrency', type=int, default=8,
+            help='Worker threads, each sending requests back to back.',
+        )
+        parser.add_argument(
+            '--pool-size', type=int,
+            help='Connections in the pool (default: --concurrency).',
+        )
+        parser.add_argument(
+            '--connect-latency', type=float, default=0.0,
+            help='Simulated cost of opening a connection, in ms, for databases '
+                 'reached without a network (SQLite). Not allowed on PostgreSQL.',
+        )
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--query', default=DEFAULT_QUERY)
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        settings_dict = connections.settings[alias]
+        if settings_dict['NAME'] == ':memory:':
+            raise CommandError('An in-memory database is not shared between threads; '
+                               'run this against a real database.')
+        postgresql = connections[alias].vendor == 'postgresql'
+        if postgresql and options['connect_latency']:
+            raise CommandError('--connect-latency only applies to databases without a network.')
+
+        pool_size = options['pool_size'] or options['concurrency']
+        base_options = {
+            key: value for key, value in settings_dict.get('OPTIONS', {}).items() if key != 'pool'
+        }
+        configured_pool = settings_dict.get('OPTIONS', {}).get('pool')
+        pool = {**(configured_pool if isinstance(configured_pool, dict) else {}),
+                'min_size': pool_size, 'max_size': pool_size}
+        modes = [
+            ('new connection per request', {'OPTIONS': base_options, 'CONN_MAX_AGE': 0}),
+            ('pooled' if postgresql else 'persistent per worker',
+             {'OPTIONS': {**base_options, 'pool': pool}, 'CONN_MAX_AGE': 0} if postgresql
+             else {'OPTIONS': base_options, 'CONN_MAX_AGE': None}),
+        ]
+
+        saved = {key: settings_dict.get(key) for key in ('OPTIONS', 'CONN_MAX_AGE')}
+        # measure execution, not response cache hits
+        graphene = {**settings.GRAPHENE, 'RESPONSE_CACHE': False}
+        results = []
+        try:
+            with override_settings(GRAPHENE=graphene):
+                for name, overrides in modes:
+                    connections[alias].close()
+                    settings_dict.update(overrides)
+                    results.append((name, self.run(alias, options)))
+                    if postgresql:
+                        connections[alias].close_pool()
+        finally:
+            connections[alias].close()
+            settings_dict.update(saved)
+
+        self.stdout.write(
+            f"{options['requests']} requests, {options['concurrency']} workers, "
+            f"{connections[alias].vendor}"
+            + (f", {options['connect_latency']:g} ms per new connection"
+               if options['connect_latency'] else '')
+        )
+        self.stdout.write(
+            f"{'connections':<28}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+            f"{'opened':>10}{'wait ms':>10}"
+        )
+        for name, (elapsed, timings, opened, wait) in results:
+            timings.sort()
+            self.stdout.write(
+                f"{name:<28}{len(timings) / elapsed:>10.1f}"
+                f"{statistics.median(timings) * 1000:>10.2f}"
+                f"{timings[int(len(timings) * 0.95) - 1] * 1000:>10.2f}"
+                f"{opened:>10}{'-' if wait is None else f'{wait:.2f}':>10}"
+            )
+
+    def run(self, alias, options):
+        view = GraphQLView.as_view()
+        factory = RequestFactory()
+        payload = json.dumps({'query': options['query']})
+        latency = options['connect_latency'] / 1000
+        jobs = queue.SimpleQueue()
+        for _ in range(options['requests']):
+            jobs.put(True)
+        timings = []
+        opened = [0]
+        lock = threading.Lock()
+
+        def connected(sender, connection, **kwargs):
+            with lock:
+                opened[0] += 1
+            if latency:
+                time.sleep(latency)
+
+        def work():
+            try:
+                while True:
+                    try:
+                        jobs.get_nowait()
+                    except queue.Empty:
+                        return
+                    started = time.perf_counter()
+                    request = factory.post('/graphql/', payload, content_type='application/json')
+                    response = view(request)
+                    # what the request_finished signal does after each response
+                    close_old_connections()
+                    elapsed = time.perf_counter() - started
+                    assert response.status_code == 200, response.content
+                    with lock:
+                        timings.append(elapsed)
+            finally:
+                connections.close_all()
+
+        connection_created.connect(connected)
+        try:
+            started = time.perf_counter()
+            workers = [threading.Thread(target=work) for _ in range(options['concurrency'])]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(connected)
+
+        wait = None
+        stats = pool_stats().get(alias)
+        if stats is not None:
+            # checkouts are counted as connects above; the pool knows the real number
+            opened[0] = stats.get('connections_num', 0)
+            wait = stats.get('requests_wait_ms', 0) / max(stats.get('requests_num', 1), 1)
+        if len(timings) != options['requests']:
+            raise CommandError('Some requests failed; see the errors above.')
+        return elapsed, timings, opened[0], wait
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncRequestFactory, RequestFactory, override_settings
+
+from apps.core.views import AsyncGraphQLView, GraphQLView
+
+DEFAULT_QUERY = (
+    '{ allTasks(first: 50) { edges { node { title status '
+    'project { name } assignee { email } } } } }'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare GraphQL throughput of the sync view on a fixed pool of worker '
+        'threads (WSGI) with the async view on one event loop (ASGI).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument(
+            '--concurrency', type=int, default=50,
+            help='Clients sending requests at the same time.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Worker threads serving the WSGI path.',
+        )
+        parser.add_argument(
+            '--latency', type=float, default=20.0,
+            help='Simulated database round-trip time per statement, in ms.',
+        )
+        parser.add_argument('--query', default=DEFAULT_QUERY)
+
+    def handle(self, *args, **options):
+        if connections['default'].settings_dict['NAME'] == ':memory:':
+            self.stderr.write('An in-memory database is not shared between threads; '
+                              'run this against a real database.')
+            return
+
+        latency = options['latency'] / 1000
+        payload = json.dumps({'query': options['query']})
+
+        def delay(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_delay(sender, connection, **kwargs):
+            connection.execute_wrappers.append(delay)
+
+        connection_created.connect(add_delay)
+        for connection in connections.all():
+            if connection.connection is not None:
+                connection.execute_wrappers.append(delay)
+
+        # measure execution, not response cache hits
+        graphene = {**settings.GRAPHENE, 'RESPONSE_CACHE': False}
+        try:
+            with override_settings(GRAPHENE=graphene):
+                results = [
+                    ('WSGI (sync view)', self.run_wsgi(payload, options)),
+                    ('ASGI (async view)', self.run_asgi(payload, options)),
+                ]
+        finally:
+            connection_created.disconnect(add_delay)
+
+        self.stdout.write(
+            f"{options['requests']} requests, {options['concurrency']} concurrent clients, "
+            f"{options['workers']} WSGI workers, {options['latency']:g} ms per statement"
+        )
+        self.stdout.write(f"{'path':<20}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, (elapsed, timings) in results:
+            timings.sort()
+            self.stdout.write(
+                f"{name:<20}{len(timings) / elapsed:>10.1f}"
+                f"{statistics.median(timings) * 1000:>10.1f}"
+                f"{timings[int(len(timings) * 0.95) - 1] * 1000:>10.1f}"
+            )
+
+    def run_wsgi(self, payload, options):
+        view = GraphQLView.as_view()
+        factory = RequestFactory()
+
+        def handle(request):
+            response = view(request)
+            assert response.status_code == 200, response.content
+
+        def send(_):
+            # a client waits for a free worker, like a request queued at the server
+            started = time.perf_counter()
+            request = factory.post('/graphql/', payload, content_type='application/json')
+            workers.submit(handle, request).result()
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as workers:
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as clients:
+                timings = list(clients.map(send, range(options['requests'])))
+        return time.perf_counter() - started, timings
+
+    def run_asgi(self, payload, options):
+        view = AsyncGraphQLView.as_view()
+        factory = AsyncRequestFactory()
+
+        async def send(limit):
+            async with limit:
+                started = time.perf_counter()
+                request = factory.post('/graphql/', payload, content_type='application/json')
+                # what ASGIHandler does per request: ORM calls get their own thread
+                async with ThreadSensitiveContext():
+                    response = await view(request)
+                assert response.status_code == 200, response.content
+                return time.perf_counter() - started
+
+        async def main():
+            limit = asyncio.Semaphore(options['concurrency'])
+            return await asyncio.gather(*(send(limit) for _ in range(options['requests'])))
+
+        started = time.perf_counter()
+        timings = list(asyncio.run(main()))
+        return time.perf_counter() - started, timings
@@ -0,0 +1,104 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.core import benchmarks
+from config.schema import schema
+
+
+class Command(BaseCommand):
+    help = (
+        'Run every query and mutation of the schema against the current database '
+        '(see `seed_data`), report p50/p95 latency and SQL statements per operation, '
+        'and fail on regressions against the stored baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--baseline', default=str(benchmarks.DEFAULT_BASELINE))
+        parser.add_argument(
+            '--update-baseline', action='store_true',
+            help='Store these results as the baseline for this database vendor.',
+        )
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Allowed p50 slowdown as a fraction of the baseline.',
+        )
+        parser.add_argument(
+            '--slack-ms', type=float, default=2.0,
+            help='Allowed p50 slowdown in ms on top of --tolerance, for very fast operations.',
+        )
+        parser.add_argument('--password', default='password', help='Password given to seed_data.')
+        parser.add_argument('operations', nargs='*', help='Only run these root fields.')
+
+    def handle(self, *args, **options):
+        missing = benchmarks.missing_cases(schema)
+        if missing:
+            raise CommandError(f"No benchmark case for: {', '.join(missing)}")
+        unknown = set(options['operations']) - set(benchmarks.CASES)
+        if unknown:
+            raise CommandError(f"Unknown operations: {', '.join(sorted(unknown))}")
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1.')
+
+        try:
+            fixtures = benchmarks.Fixtures(options['password'])
+        except LookupError as e:
+            raise CommandError(str(e))
+
+        vendor = connection.vendor
+        stored = benchmarks.load_baseline(options['baseline'])
+        baseline = stored.get(vendor, {})
+        dataset = fixtures.dataset()
+        same_data = baseline.get('dataset') == dataset
+        self.stdout.write(
+            f"{vendor}: {dataset['users']} users, {dataset['projects']} projects, "
+            f"{dataset['tasks']} tasks; {options['iterations']} iterations per operation"
+        )
+        if baseline and not same_data and not options['update_baseline']:
+            self.stdout.write(self.style.WARNING(
+                f"The baseline was recorded on {baseline['dataset']}; comparing SQL counts only."
+            ))
+
+        operations = baseline.get('operations', {})
+        self.stdout.write(
+            f"{'operation':<26}{'p50 ms':>9}{'p95 ms':>9}{'sql':>6}   {'baseline p50':>12}{'sql':>6}"
+        )
+
+        def progress(name, result):
+            expected = operations.get(name)
+            reference = f"{expected['p50_ms']:>12.2f}{expected['sql']:>6}" if expected else f"{'-':>12}{'-':>6}"
+            self.stdout.write(
+                f"{name:<26}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['sql']:>6}   {reference}"
+            )
+
+        try:
+            results = benchmarks.run(
+                fixtures,
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                names=options['operations'],
+                progress=progress,
+            )
+        except AssertionError as e:
+            raise CommandError(str(e))
+
+        if options['update_baseline']:
+            if options['operations'] and same_data:
+                results = {**operations, **results}
+            stored[vendor] = {'dataset': dataset, 'operations': results}
+            benchmarks.save_baseline(stored, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(f"Baseline for {vendor} written to {options['baseline']}."))
+            return
+
+        regressions = benchmarks.compare(
+            results, operations, options['tolerance'], options['slack_ms'], latency=same_data
+        )
+        if regressions:
+            raise CommandError('Regressions:\n  ' + '\n  '.join(regressions))
+        if not operations:
+            self.stdout.write(self.style.WARNING(
+                f'No baseline for {vendor} yet; store one with --update-baseline.'
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS('No regressions.'))
@@ -0,0 +1,206 @@
+import itertools
+import random
+import time
+import uuid
+from array import array
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.core import ranking
+from apps.core.bulk import explicit_timestamps
+from apps.core.response_cache import invalidate
+from apps.projects.models import Project
+from apps.tasks.models import ProjectTaskStats, Task
+
+SCALES = {
+    'small': {'users': 100, 'projects': 500, 'tasks': 20_000},
+    'medium': {'users': 1_000, 'projects': 5_000, 'tasks': 500_000},
+    'large': {'users': 10_000, 'projects': 50_000, 'tasks': 5_000_000},
+}
+
+FIRST_NAMES = ['Ana', 'Binh', 'Chen', 'Dara', 'Eli', 'Farah', 'Gus', 'Hana', 'Ivo', 'June',
+               'Kai', 'Lena', 'Minh', 'Nora', 'Omar', 'Pia', 'Quan', 'Rosa', 'Sam', 'Tuan']
+LAST_NAMES = ['Nguyen', 'Smith', 'Garcia', 'Kim', 'Tran', 'Muller', 'Rossi', 'Silva',
+              'Khan', 'Ito', 'Novak', 'Le', 'Brown', 'Pham', 'Dubois']
+VERBS = ['Fix', 'Add', 'Refactor', 'Document', 'Test', 'Review', 'Migrate', 'Design',
+         'Optimize', 'Remove', 'Investigate', 'Deploy']
+NOUNS = ['login flow', 'billing page', 'search index', 'API client', 'onboarding email',
+         'dashboard', 'export job', 'permissions', 'cache layer', 'settings screen',
+         'audit log', 'mobile layout', 'webhook retries', 'report builder']
+PRODUCTS = ['Atlas', 'Beacon', 'Comet', 'Delta', 'Ember', 'Falcon', 'Glacier', 'Harbor',
+            'Ion', 'Juniper', 'Kestrel', 'Lumen']
+
+# roughly what a long-lived board looks like: most work is finished
+STATUS_WEIGHTS = {
+    Task.Status.BACKLOG: 15, Task.Status.TODO: 20, Task.Status.DOING: 10, Task.Status.DONE: 55,
+}
+PRIORITY_WEIGHTS = {
+    Task.Priority.LOW: 25, Task.Priority.MEDIUM: 45, Task.Priority.HIGH: 22, Task.Priority.URGENT: 8,
+}
+
+
+def zipf_cum_weights(count, skew, rng):
+    """Cumulative weights giving a few items most of the picks, in random order."""
+    weights = [1 / rank ** skew for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    return list(itertools.accumulate(weights))
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate users, projects and tasks for benchmarking, with skewed project '
+        'sizes and realistic status mix. Rows are added to the current database; '
+        'every seeded user has the same password.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='small')
+        parser.add_argument('--users', type=int, help='Overrides the scale preset.')
+        parser.add_argument('--projects', type=int, help='Overrides the scale preset.')
+        parser.add_argument('--tasks', type=int, help='Overrides the scale preset.')
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Zipf exponent for tasks per project and projects per owner (0 = uniform).',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Same seed, same data.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--password', default='password')
+
+    def handle(self, *args, **options):
+        counts = {**SCALES[options['scale']]}
+        for name in counts:
+            if options[name] is not None:
+                counts[name] = options[name]
+        if counts['users'] < 1 or (counts['tasks'] and counts['projects'] < 1):
+            raise CommandError('Projects need at least one user and tasks at least one project.')
+
+        self.rng = random.Random(options['seed'])
+        self.seed = options['seed']
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        if User.objects.filter(email=self.email(0)).exists():
+            raise CommandError(
+                f'Data for seed {self.seed} is already loaded; pass a different --seed.'
+            )
+
+        with explicit_timestamps(User, Project, Task):
+            users = self.stage('users', counts['users'], self.create_users, options['password'])
+            projects = self.stage(
+                'projects', counts['projects'], self.create_projects, users, options['skew']
+            )
+            self.stage('tasks', counts['tasks'], self.create_tasks, users, projects, options['skew'])
+
+        started = time.perf_counter()
+        ProjectTaskStats.objects.recount()
+        invalidate('users', 'projects', 'tasks')
+        self.stdout.write(f'counters: {time.perf_counter() - started:.1f}s')
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {counts['users']} users, {counts['projects']} projects and "
+            f"{counts['tasks']} tasks (seed {self.seed}, password {options['password']!r})."
+        ))
+
+    def stage(self, name, count, create, *args):
+        started = time.perf_counter()
+        with transaction.atomic():
+            result = create(count, *args)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'{name}: {count} rows in {elapsed:.1f}s ({count / max(elapsed, 1e-6):,.0f}/s)')
+        return result
+
+    def uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def email(self, index):
+        return f'user{index}.s{self.seed}@example.com'
+
+    def past(self, since=None, days=730):
+        """A time between ``since`` (default: ``days`` ago) and now."""
+        since = since or self.now - timedelta(days=days)
+        return since + (self.now - since) * self.rng.random()
+
+    def batches(self, count):
+        for start in range(0, count, self.batch_size):
+            yield range(start, min(start + self.batch_size, count))
+
+    def create_users(self, count, password):
+        # hashing is deliberately slow; every seeded user shares one hash
+        password = make_password(password)
+        users = []
+        for batch in self.batches(count):
+            rows = []
+            for index in batch:
+                joined = self.past()
+                rows.append(User(
+                    id=self.uuid(),
+                    email=self.email(index),
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                    password=password,
+                    date_joined=joined,
+                ))
+            User.objects.bulk_create(rows)
+            users.extend((user.id, user.date_joined) for user in rows)
+        return users
+
+    def create_projects(self, count, users, skew):
+        owners = zipf_cum_weights(len(users), skew, self.rng)
+        projects = []
+        for batch in self.batches(count):
+            rows = []
+            for owner_id, joined in self.rng.choices(users, cum_weights=owners, k=len(batch)):
+                created = self.past(joined)
+                rows.append(Project(
+                    id=self.uuid(),
+                    name=f'{self.rng.choice(PRODUCTS)} {self.rng.choice(NOUNS)}',
+                    description=self.rng.choice(['', f'Work on the {self.rng.choice(NOUNS)}.']),
+                    owner_id=owner_id,
+                    created_at=created,
+                    updated_at=created,
+                ))
+            Project.objects.bulk_create(rows)
+            projects.extend((project.id, project.created_at) for project in rows)
+        return projects
+
+    def create_tasks(self, count, users, projects, skew):
+        sizes = zipf_cum_weights(len(projects), skew, self.rng)
+        statuses, status_weights = zip(*STATUS_WEIGHTS.items())
+        priorities, priority_weights = zip(*PRIORITY_WEIGHTS.items())
+        # every task's column is drawn first, so that each column (new, hence
+        # empty) gets evenly spaced ranks for its final size: appending batch
+        # after batch would give the biggest columns longer keys
+        project_picks = array('L')
+        status_picks = array('B')
+        for batch in self.batches(count):
+            project_picks.extend(self.rng.choices(range(len(projects)), cum_weights=sizes, k=len(batch)))
+            status_picks.extend(self.rng.choices(range(len(statuses)), status_weights, k=len(batch)))
+        column_sizes = Counter(zip(project_picks, status_picks))
+        placed = Counter()
+        for batch in self.batches(count):
+            rows = []
+            for index, priority in zip(batch, self.rng.choices(priorities, priority_weights, k=len(batch))):
+                column = (project_picks[index], status_picks[index])
+                project_id, project_created = projects[column[0]]
+                created = self.past(project_created)
+                noun = self.rng.choice(NOUNS)
+                rows.append(Task(
+                    id=self.uuid(),
+                    title=f'{self.rng.choice(VERBS)} {noun}',
+                    description='' if self.rng.random() < 0.4 else
+                                f'The {noun} needs attention before the next release. ' * self.rng.randint(1, 6),
+                    status=statuses[column[1]],
+                    priority=priority,
+                    project_id=project_id,
+                    # a fifth of the tasks are unassigned
+                    assignee_id=self.rng.choice(users)[0] if self.rng.random() < 0.8 else None,
+                    rank=ranking.spread_key(placed[column], column_sizes[column]),
+                    created_at=created,
+                    updated_at=self.past(created),
+                ))
+                placed[column] += 1
+            Task.objects.bulk_create(rows)
@@ -0,0 +1,140 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Each worker process keeps its own registry and serves it on ``/metrics``;
+scrape every worker (or run one per container) to get the full picture.
+Label values that arrive from clients, such as operation names, are capped
+per metric so a client cannot grow the registry without bound.
+"""
+
+import bisect
+import math
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# label sets per metric; later ones are folded into "other"
+MAX_LABEL_SETS = 500
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Histogram:
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS,
+                 registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _get_series(self, labels):
+        series = self._series.get(labels)
+        if series is None:
+            if len(self._series) >= MAX_LABEL_SETS:
+                labels = ('other',) * len(self.labelnames)
+                series = self._series.get(labels)
+            if series is None:
+                # per-bucket counts, then sum
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0]
+        return series
+
+    def observe(self, value, *labels):
+        self.observe_many(labels, (value,))
+
+    def observe_many(self, labels, values):
+        """Record several observations for one label set under a single lock."""
+        with self._lock:
+            counts, _ = series = self._get_series(tuple(labels))
+            for value in values:
+                counts[bisect.bisect_left(self.buckets, value)] += 1
+                series[1] += value
+
+    def collect(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(series):
+            pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels)]
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                bucket_labels = ','.join(pairs + [f'le="{_format_value(float(bound))}"'])
+                lines.append(f'{self.name}_bucket{{{bucket_labels}}} {cumulative}')
+            label_text = '{' + ','.join(pairs) + '}' if pairs else ''
+            lines.append(f'{self.name}_sum{label_text} {_format_value(total)}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Sampled:
+    """
+    A gauge or counter read from ``sample()`` at scrape time, for numbers
+    something else already keeps (e.g. connection pool statistics).
+    ``sample()`` returns ``(label values, value)`` pairs.
+    """
+
+    def __init__(self, name, documentation, sample, labelnames=(), type='gauge',
+                 registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.sample = sample
+        self.labelnames = tuple(labelnames)
+        self.type = type
+        if registry is not None:
+            registry.register(self)
+
+    def collect(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+        ]
+        for labels, value in sorted(self.sample()):
+            pairs = ','.join(
+                f'{name}="{_escape(label)}"' for name, label in zip(self.labelnames, labels)
+            )
+            label_text = '{' + pairs + '}' if pairs else ''
+            lines.append(f'{self.name}{label_text} {_format_value(value)}')
+        return lines
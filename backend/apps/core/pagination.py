@@ -0,0 +1,200 @@
+"""
+Keyset (seek) pagination for Relay connections.
+
+Pages are cut with a WHERE clause on the model's ordering columns plus the
+primary key as a tie-breaker, e.g. ``(created_at, id) < (cursor values)``,
+so fetching page N costs the same as page 1 and each request only ever
+holds ``first``/``last`` rows in memory.
+
+A connection can also span several tables with the same ordering (tasks
+and archived tasks): each one is sliced the same way and the pages are
+merged, so a request holds ``first``/``last`` rows per table.
+"""
+
+import base64
+import json
+
+import graphene
+from django.db.models import Q
+from graphene.relay import PageInfo
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError
+
+from .aio import fetch, fetch_all, then
+from .dataloader import prime
+from .projection import only_selected
+
+
+def _keyset(model, ordering=None):
+    ordering = list(ordering or model._meta.ordering)
+    descending = ordering[0].startswith('-') if ordering else True
+    ordering.append('-pk' if descending else 'pk')
+    keys = []
+    for name in ordering:
+        desc = name.startswith('-')
+        name = name.lstrip('-')
+        field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        keys.append((field, desc))
+    return keys
+
+
+def _order_by(keys, reverse=False):
+    return [
+        ('-' if desc != reverse else '') + field.attname
+        for field, desc in keys
+    ]
+
+
+def encode_cursor(keys, obj):
+    values = [field.value_to_string(obj) for field, _ in keys]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(keys, cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(values) != len(keys):
+            raise ValueError
+        return [field.to_python(value) for (field, _), value in zip(keys, values)]
+    except Exception:
+        raise GraphQLError(f'Invalid cursor "{cursor}"')
+
+
+def _seek(keys, values, reverse=False):
+    """Rows strictly after ``values`` in the key ordering (before, if reverse)."""
+    condition = Q()
+    equal = Q()
+    for (field, desc), value in zip(keys, values):
+        lookup = 'lt' if desc != reverse else 'gt'
+        condition |= equal & Q(**{f'{field.attname}__{lookup}': value})
+        equal &= Q(**{field.attname: value})
+    return condition
+
+
+def check_limit(name, value, max_limit):
+    if value is None:
+        return
+    if value < 0:
+        raise GraphQLError(f'Argument "{name}" must be a non-negative integer')
+    if value > max_limit:
+        raise GraphQLError(
+            f'Requesting {value} records exceeds the "{name}" limit of {max_limit} records'
+        )
+
+
+def _merge(keys, pages, reverse, limit):
+    rows = [row for page in pages for row in page]
+    # stable sorts from the last key to the first order by all of them
+    for field, desc in reversed(keys):
+        rows.sort(key=lambda row: getattr(row, field.attname), reverse=desc != reverse)
+    return rows[:limit]
+
+
+def paginate(info, connection_type, queryset, first=None, after=None,
+             last=None, before=None, max_limit=None, ordering=None):
+    """
+    One page of ``queryset``, or of a tuple of querysets over models with
+    the same ordering, as an instance of ``connection_type``. ``ordering``
+    (field names, ``-`` for descending) replaces the model's ordering.
+    """
+    max_limit = max_limit or graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+    check_limit('first', first, max_limit)
+    check_limit('last', last, max_limit)
+
+    querysets = queryset if isinstance(queryset, (list, tuple)) else (queryset,)
+    keys = _keyset(querysets[0].model, ordering)
+    filters = []
+    if after:
+        filters.append(_seek(keys, decode_cursor(keys, after)))
+    if before:
+        filters.append(_seek(keys, decode_cursor(keys, before), reverse=True))
+
+    reverse = last is not None and first is None
+    if reverse:
+        limit = last + 1
+    else:
+        limit = (max_limit if first is None else first) + 1
+    pages = [
+        queryset.filter(*filters).order_by(*_order_by(keys, reverse=reverse))[:limit]
+        for queryset in querysets
+    ]
+
+    if len(pages) == 1:
+        rows = fetch(pages[0])
+    else:
+        rows = then(fetch_all(pages), lambda pages: _merge(keys, pages, reverse, limit))
+    return then(rows, lambda rows: _connection(
+        info, connection_type, keys, rows,
+        first=first, after=after, last=last, before=before, max_limit=max_limit,
+    ))
+
+
+def _connection(info, connection_type, keys, rows, first, after, last, before, max_limit):
+    if last is not None and first is None:
+        has_previous_page = len(rows) > last
+        rows = rows[:last]
+        rows.reverse()
+        has_next_page = before is not None
+    else:
+        limit = max_limit if first is None else first
+        has_next_page = len(rows) > limit
+        rows = rows[:limit]
+        if last is not None:
+            rows = rows[-last:] if last else []
+        has_previous_page = after is not None
+
+    prime(info.context, rows)
+    edges = [
+        connection_type.Edge(node=row, cursor=encode_cursor(keys, row))
+        for row in rows
+    ]
+    return connection_type(
+        edges=edges,
+        page_info=PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=has_previous_page,
+            has_next_page=has_next_page,
+        ),
+    )
+
+
+class KeysetConnectionField(graphene.Field):
+    """
+    A connection field whose resolver returns a queryset; the field narrows
+    it to the selected columns and slices it into a keyset-paginated page.
+    Resolvers must return a QuerySet (``Model.objects.none()`` rather than
+    ``[]``), or a tuple of querysets whose pages are merged. ``ordering=``
+    pages by other columns than the model's ordering.
+    """
+
+    def __init__(self, connection_type, *args, **kwargs):
+        kwargs.setdefault('first', graphene.Int())
+        kwargs.setdefault('after', graphene.String())
+        kwargs.setdefault('last', graphene.Int())
+        kwargs.setdefault('before', graphene.String())
+        self.max_limit = kwargs.pop('max_limit', None)
+        self.ordering = kwargs.pop('ordering', None)
+        super().__init__(connection_type, *args, **kwargs)
+
+    def wrap_resolve(self, parent_resolver):
+        resolver = super().wrap_resolve(parent_resolver)
+        connection_type = self.type
+        node_type = connection_type._meta.node
+
+        def resolve(root, info, first=None, after=None, last=None, before=None, **args):
+            queryset = resolver(root, info, **args)
+            if isinstance(queryset, (list, tuple)):
+                queryset = tuple(
+                    only_selected(part, info, node_type, ('edges', 'node'), self.ordering)
+                    for part in queryset
+                )
+            else:
+                queryset = only_selected(queryset, info, node_type, ('edges', 'node'), self.ordering)
+            return paginate(
+                info, connection_type, queryset,
+                first=first, after=after, last=last, before=before,
+                max_limit=self.max_limit, ordering=self.ordering,
+            )
+
+        return resolve
@@ -0,0 +1,83 @@
+"""
+Column projection driven by the GraphQL selection set.
+
+``only_selected()`` narrows a queryset to the columns the client actually
+asked for, so e.g. a board listing ``id title status`` never reads the
+unbounded ``description`` columns. Relations only need their FK column:
+the related rows themselves are fetched by the per-request loaders.
+
+Fields that are not model columns (``fullName``, ``taskCount``) must be
+declared in the object type's ``column_dependencies``; a selection with an
+undeclared computed field loads every column rather than risk a deferred
+load per row. Columns listed in ``required_columns`` are always loaded.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from graphene.utils.str_converters import to_snake_case
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+
+def _collect(info, selection_set, names):
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            names.setdefault(selection.name.value, []).append(selection)
+        elif isinstance(selection, InlineFragmentNode):
+            _collect(info, selection.selection_set, names)
+        elif isinstance(selection, FragmentSpreadNode):
+            fragment = info.fragments[selection.name.value]
+            _collect(info, fragment.selection_set, names)
+    return names
+
+
+def selected_fields(info, path=()):
+    """
+    Return the snake_case names selected below the current field, after
+    descending through ``path`` (e.g. ``('edges', 'node')``).
+    """
+    nodes = list(info.field_nodes)
+    for name in path:
+        children = []
+        for node in nodes:
+            if node.selection_set:
+                children.extend(_collect(info, node.selection_set, {}).get(name, []))
+        nodes = children
+    names = {}
+    for node in nodes:
+        if node.selection_set:
+            _collect(info, node.selection_set, names)
+    return {to_snake_case(name) for name in names if not name.startswith('__')}
+
+
+def selected_columns(model, info, object_type, path=(), ordering=None):
+    """
+    The columns of ``model`` needed for the selection below ``path``, plus
+    the columns of ``ordering`` (default: the model's), which cursors need.
+    None when the selection needs every column.
+    """
+    dependencies = getattr(object_type, 'column_dependencies', {})
+    columns = {model._meta.pk.attname}
+    columns.update(getattr(object_type, 'required_columns', ()))
+    for name in ordering or model._meta.ordering:
+        columns.add(model._meta.get_field(name.lstrip('-')).attname)
+
+    for name in selected_fields(info, path):
+        if name in dependencies:
+            columns.update(dependencies[name])
+            continue
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        if field.concrete:
+            columns.add(field.attname)
+        elif not field.is_relation:
+            return None
+    return columns
+
+
+def only_selected(queryset, info, object_type, path=(), ordering=None):
+    """``queryset`` narrowed to ``selected_columns()``."""
+    columns = selected_columns(queryset.model, info, object_type, path, ordering)
+    if columns is None:
+        return queryset
+    return queryset.only(*columns)
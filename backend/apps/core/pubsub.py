@@ -0,0 +1,157 @@
+"""
+Channel layers that fan subscription events out to WebSocket connections.
+
+Writers call ``publish(group, message)``; the message is handed to the
+layer once the surrounding transaction commits, so subscribers never see
+rows that were rolled back. Each running subscription iterates
+``get_channel_layer().subscribe(group)``.
+
+The layer is chosen with ``GRAPHENE['CHANNEL_LAYER']``::
+
+    'CHANNEL_LAYER': {
+        'BACKEND': 'apps.core.pubsub.RedisChannelLayer',
+        'OPTIONS': {'url': 'redis://localhost:6379/0'},
+    }
+
+``InMemoryChannelLayer`` only reaches subscribers in the same process, which
+is enough for a single node and for tests. Messages must be JSON-serializable.
+"""
+
+import asyncio
+import json
+import threading
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .conf import graphene_setting
+
+
+class BaseChannelLayer:
+
+    def publish(self, group, message):
+        """Send ``message`` to every subscriber of ``group``. May be called from any thread."""
+        raise NotImplementedError
+
+    async def subscribe(self, group):
+        """Async iterator over the messages published to ``group`` from now on."""
+        raise NotImplementedError
+        yield
+
+
+class InMemoryChannelLayer(BaseChannelLayer):
+    """
+    Per-process layer. Each subscriber gets a bounded queue; when a slow
+    subscriber's queue is full, new messages for it are dropped.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def publish(self, group, message):
+        with self._lock:
+            subscribers = list(self._groups.get(group, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, message)
+            except RuntimeError:
+                # the subscriber's event loop has shut down
+                pass
+
+    @staticmethod
+    def _deliver(queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+    def has_subscribers(self, group):
+        with self._lock:
+            return bool(self._groups.get(group))
+
+    async def subscribe(self, group):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.capacity))
+        with self._lock:
+            self._groups.setdefault(group, set()).add(subscriber)
+        try:
+            while True:
+                yield await subscriber[1].get()
+        finally:
+            with self._lock:
+                subscribers = self._groups.get(group)
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._groups[group]
+
+
+class RedisChannelLayer(BaseChannelLayer):
+    """Layer on Redis pub/sub, shared by every worker using the same server."""
+
+    def __init__(self, url, prefix='graphql:channel:'):
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+
+    def publish(self, group, message):
+        import redis
+
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.url)
+        self._client.publish(self.prefix + group, json.dumps(message, cls=DjangoJSONEncoder))
+
+    async def subscribe(self, group):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(self.prefix + group)
+        try:
+            async for item in pubsub.listen():
+                if item['type'] == 'message':
+                    yield json.loads(item['data'])
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_layer = None
+
+
+def get_channel_layer():
+    global _layer
+    if _layer is None:
+        config = graphene_setting('CHANNEL_LAYER') or {}
+        backend = import_string(config.get('BACKEND', 'apps.core.pubsub.InMemoryChannelLayer'))
+        _layer = backend(**config.get('OPTIONS', {}))
+    return _layer
+
+
+def publish(group, message):
+    """Publish ``message`` to ``group`` once the current transaction commits."""
+    transaction.on_commit(lambda: get_channel_layer().publish(group, message))
+
+
+def dump_instance(obj):
+    """The loaded column values of ``obj`` as JSON-friendly strings."""
+    deferred = obj.get_deferred_fields()
+    values = {}
+    for field in obj._meta.concrete_fields:
+        if field.attname in deferred:
+            continue
+        value = field.value_from_object(obj)
+        values[field.attname] = None if value is None else field.value_to_string(obj)
+    return values
+
+
+def load_instance(model, values):
+    """Rebuild a ``model`` instance from ``dump_instance()`` output, without a query."""
+    fields = [field for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(
+        None,
+        [field.attname for field in fields],
+        [field.to_python(values[field.attname]) for field in fields],
+    )
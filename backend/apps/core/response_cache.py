@@ -0,0 +1,160 @@
+"""
+Response cache for GraphQL read operations.
+
+Results are stored in Django's cache framework under a key built from the
+query, operation name, variables and viewer. Each entry also remembers the
+version of every *scope* it read: ``project:<id>``, ``user:<id>`` or a
+whole collection (``tasks``, ``projects``, ``users``). Writes call
+``invalidate()`` on the scopes they touch, which bumps those versions; an
+entry whose recorded versions no longer match is a miss. Invalidation is
+therefore exact and entries never need a short TTL to stay correct.
+
+Resolvers declare the scopes they depend on with ``depends_on()``; rows
+handed to GraphQL through ``prime()`` add their own scopes automatically.
+An operation that recorded no scopes is never cached.
+
+Each scope's version is recorded when a resolver first declares it, before
+its rows are read, and the entry is stored with those versions: a write
+committed while the operation ran leaves the entry already stale. Scopes
+taken from rows are only known after the read, so writes also record when
+each scope changed, and a response is not stored if one of its scopes
+changed since the operation began. With read replicas, which can lag, that
+window starts one replica pin period earlier.
+"""
+
+import hashlib
+import json
+import time
+
+from django.core.cache import caches
+
+from . import routing
+from .conf import graphene_setting
+
+
+def _cache():
+    return caches[graphene_setting('RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def enabled():
+    return graphene_setting('RESPONSE_CACHE', False)
+
+
+def project_scope(project_id):
+    return f'project:{project_id}'
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def _version_key(scope):
+    return f'graphql:v:{scope}'
+
+
+def _changed_key(scope):
+    return f'graphql:t:{scope}'
+
+
+def _register(context, scopes):
+    recorded = getattr(context, '_cache_scopes', None)
+    if recorded is None:
+        return
+    new = {scope for scope in scopes if scope and scope not in recorded}
+    if new:
+        # the versions the rows about to be read belong to
+        recorded.update(_versions(new))
+
+
+def depends_on(context, *scopes):
+    """Declare scopes a resolver is about to read; call it before the query runs."""
+    _register(context, scopes)
+
+
+def depends_on_rows(context, instances):
+    _register(context, [
+        obj.cache_scope() for obj in instances if getattr(obj, 'cache_scope', None) is not None
+    ])
+
+
+# seconds a scope's last change is remembered; longer than any operation
+CHANGED_TIMEOUT = 60
+
+
+def invalidate(*scopes):
+    """Bump the version of every scope so cached responses reading them miss."""
+    cache = _cache()
+    scopes = {scope for scope in scopes if scope}
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+    if scopes:
+        now = time.time()
+        cache.set_many(
+            {_changed_key(scope): now for scope in scopes},
+            timeout=max(CHANGED_TIMEOUT, routing.pin_seconds()),
+        )
+
+
+def _versions(scopes):
+    """
+    Current version of each scope. Missing versions are created from the
+    clock rather than 0, so an evicted counter never matches an old entry.
+    """
+    cache = _cache()
+    keys = {scope: _version_key(scope) for scope in scopes}
+    found = cache.get_many(keys.values())
+    for scope, key in keys.items():
+        if key not in found:
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+    return {scope: found[key] for scope, key in keys.items()}
+
+
+def response_key(query_hash, operation_name, variables, user):
+    viewer = str(user.pk) if user is not None and user.is_authenticated else None
+    payload = json.dumps(
+        [query_hash, operation_name, variables or {}, viewer],
+        sort_keys=True,
+        default=str,
+    )
+    return 'graphql:rc:' + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get(key):
+    entry = _cache().get(key)
+    if entry is None:
+        return None
+    scopes, data = entry
+    if _versions(scopes) != scopes:
+        return None
+    return data
+
+
+def begin(context):
+    context._cache_scopes = {}
+    context._cache_started = time.time()
+
+
+def store(key, context, data, replica=False):
+    """
+    Cache ``data`` under the scope versions recorded when each scope was
+    first declared. ``replica`` says the rows came from a read replica,
+    which may not have the latest writes yet.
+    """
+    scopes = getattr(context, '_cache_scopes', None)
+    if not scopes:
+        return
+    changed = _cache().get_many([_changed_key(scope) for scope in scopes]).values()
+    # scopes taken from rows are declared after the rows were read, so a
+    # write in between is only visible as a change since the start
+    since = context._cache_started
+    if replica:
+        since -= routing.pin_seconds()
+    if any(moment >= since for moment in changed):
+        return
+    timeout = graphene_setting('RESPONSE_CACHE_TIMEOUT', 300)
+    _cache().set(key, (dict(scopes), data), timeout=timeout)
@@ -0,0 +1,82 @@
+"""
+Read-replica routing for GraphQL queries.
+
+``ReplicaRouter`` sends reads to a replica only inside ``reading_from()``,
+which the GraphQL views open around the execution of a query operation.
+Everything else reads from the primary: mutations, authentication,
+management commands, the admin. Writes always go to the primary.
+
+Replicas lag behind. After a viewer's mutation, ``pin()`` keeps that
+viewer's reads on the primary for ``GRAPHENE['REPLICA_PIN_SECONDS']``, so
+they see their own writes. The pin is kept in the default cache, so it
+reaches every worker when that cache is shared (Redis in production).
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .conf import graphene_setting
+
+_read_alias = ContextVar('db_read_alias', default=None)
+
+
+def replicas():
+    """Aliases of the databases that serve query reads."""
+    return list(graphene_setting('DATABASE_REPLICAS', ()))
+
+
+def pin_seconds():
+    return graphene_setting('REPLICA_PIN_SECONDS', 5)
+
+
+def _pin_key(user):
+    return f'db:pin:{user.pk}'
+
+
+def pin(user):
+    """Keep ``user``'s reads on the primary while the replicas catch up."""
+    if replicas() and user is not None and user.is_authenticated:
+        cache.set(_pin_key(user), True, timeout=pin_seconds())
+
+
+def read_alias(user):
+    """
+    The replica a query by ``user`` should read from, or None for the
+    primary (no replicas configured, or the viewer wrote recently).
+    """
+    aliases = replicas()
+    if not aliases:
+        return None
+    if user is not None and user.is_authenticated and cache.get(_pin_key(user)):
+        return None
+    return random.choice(aliases)
+
+
+@contextmanager
+def reading_from(alias):
+    """Route reads inside the block to ``alias`` (None: the primary)."""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # not the database an instance was read from, which may be a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,41 @@
+"""
+Change events for GraphQL subscriptions.
+
+Mutations call ``publish_change()`` after a write; subscription resolvers
+iterate ``changes()`` for the same group. Created and updated rows travel
+with their column values, so a subscriber renders the delta without
+re-reading the row; deletions only carry the primary key.
+"""
+
+import graphene
+
+from .dataloader import clear_loaders, prime
+from .pubsub import dump_instance, get_channel_layer, load_instance, publish
+
+
+class ChangeActionEnum(graphene.Enum):
+    CREATED = 'CREATED'
+    UPDATED = 'UPDATED'
+    DELETED = 'DELETED'
+
+
+def publish_change(group, action, instance):
+    message = {'action': action, 'id': str(instance.pk)}
+    if action != ChangeActionEnum.DELETED.value:
+        message['data'] = dump_instance(instance)
+    publish(group, message)
+
+
+async def changes(info, group, model):
+    """
+    Yield ``(action, pk, instance)`` for every change published to ``group``;
+    ``instance`` is None for deletions. Loader caches are reset per event so
+    related rows are read fresh.
+    """
+    pk_field = model._meta.pk
+    async for message in get_channel_layer().subscribe(group):
+        clear_loaders(info.context)
+        instance = None
+        if 'data' in message:
+            instance = prime(info.context, [load_instance(model, message['data'])])[0]
+        yield message['action'], pk_field.to_python(message['id']), instance
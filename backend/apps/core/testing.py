@@ -0,0 +1,64 @@
+"""
+Helpers shared by the app test suites.
+"""
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+
+def execute(query, user=None, variables=None):
+    """Run ``query`` against the project schema as ``user``; returns the result."""
+    from config.schema import schema
+
+    request = RequestFactory().post('/graphql/')
+    request.user = user or AnonymousUser()
+    return schema.execute(query, context_value=request, variable_values=variables)
+
+
+def capture_sql(query, user=None, variables=None):
+    """
+    Run ``query`` and return ``(result, [sql, ...])`` for every statement
+    issued. Savepoints are left out: inside a TestCase every ``atomic()``
+    block shows up as them, where a request would only BEGIN/COMMIT.
+    """
+    with CaptureQueriesContext(connection) as captured:
+        result = execute(query, user=user, variables=variables)
+    return result, [
+        q['sql'] for q in captured.captured_queries
+        if 'SAVEPOINT' not in q['sql']
+    ]
+
+
+def explain(sql):
+    """
+    Return the query plan for ``sql`` as one string. On PostgreSQL sequential
+    scans and explicit sorts are disabled first, so they only show up in the
+    plan when no index can serve the query.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET enable_seqscan = off')
+            cursor.execute('SET enable_sort = off')
+            try:
+                cursor.execute(f'EXPLAIN {sql}')
+                return '\n'.join(row[0] for row in cursor.fetchall())
+            finally:
+                cursor.execute('RESET enable_seqscan')
+                cursor.execute('RESET enable_sort')
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+def is_scan_and_sort(plan, table):
+    """True when ``plan`` reads ``table`` without an index and sorts the result."""
+    if connection.vendor == 'postgresql':
+        return f'Seq Scan on {table}' in plan or 'Sort' in plan
+    # only the target table's line: an index used by a subquery says nothing
+    # about how the table itself is read
+    full_scan = any(
+        line.split()[:2] == ['SCAN', table] and 'USING' not in line
+        for line in plan.splitlines()
+    )
+    return full_scan or 'USE TEMP B-TREE FOR ORDER BY' in plan
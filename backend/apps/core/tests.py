@@ -0,0 +1,764 @@
+import asyncio
+import io
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from graphql_jwt.shortcuts import get_token
+
+from apps.accounts.models import User
+from apps.projects.models import Project
+from apps.tasks.models import RANK_MAX_LENGTH, ProjectTaskStats, Task
+from config.schema import schema
+
+from . import benchmarks, documents, ranking, response_cache
+from .db import delete_returning, update_returning
+from .testing import execute, is_scan_and_sort
+from .documents import document_cache, query_hash
+from .pubsub import InMemoryChannelLayer, get_channel_layer
+from .routing import ReplicaRouter, reading_from
+from .views import AsyncGraphQLView
+from .websocket import PROTOCOL, GraphQLWebSocketApp
+
+
+class GraphQLTestCase(TestCase):
+
+    def post(self, payload, user=None):
+        headers = {'HTTP_AUTHORIZATION': f'JWT {get_token(user)}'} if user else {}
+        response = self.client.post(
+            '/graphql/', json.dumps(payload), content_type='application/json', **headers
+        )
+        return response.json()
+
+
+class KeysetPaginationTests(TestCase):
+
+    page_query = (
+        'query($first: Int, $after: String, $last: Int, $before: String) { allTasks(first: $first, '
+        'after: $after, last: $last, before: $before) { edges { cursor node { title } } '
+        'pageInfo { startCursor endCursor hasNextPage hasPreviousPage } } }'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        project = Project.objects.create(name='Board', owner=cls.user)
+        Task.objects.bulk_create([Task(title=f'Task {i}', project=project) for i in range(7)])
+        # equal timestamps leave the order to the id tie-breaker
+        Task.objects.update(created_at=Task.objects.earliest('created_at').created_at)
+        cls.titles = list(Task.objects.order_by('-created_at', '-id').values_list('title', flat=True))
+
+    def page(self, **variables):
+        result = execute(self.page_query, user=self.user, variables=variables)
+        self.assertIsNone(result.errors)
+        connection = result.data['allTasks']
+        return [edge['node']['title'] for edge in connection['edges']], connection['pageInfo']
+
+    def test_forward_pages_with_equal_timestamps(self):
+        titles, info = self.page(first=3)
+        self.assertEqual(titles, self.titles[:3])
+        self.assertEqual((info['hasNextPage'], info['hasPreviousPage']), (True, False))
+
+        seen, after = titles, info['endCursor']
+        while info['hasNextPage']:
+            titles, info = self.page(first=3, after=after)
+            self.assertTrue(info['hasPreviousPage'])
+            seen, after = seen + titles, info['endCursor']
+        self.assertEqual(seen, self.titles)
+
+        titles, info = self.page(first=3, after=after)
+        self.assertEqual((titles, info['endCursor'], info['hasNextPage']), ([], None, False))
+
+    def test_backward_pages(self):
+        titles, info = self.page(last=3)
+        self.assertEqual(titles, self.titles[-3:])
+        self.assertEqual((info['hasPreviousPage'], info['hasNextPage']), (True, False))
+
+        titles, info = self.page(last=3, before=info['startCursor'])
+        self.assertEqual(titles, self.titles[1:4])
+        self.assertEqual((info['hasPreviousPage'], info['hasNextPage']), (True, True))
+        titles, info = self.page(last=3, before=info['startCursor'])
+        self.assertEqual((titles, info['hasPreviousPage']), (self.titles[:1], False))
+
+    def test_cursors_and_arguments(self):
+        _, info = self.page(first=2)
+        titles, _ = self.page(first=5, after=info['startCursor'], before=info['endCursor'])
+        self.assertEqual(titles, [])
+        titles, _ = self.page(first=5, after=info['startCursor'])
+        self.assertEqual(titles, self.titles[1:6])
+
+        for cursor in ('not-a-cursor', 'WyJ4Il0='):
+            result = execute(self.page_query, user=self.user, variables={'after': cursor})
+            self.assertEqual(result.errors[0].message, f'Invalid cursor "{cursor}"')
+        result = execute(self.page_query, user=self.user, variables={'first': -1})
+        self.assertEqual(result.errors[0].message, 'Argument "first" must be a non-negative integer')
+
+
+class PersistedQueryTests(GraphQLTestCase):
+    query = '{ me { id } }'
+
+    def setUp(self):
+        cache.clear()
+
+    def persisted(self, sha256):
+        return {'persistedQuery': {'version': 1, 'sha256Hash': sha256}}
+
+    def test_unknown_hash_asks_for_the_query(self):
+        body = self.post({'extensions': self.persisted(query_hash(self.query))})
+        self.assertEqual(body['errors'][0]['message'], 'PersistedQueryNotFound')
+
+    def test_registered_query_runs_by_hash(self):
+        sha256 = query_hash(self.query)
+        body = self.post({'query': self.query, 'extensions': self.persisted(sha256)})
+        self.assertEqual(body['data'], {'me': None})
+
+        body = self.post({'extensions': self.persisted(sha256)})
+        self.assertEqual(body['data'], {'me': None})
+
+    def test_mismatched_hash_is_rejected(self):
+        body = self.post({'query': self.query, 'extensions': self.persisted('0' * 64)})
+        self.assertIn('errors', body)
+        self.assertIsNone(cache.get(f'graphql:pq:{"0" * 64}'))
+
+    def test_malformed_extension_is_a_graphql_error(self):
+        for extensions in ({'persistedQuery': 'abc'}, {'persistedQuery': ['abc']}, ['x']):
+            response = self.client.post(
+                '/graphql/', json.dumps({'extensions': extensions}), content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('errors', response.json())
+
+    def test_registrations_expire_and_are_capped(self):
+        sha256 = query_hash(self.query)
+        with mock.patch.object(documents, '_registry') as registry:
+            self.post({'query': self.query, 'extensions': self.persisted(sha256)})
+        registry.return_value.set.assert_called_once_with(f'graphql:pq:{sha256}', self.query, timeout=86400)
+
+        long_query = '{ me { id } }' + ' ' * 20000
+        body = self.post({'query': long_query, 'extensions': self.persisted(query_hash(long_query))})
+        self.assertEqual(body['data'], {'me': None})
+        self.assertIsNone(cache.get(f'graphql:pq:{query_hash(long_query)}'))
+
+
+class DocumentCacheTests(GraphQLTestCase):
+
+    def setUp(self):
+        document_cache.clear()
+
+    def test_repeated_query_is_parsed_once(self):
+        with mock.patch.object(documents, 'parse', wraps=documents.parse) as parse:
+            self.post({'query': '{ me { id } }'})
+            self.post({'query': '{ me { id } }'})
+        self.assertEqual(parse.call_count, 1)
+
+    def test_validation_errors_are_returned_from_cache(self):
+        for _ in range(2):
+            body = self.post({'query': '{ me { nope } }'})
+            self.assertIn('nope', body['errors'][0]['message'])
+
+    def test_syntax_errors_are_reported(self):
+        body = self.post({'query': '{ me { '})
+        self.assertIn('Syntax Error', body['errors'][0]['message'])
+
+
+class ResponseCacheTests(GraphQLTestCase):
+    board = 'query($id: UUID!) { tasksByProject(projectId: $id) { edges { node { id title } } } }'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        cls.other = User.objects.create_user(email='other@example.com', password='secret')
+        cls.project = Project.objects.create(name='Board', owner=cls.user)
+        cls.task = Task.objects.create(title='First', project=cls.project, assignee=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def fetch_board(self, user=None):
+        with CaptureQueriesContext(connection) as captured:
+            body = self.post({'query': self.board, 'variables': {'id': str(self.project.id)}}, user)
+        touched = any('tasks_task' in q['sql'] for q in captured.captured_queries)
+        titles = [edge['node']['title'] for edge in body['data']['tasksByProject']['edges']]
+        return titles, touched
+
+    def test_repeated_read_is_served_from_cache(self):
+        self.assertEqual(self.fetch_board(self.user), (['First'], True))
+        self.assertEqual(self.fetch_board(self.user), (['First'], False))
+
+    def test_task_mutations_invalidate_the_project(self):
+        self.fetch_board(self.user)
+        self.post({
+            'query': 'mutation($id: UUID!) { updateTask(id: $id, title: "Renamed") { success } }',
+            'variables': {'id': str(self.task.id)},
+        }, self.user)
+        self.assertEqual(self.fetch_board(self.user), (['Renamed'], True))
+
+        self.post({
+            'query': 'mutation($id: UUID!) { createTask(projectId: $id, title: "Second") { success } }',
+            'variables': {'id': str(self.project.id)},
+        }, self.user)
+        self.assertEqual(self.fetch_board(self.user), (['Second', 'Renamed'], True))
+
+    def test_write_during_the_read_is_not_cached(self):
+        store = response_cache.store
+
+        def write_then_store(*args, **kwargs):
+            # a rename committed after the rows were read, before the entry is stored
+            Task.objects.filter(id=self.task.id).update(title='Renamed')
+            response_cache.invalidate(response_cache.project_scope(self.project.id))
+            store(*args, **kwargs)
+
+        with mock.patch.object(response_cache, 'store', write_then_store):
+            self.assertEqual(self.fetch_board(self.user), (['First'], True))
+        self.assertEqual(self.fetch_board(self.user), (['Renamed'], True))
+        self.assertEqual(self.fetch_board(self.user), (['Renamed'], False))
+
+    def test_unrelated_writes_keep_the_entry(self):
+        self.fetch_board(self.user)
+        other_project = Project.objects.create(name='Other', owner=self.other)
+        self.post({
+            'query': 'mutation($id: UUID!) { createTask(projectId: $id, title: "Elsewhere") { success } }',
+            'variables': {'id': str(other_project.id)},
+        }, self.other)
+        self.assertEqual(self.fetch_board(self.user), (['First'], False))
+
+    def test_project_rename_invalidates_search(self):
+        search = '{ search(query: "roadmap") { edges { node { kind project { name } } } } }'
+        self.assertEqual(self.post({'query': search}, self.user)['data']['search']['edges'], [])
+        self.post({
+            'query': 'mutation($id: UUID!) { updateProject(id: $id, name: "Roadmap") { success } }',
+            'variables': {'id': str(self.project.id)},
+        }, self.user)
+        self.assertEqual(self.post({'query': search}, self.user)['data']['search']['edges'], [
+            {'node': {'kind': 'PROJECT', 'project': {'name': 'Roadmap'}}},
+        ])
+
+    def test_entries_are_per_viewer(self):
+        query = '{ myTasks { edges { node { title } } } }'
+        self.assertEqual(len(self.post({'query': query}, self.user)['data']['myTasks']['edges']), 1)
+        self.assertEqual(len(self.post({'query': query}, self.other)['data']['myTasks']['edges']), 0)
+
+    def test_invalid_token_is_not_answered_from_cache(self):
+        self.fetch_board(self.user)
+        response = self.client.post(
+            '/graphql/',
+            json.dumps({'query': self.board, 'variables': {'id': str(self.project.id)}}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION='JWT not-a-token',
+        )
+        self.assertIn('errors', response.json())
+
+
+@override_settings(GRAPHENE={**settings.GRAPHENE, 'DATABASE_REPLICAS': ['replica']})
+class ReplicaRoutingTests(GraphQLTestCase):
+    databases = {'default', 'replica'}
+    projects = '{ allProjects { edges { node { name } } } }'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        cls.other = User.objects.create_user(email='other@example.com', password='secret')
+        cls.user.save(using='replica')
+        cls.other.save(using='replica')
+        Project.objects.create(name='Board', owner=cls.user)
+        # a replica that has not caught up with the latest project yet
+        Project(name='Board', owner=cls.user).save(using='replica')
+        Project.objects.create(name='Latest', owner=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, user=None):
+        body = self.post({'query': self.projects}, user)
+        return sorted(edge['node']['name'] for edge in body['data']['allProjects']['edges'])
+
+    def test_queries_read_from_the_replica(self):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            self.assertEqual(self.names(self.user), ['Board'])
+        self.assertTrue(replica.captured_queries)
+        self.assertEqual(self.post({'query': '{ me { email } }'}, self.user)['data']['me'],
+                         {'email': 'owner@example.com'})
+
+        request = AsyncRequestFactory().post(
+            '/graphql/', json.dumps({'query': self.projects}), content_type='application/json'
+        )
+        response = async_to_sync(AsyncGraphQLView.as_view())(request)
+        edges = json.loads(response.content)['data']['allProjects']['edges']
+        self.assertEqual([edge['node']['name'] for edge in edges], ['Board'])
+
+    def test_writers_read_their_writes_from_the_primary(self):
+        body = self.post({'query': 'mutation { createProject(name: "Mine") { success } }'}, self.user)
+        self.assertTrue(body['data']['createProject']['success'])
+        self.assertFalse(Project.objects.using('replica').filter(name='Mine').exists())
+        self.assertEqual(self.names(self.user), ['Board', 'Latest', 'Mine'])
+        # other viewers stay on the replica
+        self.assertEqual(self.names(self.other), ['Board'])
+        self.assertEqual(self.names(), ['Board'])
+
+    def test_replica_reads_after_a_write_are_not_cached(self):
+        self.post({'query': 'mutation { createProject(name: "Mine") { success } }'}, self.user)
+        self.assertEqual(self.names(self.other), ['Board'])
+        # once replicated, the next read sees it
+        Project(name='Mine', owner=self.user).save(using='replica')
+        self.assertEqual(self.names(self.other), ['Board', 'Mine'])
+
+    def test_router(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Project))
+        with reading_from('replica'):
+            self.assertEqual(router.db_for_read(Project), 'replica')
+            self.assertEqual(router.db_for_write(Project), 'default')
+            self.assertEqual(Project.objects.count(), 1)
+        self.assertEqual(Project.objects.count(), 2)
+
+
+class QueryCostTests(GraphQLTestCase):
+    board = (
+        'query($first: Int) { allProjects(first: $first) { pageInfo { hasNextPage } '
+        'edges { node { name owner { email } taskCount tasks { title assignee { email } } } } } }'
+    )
+
+    def test_cost_is_reported(self):
+        body = self.post({'query': self.board, 'variables': {'first': 2}})
+        # allProjects + 2 x (node + owner + taskCount + tasks + 100 x assignee), as
+        # Project.tasks returns up to RELAY_CONNECTION_MAX_LIMIT tasks
+        self.assertEqual(body['extensions']['cost'], {
+            'requestedQueryCost': 1 + 2 * (4 + 100),
+            'maxQueryCost': settings.GRAPHENE['QUERY_MAX_COST'],
+        })
+
+    def test_fragments_and_page_size_defaults(self):
+        body = self.post({'query': (
+            '{ allTasks { edges { node { ...parts } } } } '
+            'fragment parts on TaskType { project { name } assignee { email } }'
+        )})
+        self.assertEqual(body['extensions']['cost']['requestedQueryCost'], 1 + 100 * 3)
+
+    def test_over_budget_query_runs_no_sql(self):
+        nested = '{ allProjects { edges { node { tasks { project { tasks { project { name } } } } } } } }'
+        with self.assertNumQueries(0):
+            body = self.post({'query': nested})
+        self.assertNotIn('data', body)
+        self.assertEqual(body['errors'][0]['extensions']['code'], 'QUERY_TOO_COSTLY')
+        self.assertEqual(body['errors'][0]['message'], 'Query cost of 1020201 exceeds the limit of 5000')
+
+    def test_cyclic_project_tasks_are_rejected(self):
+        cyclic = '{ allProjects(first: 100) { edges { node { tasks { project { tasks { id } } } } } } }'
+        body = self.post({'query': cyclic})
+        self.assertEqual(body['errors'][0]['extensions']['code'], 'QUERY_TOO_COSTLY')
+        # a smaller first on Project.tasks is charged as such
+        narrow = '{ allProjects(first: 10) { edges { node { tasks(first: 5) { project { tasks(first: 5) { id } } } } } } }'
+        self.assertEqual(self.post({'query': narrow})['extensions']['cost']['requestedQueryCost'], 1 + 10 * (1 + 1 + 5 * (1 + 1)))
+
+    def test_cost_grows_with_page_size(self):
+        query = 'query($first: Int) { allTasks(first: $first) { edges { node { title } } } }'
+        costs = [
+            self.post({'query': query, 'variables': {'first': first}})['extensions']['cost']['requestedQueryCost']
+            for first in (1, 10, 50)
+        ]
+        # allTasks + first x node
+        self.assertEqual(costs, [1 + 1, 1 + 10, 1 + 50])
+
+    @override_settings(GRAPHENE={**settings.GRAPHENE, 'QUERY_MAX_DEPTH': 2})
+    def test_depth_limit(self):
+        # edges and node do not count: allTasks, project, owner
+        body = self.post({'query': '{ allTasks(first: 1) { edges { node { project { owner { email } } } } } }'})
+        self.assertEqual(body['errors'][0]['message'], 'Query depth of 3 exceeds the limit of 2')
+        body = self.post({'query': '{ allTasks(first: 1) { edges { node { project { name } } } } }'})
+        self.assertEqual(body['data'], {'allTasks': {'edges': []}})
+
+
+@override_settings(GRAPHENE={**settings.GRAPHENE, 'RESPONSE_CACHE': False, 'TRACING_EXTENSION': True})
+class TracingTests(GraphQLTestCase):
+    board = (
+        'query TracedBoard { allProjects { edges { node { name owner { email } '
+        'tasks { title } } } } }'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        for i in range(2):
+            project = Project.objects.create(name=f'Board {i}', owner=cls.user)
+            Task.objects.create(title=f'Task {i}', project=project)
+
+    def test_extension_reports_sql_and_resolvers(self):
+        with CaptureQueriesContext(connection) as captured:
+            body = self.post({'query': self.board})
+        tracing = body['extensions']['tracing']
+        self.assertEqual(tracing['sqlQueries'], len(captured))
+        calls = {entry['field']: entry['calls'] for entry in tracing['resolvers']}
+        # attribute reads such as ProjectType.name are not timed
+        self.assertEqual(calls, {
+            'Query.allProjects': 1, 'ProjectType.owner': 2, 'ProjectType.tasks': 2,
+        })
+
+    def test_async_view_counts_sql_run_in_threads(self):
+        request = AsyncRequestFactory().post(
+            '/graphql/', json.dumps({'query': self.board}), content_type='application/json'
+        )
+        response = async_to_sync(AsyncGraphQLView.as_view())(request)
+        # projects, owners, tasks
+        self.assertEqual(json.loads(response.content)['extensions']['tracing']['sqlQueries'], 3)
+
+    def test_metrics_endpoint(self):
+        self.post({'query': self.board})
+        text = self.client.get('/metrics').content.decode()
+        self.assertIn('# TYPE graphql_request_duration_seconds histogram', text)
+        self.assertRegex(text, r'graphql_request_duration_seconds_count\{operation="TracedBoard"\} [1-9]')
+        self.assertRegex(text, r'graphql_sql_queries_bucket\{operation="TracedBoard",le="3"\} [1-9]')
+        self.assertIn('graphql_resolver_duration_seconds_count{field="ProjectType.owner"}', text)
+
+    def test_pool_metrics(self):
+        stats = {
+            'pool_max': 10, 'pool_size': 4, 'pool_available': 1, 'requests_waiting': 2,
+            'requests_num': 120, 'requests_wait_ms': 1500, 'connections_lost': 1,
+        }
+        pool = mock.Mock(get_stats=mock.Mock(return_value=stats))
+        with mock.patch('apps.core.dbpool.pools', return_value={'default': pool}):
+            text = self.client.get('/metrics').content.decode()
+        self.assertIn('# TYPE db_pool_requests_total counter', text)
+        self.assertIn('db_pool_max_connections{database="default"} 10', text)
+        self.assertIn('db_pool_waiting_requests{database="default"} 2', text)
+        self.assertIn('db_pool_wait_seconds_total{database="default"} 1.5', text)
+        self.assertIn('db_pool_connections_lost_total{database="default"} 1', text)
+        self.assertIn('db_pool_timeouts_total{database="default"} 0', text)
+        # without a pool (SQLite here) the families are empty
+        self.assertNotIn('db_pool_connections{', self.client.get('/metrics').content.decode())
+
+    def test_metrics_token(self):
+        with override_settings(GRAPHENE={**settings.GRAPHENE, 'METRICS_TOKEN': 'scrape'}):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape')
+            self.assertEqual(response.status_code, 200)
+
+
+class RankingTests(SimpleTestCase):
+
+    def test_keys_sort_between_their_neighbours(self):
+        keys = ranking.spread(1000)
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), 1000)
+        self.assertLessEqual(max(map(len, keys)), 2)
+
+        # repeatedly inserting into the same gap keeps finding room
+        low, high = keys[0], keys[1]
+        for _ in range(100):
+            middle = ranking.between(low, high)
+            self.assertTrue(low < middle < high)
+            self.assertFalse(middle.endswith('0'))
+            high = middle
+        self.assertTrue(ranking.between(None, '01') < '01')
+        self.assertTrue(ranking.between('zz', None) > 'zz')
+
+    def test_appended_keys_stay_short(self):
+        keys = ranking.keys_after(None, 50000)
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), 50000)
+        self.assertLessEqual(max(map(len, keys)), 7)
+        self.assertFalse(any(key.endswith('0') for key in keys))
+        # a long key left by moves is followed by a short one
+        self.assertEqual(ranking.after('i8h3k2w1'), 'j')
+        self.assertEqual(ranking.after('z'), 'z01')
+        self.assertEqual(ranking.after('zyz'), 'zz')
+        self.assertEqual(ranking.after('zz'), 'zz001')
+
+    def test_spread_keys(self):
+        for count in (1, 35, 36, 1000, 50000):
+            keys = [ranking.spread_key(index, count) for index in range(count)]
+            self.assertEqual(keys, sorted(set(keys)))
+            self.assertFalse(any(not key or key.endswith('0') for key in keys))
+            self.assertLessEqual(max(map(len, keys)), 4)
+
+    def test_invalid_keys(self):
+        for low, high in (('b', 'a'), ('a', 'a'), ('a0', None), ('', None), (None, 'A')):
+            with self.assertRaises(ValueError):
+                ranking.between(low, high)
+
+
+class ReturningTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(email='owner@example.com', password='secret')
+        cls.board = Project.objects.create(name='Board', owner=user)
+        other = Project.objects.create(name='Other', owner=user)
+        Task.objects.bulk_create([
+            Task(title='Mine', project=cls.board),
+            Task(title='Theirs', project=other),
+        ])
+
+    def test_filters_across_joins(self):
+        updated = update_returning(Task.objects.filter(project__name='Board'), title='Renamed')
+        self.assertEqual([(task.title, task.project_id) for task in updated], [('Renamed', self.board.id)])
+        self.assertEqual(set(Task.objects.values_list('title', flat=True)), {'Renamed', 'Theirs'})
+
+        deleted = delete_returning(Task.objects.filter(project__name='Other'))
+        self.assertEqual([task.title for task in deleted], ['Theirs'])
+        self.assertEqual(list(Task.objects.values_list('title', flat=True)), ['Renamed'])
+
+
+class QueryPlanHelperTests(SimpleTestCase):
+
+    @mock.patch.object(connection, 'vendor', 'sqlite')
+    def test_subquery_index_does_not_hide_a_full_scan(self):
+        plan = (
+            'SCAN tasks_task\n'
+            'LIST SUBQUERY 1\n'
+            'SEARCH U0 USING INDEX project_deleted_idx (deleted_at>?)'
+        )
+        self.assertTrue(is_scan_and_sort(plan, 'tasks_task'))
+        self.assertFalse(is_scan_and_sort(
+            'SCAN tasks_task USING INDEX task_created_idx\nSCAN tasks_taskevent', 'tasks_task'
+        ))
+
+
+class BenchmarkTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', users=3, projects=4, tasks=40, stdout=io.StringIO())
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline = Path(directory.name) / 'baseline.json'
+
+    def run_benchmarks(self, *args, **options):
+        call_command(
+            'run_benchmarks', *args, baseline=str(self.baseline), iterations=1, warmup=0,
+            stdout=io.StringIO(), **options
+        )
+
+    def test_every_operation_has_a_case(self):
+        self.assertEqual(benchmarks.missing_cases(schema), [])
+
+    def test_seed_data_is_consistent(self):
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(Task.objects.count(), 40)
+        stats = ProjectTaskStats.objects.all()
+        self.assertEqual(sum(s.total for s in stats), 40)
+        with self.assertRaises(CommandError):
+            call_command('seed_data', users=1, projects=0, tasks=0, stdout=io.StringIO())
+
+    def test_seeded_ranks_fit_a_skewed_project(self):
+        call_command(
+            'seed_data', users=2, projects=2, tasks=3000, skew=4, seed=1, batch_size=500,
+            stdout=io.StringIO(),
+        )
+        project = Project.objects.annotate(count=Count('tasks')).order_by('-count').first()
+        self.assertGreater(project.count, 2500)
+        ranks = list(project.tasks.values_list('status', 'rank'))
+        self.assertEqual(len(set(ranks)), len(ranks))
+        self.assertLessEqual(max(len(rank) for _, rank in ranks), RANK_MAX_LENGTH)
+        self.assertLessEqual(max(len(rank) for _, rank in ranks), 3)
+
+    def test_extra_sql_is_a_regression(self):
+        self.run_benchmarks(update_baseline=True)
+        stored = json.loads(self.baseline.read_text())
+        operations = stored[connection.vendor]['operations']
+        self.assertEqual(set(operations), set(benchmarks.CASES))
+        self.assertEqual(operations['me']['sql'], 1)
+
+        operations['allTasks']['sql'] -= 1
+        self.baseline.write_text(json.dumps(stored))
+        with self.assertRaisesMessage(CommandError, 'allTasks: '):
+            self.run_benchmarks('allTasks', 'me', tolerance=1000)
+
+
+@override_settings(GRAPHENE={**settings.GRAPHENE, 'RESPONSE_CACHE': False})
+class AsyncGraphQLViewTests(GraphQLTestCase):
+    board = (
+        '{ allProjects { edges { node { name owner { email } taskCount '
+        'tasks(first: 10) { title assignee { email } } } } } }'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        cls.helper = User.objects.create_user(email='helper@example.com', password='secret')
+        for i in range(3):
+            project = Project.objects.create(name=f'Board {i}', owner=cls.user)
+            Task.objects.create(title=f'Task {i}a', project=project, assignee=cls.helper)
+            Task.objects.create(title=f'Task {i}b', project=project)
+        ProjectTaskStats.objects.recount()
+
+    def setUp(self):
+        self.token = get_token(self.user)
+
+    async def apost(self, payload, token=None):
+        headers = {'Authorization': f'JWT {token}'} if token else {}
+        request = AsyncRequestFactory().post(
+            '/graphql/', json.dumps(payload), content_type='application/json', headers=headers
+        )
+        response = await AsyncGraphQLView.as_view()(request)
+        return json.loads(response.content)
+
+    def test_matches_the_sync_view_with_the_same_batching(self):
+        with CaptureQueriesContext(connection) as sync_queries:
+            expected = self.post({'query': self.board})
+        with CaptureQueriesContext(connection) as async_queries:
+            body = async_to_sync(self.apost)({'query': self.board})
+        self.assertEqual(body, expected)
+        self.assertEqual(len(body['data']['allProjects']['edges']), 3)
+        # one query per nesting level: projects, owners, counters, tasks, assignees
+        self.assertEqual(len(async_queries), len(sync_queries))
+        self.assertEqual(len(async_queries), 5)
+
+    async def test_concurrent_requests(self):
+        query = '{ me { email } myProjects { edges { node { name } } } }'
+        bodies = await asyncio.gather(*(self.apost({'query': query}, self.token) for _ in range(5)))
+        for body in bodies:
+            self.assertEqual(body['data']['me'], {'email': 'owner@example.com'})
+            self.assertEqual(len(body['data']['myProjects']['edges']), 3)
+
+    async def test_single_object_lookup(self):
+        task = await Task.objects.aget(title='Task 0a')
+        body = await self.apost({
+            'query': 'query($id: UUID!) { task(id: $id) { title project { name } assignee { email } } }',
+            'variables': {'id': str(task.id)},
+        })
+        self.assertEqual(body['data']['task'], {
+            'title': 'Task 0a',
+            'project': {'name': 'Board 0'},
+            'assignee': {'email': 'helper@example.com'},
+        })
+
+    async def test_mutations_run_synchronously(self):
+        project = await Project.objects.aget(name='Board 0')
+        body = await self.apost({
+            'query': 'mutation($id: UUID!) { createTask(projectId: $id, title: "New") '
+                     '{ success task { title project { name } } } }',
+            'variables': {'id': str(project.id)},
+        }, self.token)
+        self.assertEqual(body['data']['createTask'], {
+            'success': True, 'task': {'title': 'New', 'project': {'name': 'Board 0'}},
+        })
+        self.assertEqual(await Task.objects.filter(project=project).acount(), 3)
+
+    async def test_invalid_token(self):
+        body = await self.apost({'query': '{ me { email } }'}, 'not-a-token')
+        self.assertIn('errors', body)
+
+
+class SubscriptionTests(GraphQLTestCase):
+    task_changed = (
+        'subscription($projectId: UUID!) { taskChanged(projectId: $projectId) '
+        '{ action id task { title status } } }'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        cls.project = Project.objects.create(name='Board', owner=cls.user)
+        ProjectTaskStats.objects.recount()
+
+    def test_in_memory_layer_delivers_across_threads(self):
+        layer = InMemoryChannelLayer()
+
+        async def scenario():
+            events = layer.subscribe('group')
+            first = asyncio.ensure_future(events.__anext__())
+            while not layer.has_subscribers('group'):
+                await asyncio.sleep(0)
+            await sync_to_async(layer.publish, thread_sensitive=False)('group', {'n': 1})
+            message = await asyncio.wait_for(first, 5)
+            await events.aclose()
+            return message
+
+        self.assertEqual(async_to_sync(scenario)(), {'n': 1})
+        self.assertFalse(layer.has_subscribers('group'))
+
+    def run_socket(self, script):
+        """Drive GraphQLWebSocketApp with ``script(send_json, receive_json)``."""
+        async def scenario():
+            inbox, outbox = asyncio.Queue(), asyncio.Queue()
+            scope = {'type': 'websocket', 'path': '/graphql/', 'subprotocols': [PROTOCOL]}
+            app = asyncio.ensure_future(GraphQLWebSocketApp()(scope, inbox.get, outbox.put))
+            await inbox.put({'type': 'websocket.connect'})
+            self.assertEqual(await outbox.get(), {'type': 'websocket.accept', 'subprotocol': PROTOCOL})
+
+            async def send_json(message):
+                await inbox.put({'type': 'websocket.receive', 'text': json.dumps(message)})
+
+            async def receive_json():
+                message = await asyncio.wait_for(outbox.get(), 5)
+                return json.loads(message['text']) if message['type'] == 'websocket.send' else message
+
+            try:
+                return await script(send_json, receive_json)
+            finally:
+                await inbox.put({'type': 'websocket.disconnect', 'code': 1000})
+                await asyncio.wait_for(app, 5)
+
+        return async_to_sync(scenario)()
+
+    def test_task_changes_are_pushed(self):
+        group = f'project:{self.project.id}:tasks'
+
+        def create_and_delete():
+            with self.captureOnCommitCallbacks(execute=True):
+                body = self.post({
+                    'query': 'mutation($id: UUID!) { createTask(projectId: $id, title: "Live", '
+                             'status: TODO) { task { id } } }',
+                    'variables': {'id': str(self.project.id)},
+                }, self.user)
+            task_id = body['data']['createTask']['task']['id']
+            with self.captureOnCommitCallbacks(execute=True):
+                self.post({
+                    'query': 'mutation($id: UUID!) { deleteTask(id: $id) { success } }',
+                    'variables': {'id': task_id},
+                }, self.user)
+            return task_id
+
+        async def script(send_json, receive_json):
+            await send_json({'type': 'connection_init',
+                             'payload': {'authorization': f'JWT {get_token(self.user)}'}})
+            self.assertEqual(await receive_json(), {'type': 'connection_ack'})
+            await send_json({'type': 'subscribe', 'id': '1', 'payload': {
+                'query': self.task_changed, 'variables': {'projectId': str(self.project.id)},
+            }})
+            while not get_channel_layer().has_subscribers(group):
+                await asyncio.sleep(0)
+
+            task_id = await sync_to_async(create_and_delete)()
+            created, deleted = await receive_json(), await receive_json()
+            self.assertEqual(created, {'type': 'next', 'id': '1', 'payload': {'data': {'taskChanged': {
+                'action': 'CREATED', 'id': task_id, 'task': {'title': 'Live', 'status': 'TODO'},
+            }}}})
+            self.assertEqual(deleted['payload']['data']['taskChanged'], {
+                'action': 'DELETED', 'id': task_id, 'task': None,
+            })
+
+            await send_json({'type': 'complete', 'id': '1'})
+            while get_channel_layer().has_subscribers(group):
+                await asyncio.sleep(0)
+
+        self.run_socket(script)
+
+    def test_protocol_errors(self):
+        async def subscribe_before_init(send_json, receive_json):
+            await send_json({'type': 'subscribe', 'id': '1', 'payload': {'query': self.task_changed}})
+            return await receive_json()
+
+        closed = self.run_socket(subscribe_before_init)
+        self.assertEqual((closed['type'], closed['code']), ('websocket.close', 4401))
+
+        async def query_over_socket(send_json, receive_json):
+            await send_json({'type': 'connection_init'})
+            await receive_json()
+            await send_json({'type': 'subscribe', 'id': '1', 'payload': {'query': '{ me { email } }'}})
+            return await receive_json()
+
+        error = self.run_socket(query_over_socket)
+        self.assertEqual((error['type'], error['id']), ('error', '1'))
+
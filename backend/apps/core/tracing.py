@@ -0,0 +1,194 @@
+"""
+Per-operation tracing for the GraphQL views.
+
+The views open a ``Trace`` around every operation. While it is open,
+``TracingMiddleware`` times each resolver that does real work (fields
+answered by a plain attribute read are skipped) and a database execute
+wrapper counts the SQL statements and the time spent in them; the trace is
+kept in a context variable, so statements issued from ``sync_to_async``
+threads are attributed too. When the operation finishes its numbers go
+into the histograms below, served on ``/metrics``. With
+``GRAPHENE['TRACING_EXTENSION']`` on, responses also carry a summary in
+``extensions.tracing``.
+
+Resolvers are aggregated by ``ParentType.field`` rather than by response
+path, so list items share one series.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from inspect import isawaitable
+
+from graphene.types.resolver import attr_resolver, dict_or_attr_resolver, dict_resolver
+from graphql import get_named_type, is_leaf_type
+
+from .conf import graphene_setting
+from .cost import is_connection_type
+from .metrics import Histogram
+
+REQUEST_DURATION = Histogram(
+    'graphql_request_duration_seconds',
+    'Time to answer a GraphQL operation, including parsing and the response cache.',
+    ('operation',),
+)
+RESOLVER_DURATION = Histogram(
+    'graphql_resolver_duration_seconds',
+    'Wall time of GraphQL resolvers, by parent type and field.',
+    ('field',),
+)
+SQL_QUERIES = Histogram(
+    'graphql_sql_queries',
+    'SQL statements executed per GraphQL operation.',
+    ('operation',),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 500),
+)
+SQL_DURATION = Histogram(
+    'graphql_sql_duration_seconds',
+    'Time spent in SQL per GraphQL operation.',
+    ('operation',),
+)
+
+_current_trace = ContextVar('graphql_trace', default=None)
+
+
+def enabled():
+    return graphene_setting('METRICS', True)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+class Trace:
+
+    def __init__(self, operation_name=None):
+        self.operation_name = operation_name
+        self.start = time.perf_counter()
+        self.duration = None
+        self.sql_queries = 0
+        self.sql_duration = 0.0
+        self.resolvers = {}
+
+    def set_operation(self, operation_ast):
+        if not self.operation_name and operation_ast is not None and operation_ast.name:
+            self.operation_name = operation_ast.name.value
+
+    @property
+    def label(self):
+        return self.operation_name or 'anonymous'
+
+    def record(self, field, duration):
+        timings = self.resolvers.get(field)
+        if timings is None:
+            timings = self.resolvers[field] = []
+        timings.append(duration)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+        REQUEST_DURATION.observe(self.duration, self.label)
+        SQL_QUERIES.observe(self.sql_queries, self.label)
+        SQL_DURATION.observe(self.sql_duration, self.label)
+        for field, timings in self.resolvers.items():
+            RESOLVER_DURATION.observe_many((field,), timings)
+
+    def as_extension(self):
+        resolvers = sorted(
+            (
+                {'field': field, 'calls': len(timings), 'duration': round(sum(timings) * 1000, 3)}
+                for field, timings in self.resolvers.items()
+            ),
+            key=lambda entry: -entry['duration'],
+        )
+        return {
+            'duration': round(self.duration * 1000, 3),
+            'sqlQueries': self.sql_queries,
+            'sqlDuration': round(self.sql_duration * 1000, 3),
+            'resolvers': resolvers,
+        }
+
+
+@contextmanager
+def trace(operation_name=None):
+    """Trace the operation run inside the block; yields None when metrics are off."""
+    if not enabled():
+        yield None
+        return
+    current = Trace(operation_name)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+        current.finish()
+
+
+def annotate(result, current):
+    """Add ``extensions.tracing`` to ``result`` when the setting asks for it."""
+    if result is not None and current is not None and graphene_setting('TRACING_EXTENSION', False):
+        result.extensions = {**(result.extensions or {}), 'tracing': current.as_extension()}
+    return result
+
+
+def sql_execute_wrapper(execute, sql, params, many, context):
+    current = _current_trace.get()
+    if current is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        current.sql_queries += 1
+        current.sql_duration += time.perf_counter() - start
+
+
+def install_sql_wrapper(connection, **kwargs):
+    """``connection_created`` receiver: count every statement run on ``connection``."""
+    if sql_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_execute_wrapper)
+
+
+class TracingMiddleware:
+    """Graphene middleware timing every resolver that is not a plain attribute read."""
+
+    def __init__(self):
+        self._fields = {}
+
+    def _field_key(self, info):
+        key = (info.parent_type.name, info.field_name)
+        try:
+            return self._fields[key]
+        except KeyError:
+            pass
+        field = info.parent_type.fields[info.field_name]
+        resolver = getattr(field.resolve, 'func', field.resolve)
+        default = resolver in (dict_or_attr_resolver, attr_resolver, dict_resolver)
+        # connection wrappers (edges, node, pageInfo) are plain reads too
+        wrapper = is_connection_type(info.parent_type) or (
+            info.field_name == 'node' and 'cursor' in info.parent_type.fields
+        )
+        timed = not (default and (wrapper or is_leaf_type(get_named_type(field.type))))
+        self._fields[key] = name = f'{key[0]}.{key[1]}' if timed else None
+        return name
+
+    def resolve(self, next, root, info, **kwargs):
+        current = _current_trace.get()
+        if current is None:
+            return next(root, info, **kwargs)
+        field = self._field_key(info)
+        if field is None:
+            return next(root, info, **kwargs)
+
+        start = time.perf_counter()
+        result = next(root, info, **kwargs)
+        if isawaitable(result):
+            return self._await(result, current, field, start)
+        current.record(field, time.perf_counter() - start)
+        return result
+
+    @staticmethod
+    async def _await(result, current, field, start):
+        try:
+            return await result
+        finally:
+            current.record(field, time.perf_counter() - start)
@@ -0,0 +1,386 @@
+import json
+from inspect import isawaitable
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import authenticate
+from django.db import connection, transaction
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotAllowed
+from django.http.response import HttpResponseBadRequest
+from django.utils.crypto import constant_time_compare
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.views import GraphQLView as BaseGraphQLView, HttpError, set_rollback
+from graphql import (
+    ExecutionResult,
+    GraphQLError,
+    OperationType,
+    execute,
+    get_operation_ast,
+    validate_schema,
+)
+from graphql_jwt.exceptions import JSONWebTokenError
+from graphql_jwt.utils import get_http_authorization
+
+from . import metrics, response_cache, routing, tracing
+from .conf import graphene_setting
+from .cost import check_limits, cost_extension
+from .documents import get_document, query_hash, resolve_persisted_query
+
+
+class PreparedOperation:
+    """A parsed, validated operation ready to execute."""
+
+    def __init__(self, schema, document, operation_ast, execute_options, cache_key=None,
+                 extensions=None, read_alias=None):
+        self.schema = schema
+        self.document = document
+        self.operation_ast = operation_ast
+        self.execute_options = execute_options
+        self.cache_key = cache_key
+        self.extensions = extensions
+        # replica the operation reads from; None for the primary
+        self.read_alias = read_alias
+
+    @property
+    def is_mutation(self):
+        return (
+            self.operation_ast is not None
+            and self.operation_ast.operation == OperationType.MUTATION
+        )
+
+    def annotate(self, result):
+        if self.extensions:
+            result.extensions = {**(result.extensions or {}), **self.extensions}
+        return result
+
+    def store(self, result):
+        if self.cache_key is not None and not result.errors:
+            response_cache.store(
+                self.cache_key, self.execute_options['context_value'], result.data,
+                replica=self.read_alias is not None,
+            )
+
+    def reads(self):
+        return routing.reading_from(self.read_alias)
+
+    def wrote(self):
+        """After a mutation: keep the viewer's next reads on the primary."""
+        routing.pin(getattr(self.execute_options['context_value'], 'user', None))
+
+
+class GraphQLView(BaseGraphQLView):
+    """
+    GraphQLView that serves persisted queries, reuses parsed, validated
+    documents across requests and answers read operations from the
+    response cache.
+    """
+
+    @staticmethod
+    def get_extensions(request, data):
+        extensions = request.GET.get('extensions') or data.get('extensions')
+        if extensions and isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest('Extensions are invalid JSON.'))
+        return extensions
+
+    def authenticate_request(self, request):
+        """
+        Resolve the JWT in the Authorization header, if any. JWT
+        authentication normally happens lazily inside the first resolver;
+        doing it up front lets the view check the response cache and run
+        async resolvers, which cannot touch the database themselves.
+        Raises JSONWebTokenError for an invalid or expired token.
+        """
+        user = getattr(request, 'user', None)
+        if get_http_authorization(request) and not (user and user.is_authenticated):
+            user = authenticate(request=request)
+            if user is not None:
+                request.user = user
+        return user
+
+    def get_response_cache_key(self, request, query, operation_name, variables):
+        """
+        Key for the viewer's cached response, or None when the request cannot
+        use the cache, so an expired or invalid token is never answered from
+        the cache.
+        """
+        try:
+            user = self.authenticate_request(request)
+        except JSONWebTokenError:
+            return None
+        if get_http_authorization(request) and not (user and user.is_authenticated):
+            return None
+        return response_cache.response_key(query_hash(query), operation_name, variables, user)
+
+    def get_read_alias(self, request):
+        """The replica a query operation reads from, or None for the primary."""
+        if not routing.replicas():
+            return None
+        try:
+            user = self.authenticate_request(request)
+        except JSONWebTokenError:
+            return None
+        return routing.read_alias(user)
+
+    def get_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        return self.format_response(request, execution_result, id, show_graphiql)
+
+    def format_response(self, request, execution_result, id=None, show_graphiql=False):
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+
+        status_code = 200
+        if execution_result:
+            response = {}
+
+            if execution_result.errors:
+                set_rollback()
+                response['errors'] = [
+                    self.format_error(e) for e in execution_result.errors
+                ]
+
+            if execution_result.errors and any(
+                not getattr(e, 'path', None) for e in execution_result.errors
+            ):
+                status_code = 400
+            else:
+                response['data'] = execution_result.data
+
+            if execution_result.extensions:
+                response['extensions'] = execution_result.extensions
+
+            if self.batch:
+                response['id'] = id
+                response['status'] = status_code
+
+            result = self.json_encode(request, response, pretty=show_graphiql)
+        else:
+            result = None
+
+        return result, status_code
+
+    def prepare_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        """
+        Everything up to execution: persisted query lookup, parsing and
+        validation, and the response cache lookup. Returns a PreparedOperation,
+        or the ExecutionResult (or None, for GraphiQL) to answer with.
+        """
+        try:
+            query = resolve_persisted_query(query, self.get_extensions(request, data))
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e])
+
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest('Must provide query string.'))
+
+        schema = self.schema.graphql_schema
+
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        try:
+            document, validation_errors = get_document(
+                schema,
+                query,
+                self.validation_rules,
+                graphene_settings.MAX_VALIDATION_ERRORS,
+            )
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e])
+
+        operation_ast = get_operation_ast(document, operation_name)
+
+        if (
+            request.method.lower() == 'get'
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ['POST'],
+                    'Can only perform a {} operation from a POST request.'.format(
+                        operation_ast.operation.value
+                    ),
+                )
+            )
+
+        if validation_errors:
+            return ExecutionResult(data=None, errors=validation_errors)
+
+        # reject over-budget operations before anything touches the database
+        extensions = None
+        if operation_ast is not None:
+            cost, cost_errors = check_limits(schema, document, operation_ast, variables)
+            extensions = {'cost': cost_extension(cost)}
+            if cost_errors:
+                return ExecutionResult(errors=cost_errors, extensions=extensions)
+
+        context = self.get_context(request)
+        cache_key = None
+        if (
+            response_cache.enabled()
+            and operation_ast is not None
+            and operation_ast.operation == OperationType.QUERY
+        ):
+            cache_key = self.get_response_cache_key(request, query, operation_name, variables)
+            if cache_key is not None:
+                data = response_cache.get(cache_key)
+                if data is not None:
+                    return ExecutionResult(data=data, extensions=extensions)
+                response_cache.begin(context)
+
+        execute_options = {
+            'root_value': self.get_root_value(request),
+            'context_value': context,
+            'variable_values': variables,
+            'operation_name': operation_name,
+            'middleware': self.get_middleware(request),
+        }
+        if self.execution_context_class:
+            execute_options['execution_context_class'] = self.execution_context_class
+
+        read_alias = None
+        if operation_ast is not None and operation_ast.operation == OperationType.QUERY:
+            read_alias = self.get_read_alias(request)
+
+        return PreparedOperation(
+            schema, document, operation_ast, execute_options, cache_key, extensions, read_alias
+        )
+
+    def execute_prepared(self, operation):
+        request = operation.execute_options['context_value']
+        try:
+            if operation.is_mutation and (
+                graphene_settings.ATOMIC_MUTATIONS is True
+                or connection.settings_dict.get('ATOMIC_MUTATIONS', False) is True
+            ):
+                with transaction.atomic():
+                    result = execute(operation.schema, operation.document, **operation.execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                operation.wrote()
+                return operation.annotate(result)
+
+            with operation.reads():
+                result = execute(operation.schema, operation.document, **operation.execute_options)
+            if operation.is_mutation:
+                operation.wrote()
+            operation.store(result)
+            return operation.annotate(result)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        with tracing.trace(operation_name) as trace:
+            result = operation = self.prepare_graphql_request(
+                request, data, query, variables, operation_name, show_graphiql
+            )
+            if isinstance(operation, PreparedOperation):
+                if trace is not None:
+                    trace.set_operation(operation.operation_ast)
+                result = self.execute_prepared(operation)
+        return tracing.annotate(result, trace)
+
+
+class AsyncGraphQLView(GraphQLView):
+    """
+    GraphQLView for ASGI deployments. Queries execute on the event loop with
+    async resolvers and loaders, so a request waiting on the database holds
+    no thread. Mutations, GraphiQL and batches take the synchronous path in
+    a worker thread.
+    """
+
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if request.method.lower() not in ('get', 'post'):
+                raise HttpError(
+                    HttpResponseNotAllowed(
+                        ['GET', 'POST'], 'GraphQL only supports GET and POST requests.'
+                    )
+                )
+
+            data = self.parse_body(request)
+            if self.batch or (self.graphiql and self.can_display_graphiql(request, data)):
+                return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+            # resolvers read the user on the event loop, where the lazy
+            # session lookup is not allowed
+            if hasattr(request, 'auser'):
+                request.user = await request.auser()
+            query, variables, operation_name, id = self.get_graphql_params(request, data)
+            execution_result = await self.aexecute_graphql_request(
+                request, data, query, variables, operation_name
+            )
+            result, status_code = self.format_response(request, execution_result, id)
+            return HttpResponse(status=status_code, content=result, content_type='application/json')
+
+        except HttpError as e:
+            response = e.response
+            response['Content-Type'] = 'application/json'
+            response.content = self.json_encode(
+                request, {'errors': [self.format_error(e)]}
+            )
+            return response
+
+    async def aexecute_graphql_request(self, request, data, query, variables, operation_name):
+        with tracing.trace(operation_name) as trace:
+            result = await self._aexecute_graphql_request(
+                request, data, query, variables, operation_name, trace
+            )
+        return tracing.annotate(result, trace)
+
+    async def _aexecute_graphql_request(self, request, data, query, variables, operation_name,
+                                        trace):
+        try:
+            await sync_to_async(self.authenticate_request)(request)
+        except JSONWebTokenError as e:
+            return ExecutionResult(errors=[GraphQLError(str(e))])
+
+        operation = await sync_to_async(self.prepare_graphql_request)(
+            request, data, query, variables, operation_name
+        )
+        if not isinstance(operation, PreparedOperation):
+            return operation
+        if trace is not None:
+            trace.set_operation(operation.operation_ast)
+        if operation.is_mutation:
+            return await sync_to_async(self.execute_prepared)(operation)
+
+        try:
+            with operation.reads():
+                result = execute(operation.schema, operation.document, **operation.execute_options)
+                if isawaitable(result):
+                    result = await result
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+        await sync_to_async(operation.store)(result)
+        return operation.annotate(result)
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. When ``GRAPHENE['METRICS_TOKEN']`` is set,
+    requests must send it as ``Authorization: Bearer <token>``.
+    """
+    token = graphene_setting('METRICS_TOKEN')
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
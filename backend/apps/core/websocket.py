@@ -0,0 +1,225 @@
+"""
+GraphQL subscriptions over WebSocket (the ``graphql-transport-ws`` protocol
+spoken by the ``graphql-ws`` client).
+
+``GraphQLWebSocketApp`` is a plain ASGI application for ``websocket``
+scopes; ``config/asgi.py`` routes them here and everything else to Django.
+Clients authenticate by sending their JWT in the ``connection_init``
+payload, e.g. ``{"authorization": "JWT <token>"}``. Only subscription
+operations are accepted; queries and mutations go over HTTP.
+"""
+
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.db import close_old_connections
+from graphene_django.settings import graphene_settings
+from graphql import ExecutionResult, GraphQLError, OperationType, get_operation_ast, subscribe
+from graphql_jwt.exceptions import JSONWebTokenError
+from graphql_jwt.settings import jwt_settings
+from graphql_jwt.shortcuts import get_user_by_token
+
+from .conf import graphene_setting
+from .cost import check_limits
+from .documents import get_document
+
+PROTOCOL = 'graphql-transport-ws'
+
+
+class SubscriptionContext:
+    """``info.context`` for one subscription operation."""
+
+    def __init__(self, user, scope):
+        self.user = user
+        self.scope = scope
+
+
+class GraphQLWebSocketApp:
+
+    def __init__(self, schema=None, connection_init_timeout=None):
+        self._schema = schema
+        if connection_init_timeout is None:
+            connection_init_timeout = graphene_setting('WEBSOCKET_INIT_TIMEOUT', 3)
+        self.connection_init_timeout = connection_init_timeout
+
+    @property
+    def schema(self):
+        if self._schema is None:
+            self._schema = graphene_settings.SCHEMA
+        return self._schema
+
+    async def __call__(self, scope, receive, send):
+        await GraphQLWebSocketConnection(self, scope, receive, send).run()
+
+
+class GraphQLWebSocketConnection:
+
+    def __init__(self, app, scope, receive, send):
+        self.app = app
+        self.scope = scope
+        self.receive = receive
+        self.send = send
+        self.user = AnonymousUser()
+        self.initialised = False
+        self.acknowledged = False
+        self.closed = False
+        self.operations = {}
+
+    async def run(self):
+        message = await self.receive()
+        if message['type'] != 'websocket.connect':
+            return
+        if PROTOCOL not in self.scope.get('subprotocols', ()):
+            await self.close(4406, 'Subprotocol not acceptable')
+            return
+        await self.send({'type': 'websocket.accept', 'subprotocol': PROTOCOL})
+
+        timeout = asyncio.create_task(self.close_unless_acknowledged())
+        try:
+            while not self.closed:
+                message = await self.receive()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                if message['type'] == 'websocket.receive':
+                    await self.handle(message.get('text') or message.get('bytes'))
+        finally:
+            self.closed = True
+            timeout.cancel()
+            operations = list(self.operations.values())
+            for task in operations:
+                task.cancel()
+            await asyncio.gather(*operations, return_exceptions=True)
+            await sync_to_async(close_old_connections)()
+
+    async def close_unless_acknowledged(self):
+        await asyncio.sleep(self.app.connection_init_timeout)
+        if not self.acknowledged:
+            await self.close(4408, 'Connection initialisation timeout')
+
+    async def close(self, code, reason):
+        if not self.closed:
+            self.closed = True
+            await self.send({'type': 'websocket.close', 'code': code, 'reason': reason})
+
+    async def send_json(self, message):
+        if not self.closed:
+            await self.send({'type': 'websocket.send', 'text': json.dumps(message)})
+
+    async def handle(self, text):
+        try:
+            message = json.loads(text)
+            message_type = message['type']
+        except (TypeError, ValueError, KeyError):
+            await self.close(4400, 'Invalid message received')
+            return
+
+        if message_type == 'connection_init':
+            await self.connection_init(message.get('payload') or {})
+        elif message_type == 'ping':
+            await self.send_json({'type': 'pong'})
+        elif message_type == 'pong':
+            pass
+        elif message_type == 'subscribe':
+            await self.start(message.get('id'), message.get('payload'))
+        elif message_type == 'complete':
+            task = self.operations.pop(message.get('id'), None)
+            if task is not None:
+                task.cancel()
+        else:
+            await self.close(4400, f'Unknown message type {message_type!r}')
+
+    async def connection_init(self, payload):
+        if self.initialised:
+            await self.close(4429, 'Too many initialisation requests')
+            return
+        self.initialised = True
+        try:
+            self.user = await self.authenticate(payload)
+        except JSONWebTokenError:
+            await self.close(4403, 'Forbidden')
+            return
+        self.acknowledged = True
+        await self.send_json({'type': 'connection_ack'})
+
+    async def authenticate(self, payload):
+        credentials = isinstance(payload, dict) and payload.get('authorization')
+        if not credentials:
+            return AnonymousUser()
+        prefix, _, token = credentials.partition(' ')
+        if prefix.lower() != jwt_settings.JWT_AUTH_HEADER_PREFIX.lower() or not token:
+            raise JSONWebTokenError('Invalid authorization')
+        user = await sync_to_async(get_user_by_token)(token)
+        if user is None:
+            raise JSONWebTokenError('User not found')
+        return user
+
+    async def start(self, id, payload):
+        if not self.acknowledged:
+            await self.close(4401, 'Unauthorized')
+            return
+        if not isinstance(id, str) or not isinstance(payload, dict):
+            await self.close(4400, 'Invalid message received')
+            return
+        if id in self.operations:
+            await self.close(4409, f'Subscriber for {id} already exists')
+            return
+        self.operations[id] = asyncio.create_task(self.execute(id, payload))
+
+    async def execute(self, id, payload):
+        try:
+            result = await self.subscribe(payload)
+            if isinstance(result, ExecutionResult):
+                await self.send_json({
+                    'type': 'error',
+                    'id': id,
+                    'payload': [error.formatted for error in result.errors],
+                })
+                return
+            try:
+                async for item in result:
+                    response = {'data': item.data}
+                    if item.errors:
+                        response['errors'] = [error.formatted for error in item.errors]
+                    await self.send_json({'type': 'next', 'id': id, 'payload': response})
+            finally:
+                await result.aclose()
+            await self.send_json({'type': 'complete', 'id': id})
+        finally:
+            if self.operations.get(id) is asyncio.current_task():
+                del self.operations[id]
+
+    async def subscribe(self, payload):
+        """The event stream for ``payload``, or an ExecutionResult with errors."""
+        schema = self.app.schema.graphql_schema
+        query = payload.get('query')
+        if not isinstance(query, str):
+            return ExecutionResult(errors=[GraphQLError('Must provide query string.')])
+        try:
+            document, errors = get_document(
+                schema, query, max_errors=graphene_settings.MAX_VALIDATION_ERRORS
+            )
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e])
+        if errors:
+            return ExecutionResult(errors=errors)
+
+        operation_name = payload.get('operationName')
+        operation_ast = get_operation_ast(document, operation_name)
+        if operation_ast is None or operation_ast.operation != OperationType.SUBSCRIPTION:
+            return ExecutionResult(errors=[GraphQLError(
+                'Only subscription operations are accepted over WebSocket; '
+                'send queries and mutations over HTTP.'
+            )])
+        _, errors = check_limits(schema, document, operation_ast, payload.get('variables'))
+        if errors:
+            return ExecutionResult(errors=errors)
+
+        return await subscribe(
+            schema,
+            document,
+            context_value=SubscriptionContext(self.user, self.scope),
+            variable_values=payload.get('variables'),
+            operation_name=operation_name,
+        )
@@ -1,4 +1,12 @@
 from django.contrib import admin
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+from apps.core.response_cache import invalidate
+
+from apps.tasks.models import ProjectTaskStats
+
+from .deletion import soft_delete
 from .models import Project
 
 
@@ -17,6 +25,33 @@ class ProjectAdmin(admin.ModelAdmin):
         ('Timestamps', {'fields': ('created_at', 'updated_at')}),
     )
     
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            ProjectTaskStats.objects.create(project=obj)
+        invalidate(*obj.invalidation_scopes())
+    
+    def delete_model(self, request, obj):
+        # like deleteProject: the tasks are purged by purge_deleted_projects
+        self.delete_queryset(request, Project.objects.filter(pk=obj.pk))
+    
+    def delete_queryset(self, request, queryset):
+        deleted = soft_delete(Project.objects.filter(pk__in=[obj.pk for obj in queryset]))
+        invalidate(*(scope for obj in deleted for scope in obj.deletion_scopes()))
+    
+    def get_deleted_objects(self, objs, request):
+        # the confirmation page would otherwise collect every task to list it
+        return [str(obj) for obj in objs], {'projects': len(objs)}, set(), []
+    
+    def get_queryset(self, request):
+        # read the maintained counters instead of grouping over every task
+        return super().get_queryset(request).annotate(task_total=Coalesce(
+            F('task_stats__backlog') + F('task_stats__todo')
+            + F('task_stats__doing') + F('task_stats__done'),
+            0,
+        ))
+    
     def task_count(self, obj):
-        return obj.task_count
+        return obj.task_total
     task_count.short_description = 'Tasks'
+    task_count.admin_order_field = 'task_total'
@@ -0,0 +1,94 @@
+"""
+Project deletion in two steps.
+
+``soft_delete()`` runs in the request: it stamps ``deleted_at``, which hides
+the project and its tasks from every query at once, and records a
+``ProjectDeletion``. Its cost does not depend on the project's size.
+
+``purge()`` runs in the ``purge_deleted_projects`` worker: it deletes the
+tasks a bounded batch per transaction, counting progress on the
+``ProjectDeletion``, then their history and the project row itself. No
+transaction holds more than one batch of row locks.
+"""
+
+import time
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.core.db import update_returning
+from apps.core.response_cache import invalidate, project_scope
+from apps.tasks.models import ArchivedTask, ProjectTaskStats, Task, TaskEvent
+
+from .models import Project, ProjectDeletion
+
+
+def soft_delete(queryset):
+    """
+    Delete the projects of ``queryset`` (a ``Project.objects`` queryset, so
+    projects already deleted are skipped) and queue the purge of their
+    tasks. Returns the deleted projects, each with its ``deletion``.
+    """
+    with transaction.atomic():
+        projects = update_returning(queryset, deleted_at=timezone.now())
+        if projects:
+            totals = {
+                stats.project_id: stats.total
+                for stats in ProjectTaskStats.objects.filter(project_id__in=[p.id for p in projects])
+            }
+            for project in projects:
+                project.deletion = ProjectDeletion(
+                    project_id=project.id,
+                    name=project.name,
+                    owner_id=project.owner_id,
+                    tasks_total=totals.get(project.id, 0),
+                )
+            ProjectDeletion.objects.bulk_create(project.deletion for project in projects)
+    return projects
+
+
+def pending():
+    """Deletions whose purge has not finished, oldest first."""
+    return ProjectDeletion.objects.filter(finished_at__isnull=True).order_by('requested_at')
+
+
+def purge(deletion, batch_size=1000, sleep=0.0, progress=None):
+    """
+    Delete the tasks of ``deletion``'s project ``batch_size`` at a time, then
+    the project. ``progress(deletion)`` is called after every batch. Safe to
+    interrupt and run again.
+    """
+    project_id = deletion.project_id
+    for model in (Task, ArchivedTask, TaskEvent):
+        # the default managers hide these rows
+        rows = model._base_manager.filter(project_id=project_id)
+        # the tasks' history goes last and is not part of the progress
+        counted = model is not TaskEvent
+        while True:
+            with transaction.atomic():
+                ids = list(rows.values_list('id', flat=True)[:batch_size])
+                if not ids:
+                    break
+                model._base_manager.filter(id__in=ids).delete()
+                if counted:
+                    ProjectDeletion.objects.filter(pk=deletion.pk).update(
+                        tasks_deleted=F('tasks_deleted') + len(ids)
+                    )
+            if counted:
+                deletion.tasks_deleted += len(ids)
+                # progress is read through the project's cache scope
+                invalidate(project_scope(project_id))
+                if progress:
+                    progress(deletion)
+            if sleep:
+                time.sleep(sleep)
+
+    with transaction.atomic():
+        ProjectTaskStats.objects.filter(project_id=project_id).delete()
+        Project._base_manager.filter(id=project_id).delete()
+        deletion.finished_at = timezone.now()
+        ProjectDeletion.objects.filter(pk=deletion.pk).update(finished_at=deletion.finished_at)
+    invalidate(project_scope(project_id))
+    if progress:
+        progress(deletion)
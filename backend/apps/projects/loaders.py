@@ -0,0 +1,17 @@
+from apps.core.dataloader import DataLoader
+
+from .models import Project
+
+
+class ProjectLoader(DataLoader):
+    model = 'projects.Project'
+    sources = (
+        ('tasks.Task', 'project_id'),
+        ('tasks.ArchivedTask', 'project_id'),
+    )
+
+    def batch_load(self, keys):
+        return {project.id: project for project in Project.objects.filter(id__in=keys)}
+
+    async def abatch_load(self, keys):
+        return {project.id: project async for project in Project.objects.filter(id__in=keys)}
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.projects.deletion import pending, purge
+
+
+class Command(BaseCommand):
+    help = (
+        'Purge the tasks of deleted projects in batches, then the projects '
+        'themselves. Runs once by default; with --watch it keeps polling for '
+        'new deletions, as a background worker. Run a single worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--sleep', type=float, default=0.0, metavar='SECONDS',
+            help='Pause between batches, to leave room for other writers.',
+        )
+        parser.add_argument(
+            '--watch', type=float, metavar='SECONDS',
+            help='Keep running, looking for new deletions this often.',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        while True:
+            for deletion in pending():
+                self.purge(deletion, options)
+            if options['watch'] is None:
+                break
+            time.sleep(options['watch'])
+
+    def purge(self, deletion, options):
+        started = reported = time.perf_counter()
+
+        def progress(deletion):
+            nonlocal reported
+            now = time.perf_counter()
+            if deletion.finished_at is None and now - reported < 5:
+                return
+            reported = now
+            self.stdout.write(
+                f'{deletion.name}: {deletion.tasks_deleted} of {deletion.tasks_total} tasks deleted'
+            )
+
+        self.stdout.write(f'Purging {deletion.name} ({deletion.project_id})')
+        purge(deletion, options['batch_size'], options['sleep'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged {deletion.name} in {time.perf_counter() - started:.1f}s.'
+        ))
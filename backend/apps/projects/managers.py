@@ -0,0 +1,11 @@
+from django.db import models
+
+
+class ProjectManager(models.Manager):
+    """
+    Leaves out deleted projects, which stay in the table until the purge
+    worker has removed their tasks. ``Project._base_manager`` sees them.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_project_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectDeletion',
+            fields=[
+                ('project_id', models.UUIDField(help_text='The deleted project; not a foreign key, the project row goes away', primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('requested_at', models.DateTimeField(auto_now_add=True)),
+                ('tasks_total', models.IntegerField(default=0, help_text='Tasks (live and archived) the project had when it was deleted')),
+                ('tasks_deleted', models.IntegerField(default=0)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'project deletion',
+                'verbose_name_plural': 'project deletions',
+                'ordering': ['requested_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, help_text='When this project was deleted; its tasks are purged in the background', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', False)), fields=['deleted_at'], name='project_deleted_idx'),
+        ),
+        migrations.AddField(
+            model_name='projectdeletion',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='project_deletions', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
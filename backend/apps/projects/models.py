@@ -6,6 +6,10 @@ import uuid
 from django.db import models
 from django.conf import settings
 
+from apps.core.response_cache import project_scope, user_scope
+
+from .managers import ProjectManager
+
 
 class Project(models.Model):
     
@@ -44,14 +48,84 @@ class Project(models.Model):
         help_text="When this project was last modified"
     )
     
+    deleted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When this project was deleted; its tasks are purged in the background"
+    )
+    
+    objects = ProjectManager()
+    
     class Meta:
         verbose_name = 'project'
         verbose_name_plural = 'projects'
         ordering = ['-created_at']
+        indexes = [
+            # allProjects
+            models.Index(fields=['-created_at', '-id'], name='project_created_idx'),
+            # myProjects
+            models.Index(fields=['owner', '-created_at', '-id'], name='project_owner_created_idx'),
+            # the few projects waiting to be purged, excluded from every query
+            models.Index(
+                fields=['deleted_at'],
+                name='project_deleted_idx',
+                condition=models.Q(deleted_at__isnull=False),
+            ),
+        ]
     
     def __str__(self):
         return self.name
     
+    def cache_scope(self):
+        return project_scope(self.pk)
+    
+    def invalidation_scopes(self):
+        return ['projects', project_scope(self.pk), user_scope(self.owner_id)]
+    
+    def deletion_scopes(self):
+        # cached task rows carry their project's scope, so bumping it also
+        # drops the cascaded tasks from assignees' cached lists
+        return self.invalidation_scopes() + ['tasks']
+    
     @property
     def task_count(self):
         return self.tasks.count()
+
+
+class ProjectDeletion(models.Model):
+    """
+    Progress of purging a deleted project. The row outlives the project so
+    its owner can follow the purge to the end.
+    """
+    
+    project_id = models.UUIDField(
+        primary_key=True,
+        help_text="The deleted project; not a foreign key, the project row goes away"
+    )
+    
+    name = models.CharField(max_length=200)
+    
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='project_deletions'
+    )
+    
+    requested_at = models.DateTimeField(auto_now_add=True)
+    
+    tasks_total = models.IntegerField(
+        default=0,
+        help_text="Tasks (live and archived) the project had when it was deleted"
+    )
+    
+    tasks_deleted = models.IntegerField(default=0)
+    
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'project deletion'
+        verbose_name_plural = 'project deletions'
+        ordering = ['requested_at']
+    
+    def __str__(self):
+        return f"Deletion of {self.name} ({self.tasks_deleted}/{self.tasks_total})"
@@ -1,8 +1,28 @@
 import graphene
-from graphene_django import DjangoObjectType
+from django.db import transaction
+from django.utils import timezone
+from graphene_django import DjangoListField, DjangoObjectType
+from graphene_django.settings import graphene_settings
 
-from .models import Project
-from apps.accounts.schema import UserType
+from .deletion import soft_delete
+from .models import Project, ProjectDeletion
+from apps.accounts.loaders import UserLoader
+from apps.core.aio import fetch_first, then
+from apps.core.dataloader import get_loader, prime
+from apps.core.db import update_returning
+from apps.core.pagination import KeysetConnectionField, check_limit
+from apps.core.projection import only_selected, selected_columns
+from apps.core.response_cache import depends_on, invalidate, project_scope, user_scope
+from apps.core.subscriptions import ChangeActionEnum, changes, publish_change
+from apps.tasks.loaders import ProjectTaskStatsLoader, TasksByProjectLoader
+from apps.tasks.models import ProjectTaskStats, Task
+
+
+class TaskCountByStatusType(graphene.ObjectType):
+    backlog = graphene.Int()
+    todo = graphene.Int()
+    doing = graphene.Int()
+    done = graphene.Int()
 
 
 class ProjectType(DjangoObjectType):
@@ -18,36 +38,109 @@ class ProjectType(DjangoObjectType):
             'tasks',
         )
     
+    tasks = DjangoListField(
+        'apps.tasks.schema.TaskType',
+        first=graphene.Int(description='At most this many tasks (default and maximum: RELAY_CONNECTION_MAX_LIMIT)'),
+        description='The newest tasks of the project',
+    )
     task_count = graphene.Int()
+    task_count_by_status = graphene.Field(TaskCountByStatusType)
+    
+    column_dependencies = {'task_count': (), 'task_count_by_status': ()}
+    # read through the counters loader
+    field_costs = {'task_count': 1}
+    
+    def resolve_owner(self, info):
+        return get_loader(info.context, UserLoader).load(self.owner_id)
+    
+    def resolve_tasks(self, info, first=None):
+        from apps.tasks.schema import TaskType
+        
+        # a hard cap, so that the cost analysis can count on it
+        max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+        check_limit('first', first, max_limit)
+        limit = max_limit if first is None else first
+        loader = get_loader(info.context, TasksByProjectLoader)
+        loader.select(selected_columns(Task, info, TaskType), limit)
+        return then(loader.load(self.id), lambda tasks: tasks[:limit])
     
     def resolve_task_count(self, info):
+        stats = get_loader(info.context, ProjectTaskStatsLoader).load(self.id)
+        return then(stats, lambda stats: stats.total)
+    
+    def resolve_task_count_by_status(self, info):
+        # the counter row has backlog / todo / doing / done attributes
+        return get_loader(info.context, ProjectTaskStatsLoader).load(self.id)
 
-        return self.task_count
 
+class ProjectDeletionType(DjangoObjectType):
+    class Meta:
+        model = ProjectDeletion
+        fields = (
+            'project_id',
+            'name',
+            'requested_at',
+            'tasks_total',
+            'tasks_deleted',
+            'finished_at',
+        )
+    
+    progress = graphene.Float(description='Share of the tasks purged so far, from 0 to 1')
+    
+    def resolve_progress(self, info):
+        if self.finished_at is not None:
+            return 1.0
+        return min(self.tasks_deleted / self.tasks_total, 1.0) if self.tasks_total else 0.0
+
+
+class ProjectConnection(graphene.relay.Connection):
+    class Meta:
+        node = ProjectType
+
+
+class ProjectChangedType(graphene.ObjectType):
+    action = graphene.Field(ChangeActionEnum, required=True)
+    id = graphene.UUID(required=True)
+    project = graphene.Field(ProjectType, description='Null when the project was deleted')
 
 
 # QUERIES
 class Query(graphene.ObjectType):
-    all_projects = graphene.List(ProjectType)
+    all_projects = KeysetConnectionField(ProjectConnection)
     
-    my_projects = graphene.List(ProjectType)
+    my_projects = KeysetConnectionField(ProjectConnection)
     
     project = graphene.Field(ProjectType, id=graphene.UUID(required=True))
     
+    project_deletion = graphene.Field(
+        ProjectDeletionType,
+        id=graphene.UUID(required=True),
+        description="Purge progress of one of the viewer's deleted projects"
+    )
+    
     def resolve_all_projects(self, info):
+        depends_on(info.context, 'projects')
         return Project.objects.all()
     
     def resolve_my_projects(self, info):
         user = info.context.user
         if user.is_authenticated:
+            depends_on(info.context, user_scope(user.id))
             return Project.objects.filter(owner=user)
-        return []
+        return Project.objects.none()
     
     def resolve_project(self, info, id):
-        try:
-            return Project.objects.get(id=id)
-        except Project.DoesNotExist:
+        depends_on(info.context, project_scope(id))
+        project = fetch_first(only_selected(Project.objects.filter(id=id), info, ProjectType))
+        return then(project, lambda project: prime(info.context, [project])[0] if project else None)
+    
+    def resolve_project_deletion(self, info, id):
+        user = info.context.user
+        if not user.is_authenticated:
             return None
+        # the purge worker bumps the project's scope after every batch
+        depends_on(info.context, project_scope(id))
+        return fetch_first(ProjectDeletion.objects.filter(project_id=id, owner=user))
 
 
 
@@ -72,11 +165,15 @@ class CreateProjectMutation(graphene.Mutation):
             )
         
         try:
-            project = Project.objects.create(
-                name=name,
-                description=description,
-                owner=user
-            )
+            with transaction.atomic():
+                project = Project.objects.create(
+                    name=name,
+                    description=description,
+                    owner=user
+                )
+                ProjectTaskStats.objects.create(project=project)
+            invalidate(*project.invalidation_scopes())
+            publish_change('projects', ChangeActionEnum.CREATED.value, project)
             
             return CreateProjectMutation(
                 project=project,
@@ -111,28 +208,29 @@ class UpdateProjectMutation(graphene.Mutation):
                 message='Authentication required'
             )
         
-        try:
-            project = Project.objects.get(id=id)
-        except Project.DoesNotExist:
-            return UpdateProjectMutation(
-                project=None,
-                success=False,
-                message='Project not found'
-            )
+        changes = {'updated_at': timezone.now()}
+        if name is not None:
+            changes['name'] = name
+        if description is not None:
+            changes['description'] = description
+        
+        updated = update_returning(Project.objects.filter(id=id, owner=user), **changes)
         
-        if project.owner != user:
+        if not updated:
+            if Project.objects.filter(id=id).exists():
+                message = 'You do not have permission to update this project'
+            else:
+                message = 'Project not found'
             return UpdateProjectMutation(
                 project=None,
                 success=False,
-                message='You do not have permission to update this project'
+                message=message
             )
         
-        if name is not None:
-            project.name = name
-        if description is not None:
-            project.description = description
-        
-        project.save()
+        project = updated[0]
+        # 'projects': searches across projects may now match (or miss) it
+        invalidate('projects', project_scope(project.id))
+        publish_change('projects', ChangeActionEnum.UPDATED.value, project)
         
         return UpdateProjectMutation(
             project=project,
@@ -145,6 +243,10 @@ class DeleteProjectMutation(graphene.Mutation):
     class Arguments:
         id = graphene.UUID(required=True)
     
+    deletion = graphene.Field(
+        ProjectDeletionType,
+        description='Progress of the purge of the project\'s tasks'
+    )
     success = graphene.Boolean()
     message = graphene.String()
     
@@ -157,26 +259,27 @@ class DeleteProjectMutation(graphene.Mutation):
                 message='Authentication required'
             )
         
-        try:
-            project = Project.objects.get(id=id)
-        except Project.DoesNotExist:
-            return DeleteProjectMutation(
-                success=False,
-                message='Project not found'
-            )
+        # hidden at once; the tasks are purged by purge_deleted_projects
+        deleted = soft_delete(Project.objects.filter(id=id, owner=user))
         
-        if project.owner != user:
+        if not deleted:
+            if Project.objects.filter(id=id).exists():
+                message = 'You do not have permission to delete this project'
+            else:
+                message = 'Project not found'
             return DeleteProjectMutation(
                 success=False,
-                message='You do not have permission to delete this project'
+                message=message
             )
         
-        project_name = project.name
-        project.delete()
+        project = deleted[0]
+        invalidate(*project.deletion_scopes())
+        publish_change('projects', ChangeActionEnum.DELETED.value, project)
         
         return DeleteProjectMutation(
+            deletion=project.deletion,
             success=True,
-            message=f'Project "{project_name}" deleted successfully'
+            message=f'Project "{project.name}" deleted successfully'
         )
 
 
@@ -184,3 +287,16 @@ class Mutation(graphene.ObjectType):
     create_project = CreateProjectMutation.Field()
     update_project = UpdateProjectMutation.Field()
     delete_project = DeleteProjectMutation.Field()
+
+
+class Subscription(graphene.ObjectType):
+    project_changed = graphene.Field(
+        ProjectChangedType,
+        id=graphene.UUID(description='Only report changes to this project'),
+        description='Projects created, updated or deleted from now on'
+    )
+    
+    async def subscribe_project_changed(root, info, id=None):
+        async for action, project_id, project in changes(info, 'projects', Project):
+            if id is None or project_id == id:
+                yield ProjectChangedType(action=action, id=project_id, project=project)
@@ -1,3 +1,264 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from apps.accounts.models import User
+from apps.core.testing import capture_sql, explain, is_scan_and_sort
+
+from apps.tasks.models import ArchivedTask, ProjectTaskStats, Task
+
+from .models import Project, ProjectDeletion
+
+
+class ProjectQueryPlanTests(TestCase):
+    """Each list resolver must be answered from an index, not a scan plus sort."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        other = User.objects.create_user(email='other@example.com', password='secret')
+        Project.objects.bulk_create([
+            Project(name=f'Project {i}', owner=cls.user if i % 2 else other)
+            for i in range(20)
+        ])
+
+    def assertIndexedPlan(self, query):
+        result, statements = capture_sql(query, user=self.user)
+        self.assertIsNone(result.errors)
+        table = Project._meta.db_table
+        sql = next(s for s in statements if f'FROM "{table}"' in s)
+        plan = explain(sql)
+        self.assertFalse(is_scan_and_sort(plan, table), f'{sql}\n{plan}')
+
+    def test_all_projects(self):
+        self.assertIndexedPlan('{ allProjects(first: 10) { edges { node { id } } } }')
+
+    def test_my_projects(self):
+        self.assertIndexedPlan('{ myProjects(first: 10) { edges { node { id } } } }')
+
+
+class ProjectLoaderTests(TestCase):
+    """Nested relations cost one query per level, whatever the number of rows."""
+
+    query = (
+        '{ allProjects(first: 50) { edges { node { name owner { email } '
+        'tasks { title assignee { email } } } } } }'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(email=f'user{i}@example.com', password='secret') for i in range(3)
+        ]
+
+    def add_projects(self, count):
+        for i in range(count):
+            project = Project.objects.create(name=f'Project {i}', owner=self.users[i % 3])
+            Task.objects.bulk_create([
+                Task(title=f'Task {j}', description='Long text', project=project,
+                     assignee=self.users[j % 3])
+                for j in range(3)
+            ])
+
+    def test_nested_relations_use_a_fixed_number_of_queries(self):
+        self.add_projects(2)
+        # projects, their owners, their tasks, the tasks' assignees
+        with self.assertNumQueries(4):
+            result, statements = capture_sql(self.query, user=self.users[0])
+        self.assertIsNone(result.errors)
+        edges = result.data['allProjects']['edges']
+        self.assertEqual(len(edges), 2)
+        self.assertEqual(len(edges[0]['node']['tasks']), 3)
+        self.assertIn(edges[0]['node']['tasks'][0]['assignee']['email'], [u.email for u in self.users])
+        tasks_sql = next(sql for sql in statements if 'FROM "tasks_task"' in sql)
+        self.assertNotIn('"description"', tasks_sql)
+
+        self.add_projects(6)
+        result, statements = capture_sql(self.query, user=self.users[0])
+        self.assertEqual(len(result.data['allProjects']['edges']), 8)
+        # every assignee is now also an owner, already loaded by the owners' query
+        self.assertLessEqual(len(statements), 4)
+
+    def test_wider_selection_refetches_once(self):
+        self.add_projects(2)
+        with self.assertNumQueries(3):
+            result, _ = capture_sql(
+                '{ allProjects(first: 50) { edges { node { a: tasks { title } '
+                'b: tasks { title description } } } } }',
+                user=self.users[0],
+            )
+        node = result.data['allProjects']['edges'][0]['node']
+        self.assertEqual(node['b'][0]['description'], 'Long text')
+
+    def test_tasks_are_capped(self):
+        self.add_projects(2)
+        result, statements = capture_sql(
+            '{ allProjects(first: 50) { edges { node { name tasks(first: 2) { title } } } } }',
+            user=self.users[0],
+        )
+        self.assertIsNone(result.errors)
+        # the cap applies in SQL, not after loading every task
+        self.assertIn('ROW_NUMBER()', next(sql for sql in statements if 'FROM "tasks_task"' in sql))
+        for edge in result.data['allProjects']['edges']:
+            self.assertEqual(len(edge['node']['tasks']), 2)
+
+        result, _ = capture_sql(
+            '{ allProjects(first: 50) { edges { node { tasks(first: 101) { title } } } } }',
+            user=self.users[0],
+        )
+        self.assertEqual(
+            result.errors[0].message, 'Requesting 101 records exceeds the "first" limit of 100 records'
+        )
+
+    def test_task_count_by_status(self):
+        self.add_projects(3)
+        project = Project.objects.get(name='Project 0')
+        Task.objects.filter(project=project, title='Task 0').update(status='DONE')
+        Task.objects.filter(project=project, title='Task 1').update(status='DOING')
+        ProjectTaskStats.objects.recount()
+        with self.assertNumQueries(2):
+            result, _ = capture_sql(
+                '{ allProjects(first: 50) { edges { node { name taskCount '
+                'taskCountByStatus { backlog todo doing done } } } } }',
+                user=self.users[0],
+            )
+        counts = {
+            edge['node']['name']: (edge['node']['taskCount'], edge['node']['taskCountByStatus'])
+            for edge in result.data['allProjects']['edges']
+        }
+        self.assertEqual(counts['Project 0'], (3, {'backlog': 1, 'todo': 0, 'doing': 1, 'done': 1}))
+        self.assertEqual(counts['Project 1'], (3, {'backlog': 3, 'todo': 0, 'doing': 0, 'done': 0}))
+
+
+class ProjectMutationQueryCountTests(TestCase):
+    """Project writes are conditional statements scoped to the owner."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        cls.other = User.objects.create_user(email='other@example.com', password='secret')
+
+    def setUp(self):
+        self.project = Project.objects.create(name='Board', owner=self.user)
+        Task.objects.create(title='Draft', project=self.project)
+
+    def test_create_project(self):
+        result, statements = capture_sql(
+            'mutation { createProject(name: "New") { success project { name } } }',
+            user=self.user,
+        )
+        self.assertTrue(result.data['createProject']['success'])
+        # the project and its task counter row
+        self.assertEqual([s.split()[0] for s in statements], ['INSERT', 'INSERT'])
+
+    def test_update_project(self):
+        result, statements = capture_sql(
+            'mutation($id: UUID!) { updateProject(id: $id, name: "Renamed") '
+            '{ success project { name description } } }',
+            user=self.user, variables={'id': str(self.project.id)},
+        )
+        self.assertEqual(result.data['updateProject']['project']['name'], 'Renamed')
+        self.assertEqual(len(statements), 1)
+
+    def test_update_project_of_another_owner(self):
+        result, _ = capture_sql(
+            'mutation($id: UUID!) { updateProject(id: $id, name: "Mine") { success message } }',
+            user=self.other, variables={'id': str(self.project.id)},
+        )
+        self.assertEqual(
+            result.data['updateProject']['message'],
+            'You do not have permission to update this project',
+        )
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.name, 'Board')
+
+    def test_delete_project(self):
+        result, statements = capture_sql(
+            'mutation($id: UUID!) { deleteProject(id: $id) { success message } }',
+            user=self.user, variables={'id': str(self.project.id)},
+        )
+        self.assertTrue(result.data['deleteProject']['success'])
+        # mark the project, read its task total, record the deletion; the
+        # tasks are left to the purge worker
+        self.assertEqual([s.split()[0] for s in statements], ['UPDATE', 'SELECT', 'INSERT'])
+        self.assertFalse(Task.objects.exists())
+        self.assertTrue(Task._base_manager.exists())
+
+    def test_delete_project_of_another_owner(self):
+        result, _ = capture_sql(
+            'mutation($id: UUID!) { deleteProject(id: $id) { success message } }',
+            user=self.other, variables={'id': str(self.project.id)},
+        )
+        self.assertEqual(
+            result.data['deleteProject']['message'],
+            'You do not have permission to delete this project',
+        )
+        self.assertTrue(Task.objects.exists())
+
+
+class ProjectDeletionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+
+    def setUp(self):
+        self.project = Project.objects.create(name='Big', owner=self.user)
+        self.kept = Project.objects.create(name='Kept', owner=self.user)
+        Task.objects.bulk_create(
+            [Task(title=f'Task {i}', project=self.project, status='DONE') for i in range(7)]
+            + [Task(title='Other', project=self.kept)]
+        )
+        ArchivedTask.objects.archive([Task.objects.filter(project=self.project).first().id])
+        ProjectTaskStats.objects.recount()
+
+    def delete(self):
+        result, _ = capture_sql(
+            'mutation($id: UUID!) { deleteProject(id: $id) { success deletion { tasksTotal progress } } }',
+            user=self.user, variables={'id': str(self.project.id)},
+        )
+        self.assertEqual(result.data['deleteProject']['deletion'], {'tasksTotal': 7, 'progress': 0.0})
+
+    def test_deleted_project_is_hidden_at_once(self):
+        self.delete()
+        result, _ = capture_sql(
+            'query($id: UUID!) { myProjects { edges { node { name } } } project(id: $id) { name } '
+            'allTasks(includeArchived: true) { edges { node { title } } } '
+            'tasksByProject(projectId: $id) { edges { node { title } } } }',
+            user=self.user, variables={'id': str(self.project.id)},
+        )
+        self.assertEqual(result.data, {
+            'myProjects': {'edges': [{'node': {'name': 'Kept'}}]},
+            'project': None,
+            'allTasks': {'edges': [{'node': {'title': 'Other'}}]},
+            'tasksByProject': {'edges': []},
+        })
+        result, _ = capture_sql(
+            'mutation($id: UUID!) { createTask(projectId: $id, title: "Late") { message } }',
+            user=self.user, variables={'id': str(self.project.id)},
+        )
+        self.assertEqual(result.data['createTask']['message'], 'Project not found')
+
+    def test_purge_in_batches(self):
+        self.delete()
+        out = StringIO()
+        call_command('purge_deleted_projects', '--batch-size', '3', stdout=out)
+        self.assertIn('Purged Big', out.getvalue())
+        self.assertIn('7 of 7 tasks deleted', out.getvalue())
+
+        self.assertFalse(Project._base_manager.filter(id=self.project.id).exists())
+        self.assertEqual(Task._base_manager.count(), 1)
+        self.assertFalse(ArchivedTask._base_manager.exists())
+        self.assertFalse(ProjectTaskStats.objects.filter(project_id=self.project.id).exists())
+        deletion = ProjectDeletion.objects.get()
+        self.assertEqual(deletion.tasks_deleted, 7)
+        self.assertIsNotNone(deletion.finished_at)
+
+        result, _ = capture_sql(
+            'query($id: UUID!) { projectDeletion(id: $id) { name tasksDeleted progress } }',
+            user=self.user, variables={'id': str(self.project.id)},
+        )
+        self.assertEqual(
+            result.data['projectDeletion'], {'name': 'Big', 'tasksDeleted': 7, 'progress': 1.0}
+        )
@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.search'
+    verbose_name = 'Search'
+
+    def ready(self):
+        from django.apps import apps
+        from django.db.models.signals import post_migrate
+
+        from .index import ensure_indexes
+
+        # this app has no models, so it never receives post_migrate itself;
+        # the signal is sent once per app after all migrations have run
+        post_migrate.connect(ensure_indexes, sender=apps.get_app_config('tasks'))
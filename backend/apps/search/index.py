@@ -0,0 +1,300 @@
+"""
+Full-text indexes over tasks and projects, and the ranked search query.
+
+PostgreSQL: each indexed table gets a generated ``search_vector`` tsvector
+column (title or name weighted above description) with a GIN index. The
+database computes it on every INSERT and UPDATE, so bulk_create(), queryset
+updates and raw SQL keep it current like save() does.
+
+SQLite (local development and tests): each indexed table gets an FTS5 table,
+``<table>_fts``, keyed by the row's rowid and kept in sync by triggers.
+SQLite drops those triggers when Django rebuilds a table during a migration,
+so ``ensure_indexes()`` runs after every ``migrate`` and recreates missing
+triggers and refills the index.
+
+Query text is split into words; every word must match and the last one also
+matches as a prefix, so results follow the user as they type. Ranking is
+``ts_rank`` on PostgreSQL and BM25 on SQLite: higher is more relevant, but
+the scale differs between the two.
+"""
+
+import html
+import re
+import uuid
+from collections import namedtuple
+
+from django.db import connections, models, router
+
+from apps.tasks.models import Task
+
+# text search configuration (stemming, stop words) used on PostgreSQL
+CONFIG = 'english'
+
+# words of the query taken into account
+MAX_TERMS = 8
+
+# snippet markers; the text is HTML-escaped and these become <mark> tags
+_START, _STOP = '\x02', '\x03'
+
+Hit = namedtuple('Hit', 'kind id rank snippet')
+
+# converts ids to the backend's column format (hex strings on SQLite)
+_uuid = models.UUIDField()
+
+
+class Index:
+
+    def __init__(self, kind, table, columns, hidden):
+        self.kind = kind
+        self.table = table
+        # (column, weight) pairs; weight A ranks above B
+        self.columns = columns
+        # selects the {key} of rows that belong to deleted projects
+        self.hidden = hidden
+
+    @property
+    def fts_table(self):
+        return f'{self.table}_fts'
+
+    @property
+    def column_names(self):
+        return [column for column, _ in self.columns]
+
+
+_DELETED_PROJECTS = 'SELECT id FROM projects_project WHERE deleted_at IS NOT NULL'
+TASKS = Index(
+    'TASK', 'tasks_task', (('title', 'A'), ('description', 'B')),
+    f'SELECT {{key}} FROM tasks_task WHERE project_id IN ({_DELETED_PROJECTS})',
+)
+PROJECTS = Index(
+    'PROJECT', 'projects_project', (('name', 'A'), ('description', 'B')),
+    'SELECT {key} FROM projects_project WHERE deleted_at IS NOT NULL',
+)
+INDEXES = (TASKS, PROJECTS)
+
+
+# schema
+
+def _postgresql_install(index):
+    vector = ' || '.join(
+        f"setweight(to_tsvector('{CONFIG}'::regconfig, coalesce({column}, '')), '{weight}')"
+        for column, weight in index.columns
+    )
+    return [
+        f'ALTER TABLE {index.table} ADD COLUMN search_vector tsvector '
+        f'GENERATED ALWAYS AS ({vector}) STORED',
+        f'CREATE INDEX {index.table}_search_idx ON {index.table} USING GIN (search_vector)',
+    ]
+
+
+def _postgresql_uninstall(index):
+    return [
+        f'DROP INDEX IF EXISTS {index.table}_search_idx',
+        f'ALTER TABLE {index.table} DROP COLUMN IF EXISTS search_vector',
+    ]
+
+
+def _sqlite_triggers(index):
+    columns = ', '.join(index.column_names)
+    new_values = ', '.join(f'new.{column}' for column in index.column_names)
+    insert = f'INSERT INTO {index.fts_table}(rowid, {columns}) VALUES (new.rowid, {new_values});'
+    delete = f'DELETE FROM {index.fts_table} WHERE rowid = old.rowid;'
+    return {
+        f'{index.fts_table}_insert': f'AFTER INSERT ON {index.table} BEGIN {insert} END',
+        f'{index.fts_table}_delete': f'AFTER DELETE ON {index.table} BEGIN {delete} END',
+        f'{index.fts_table}_update':
+            f'AFTER UPDATE OF {columns} ON {index.table} BEGIN {delete} {insert} END',
+    }
+
+
+def _sqlite_install(index):
+    columns = ', '.join(index.column_names)
+    statements = [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {index.fts_table} '
+        f"USING fts5({columns}, tokenize='porter unicode61')",
+    ]
+    statements += [
+        f'CREATE TRIGGER IF NOT EXISTS {name} {body}'
+        for name, body in _sqlite_triggers(index).items()
+    ]
+    return statements + [
+        f'DELETE FROM {index.fts_table}',
+        f'INSERT INTO {index.fts_table}(rowid, {columns}) SELECT rowid, {columns} FROM {index.table}',
+    ]
+
+
+def _sqlite_uninstall(index):
+    return [f'DROP TRIGGER IF EXISTS {name}' for name in _sqlite_triggers(index)] + [
+        f'DROP TABLE IF EXISTS {index.fts_table}',
+    ]
+
+
+_DDL = {
+    'postgresql': (_postgresql_install, _postgresql_uninstall),
+    'sqlite': (_sqlite_install, _sqlite_uninstall),
+}
+
+
+def install(apps, schema_editor):
+    """Migration operation: create the indexes and fill them from the existing rows."""
+    ddl = _DDL.get(schema_editor.connection.vendor)
+    for index in INDEXES if ddl else ():
+        for statement in ddl[0](index):
+            schema_editor.execute(statement, params=None)
+
+
+def uninstall(apps, schema_editor):
+    ddl = _DDL.get(schema_editor.connection.vendor)
+    for index in INDEXES if ddl else ():
+        for statement in ddl[1](index):
+            schema_editor.execute(statement, params=None)
+
+
+def ensure_indexes(using='default', **kwargs):
+    """
+    ``post_migrate`` receiver: on SQLite, reinstall (and refill) the index of
+    every table whose triggers were dropped by a table rebuild.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {row[0] for row in cursor.fetchall()}
+        for index in INDEXES:
+            if index.table not in existing or index.fts_table not in existing:
+                # not migrated this far (e.g. migrating backwards)
+                continue
+            if set(_sqlite_triggers(index)) <= existing:
+                continue
+            for statement in _sqlite_install(index):
+                cursor.execute(statement)
+
+
+# queries
+
+def terms(text):
+    """The words of ``text`` that take part in matching."""
+    return re.findall(r'\w+', text.lower())[:MAX_TERMS]
+
+
+def _match(vendor, words):
+    if vendor == 'postgresql':
+        # words are \w+ only, so they cannot carry tsquery operators
+        return ' & '.join(words[:-1] + [f'{words[-1]}:*'])
+    # the index is stemmed but prefixes are not, so the last word matches as
+    # typed (stemmed, like the others) or as the start of a longer word
+    last = words[-1]
+    return ' AND '.join([f'"{word}"' for word in words[:-1]] + [f'("{last}" OR "{last}"*)'])
+
+
+def _ids_sql(ids):
+    return ', '.join(['%s'] * len(ids))
+
+
+def _hits_postgresql(index, tsquery, project_id, limit):
+    sql = (
+        f"SELECT '{index.kind}' AS kind, id, ts_rank(search_vector, to_tsquery(%s, %s)) AS rank, "
+        f'created_at AS tiebreak FROM {index.table} WHERE search_vector @@ to_tsquery(%s, %s) '
+        f"AND id NOT IN ({index.hidden.format(key='id')})"
+    )
+    params = [CONFIG, tsquery, CONFIG, tsquery]
+    if project_id is not None:
+        sql += ' AND project_id = %s'
+        params.append(project_id)
+    return sql, params
+
+
+def _hits_sqlite(index, match, project_id, limit):
+    # BM25 is lower-is-better; the first column counts ten times the second
+    rank = f'-bm25({index.fts_table}, 10.0, 1.0)'
+    if project_id is not None:
+        return (
+            f"SELECT '{index.kind}' AS kind, t.id, {rank} AS rank, t.rowid AS tiebreak "
+            f'FROM {index.fts_table} JOIN {index.table} t ON t.rowid = {index.fts_table}.rowid '
+            f'WHERE {index.fts_table} MATCH %s AND t.project_id = %s '
+            f"AND t.rowid NOT IN ({index.hidden.format(key='rowid')})",
+            [match, project_id],
+        )
+    # rank inside the FTS table and look up only the rows up to the end of
+    # the page, instead of joining every match
+    return (
+        f"SELECT '{index.kind}' AS kind, t.id, h.rank, h.rowid AS tiebreak FROM ("
+        f'SELECT rowid, {rank} AS rank FROM {index.fts_table} WHERE {index.fts_table} MATCH %s '
+        f"AND rowid NOT IN ({index.hidden.format(key='rowid')}) "
+        f'ORDER BY rank DESC, rowid DESC LIMIT %s'
+        f') h JOIN {index.table} t ON t.rowid = h.rowid',
+        [match, limit],
+    )
+
+
+def _snippets_postgresql(index, tsquery, ids):
+    text = " || ' … ' || ".join(f"coalesce({column}, '')" for column in index.column_names)
+    options = f'StartSel="{_START}", StopSel="{_STOP}", MaxWords=24, MinWords=8'
+    return (
+        f'SELECT id, ts_headline(%s::regconfig, {text}, to_tsquery(%s, %s), %s) '
+        f'FROM {index.table} WHERE id IN ({_ids_sql(ids)})',
+        [CONFIG, CONFIG, tsquery, options, *ids],
+    )
+
+
+def _snippets_sqlite(index, match, ids):
+    return (
+        f"SELECT t.id, snippet({index.fts_table}, -1, char(2), char(3), '…', 16) "
+        f'FROM {index.fts_table} JOIN {index.table} t ON t.rowid = {index.fts_table}.rowid '
+        f'WHERE {index.fts_table} MATCH %s AND t.id IN ({_ids_sql(ids)})',
+        [match, *ids],
+    )
+
+
+def highlight(snippet):
+    """HTML-escape ``snippet`` and turn the match markers into ``<mark>`` tags."""
+    return (
+        html.escape(snippet or '')
+        .replace(_START, '<mark>')
+        .replace(_STOP, '</mark>')
+    )
+
+
+def search(text, project_id=None, limit=20, offset=0, using=None):
+    """
+    Tasks and projects matching ``text``, most relevant first, as ``Hit``
+    tuples with an HTML snippet of the matching text. With ``project_id``
+    only that project's tasks are searched.
+    """
+    words = terms(text)
+    connection = connections[using or router.db_for_read(Task)]
+    if not words or connection.vendor not in _DDL:
+        return []
+    postgresql = connection.vendor == 'postgresql'
+    match = _match(connection.vendor, words)
+    hits_sql = _hits_postgresql if postgresql else _hits_sqlite
+    snippets_sql = _snippets_postgresql if postgresql else _snippets_sqlite
+    if project_id is not None:
+        project_id = _uuid.get_db_prep_value(project_id, connection)
+        indexes = (TASKS,)
+    else:
+        indexes = INDEXES
+
+    parts = [hits_sql(index, match, project_id, offset + limit) for index in indexes]
+    sql = (
+        'SELECT * FROM (' + ' UNION ALL '.join(part for part, _ in parts) + ') hits '
+        # equal ranks are ordered by a unique key so that pages do not overlap
+        'ORDER BY rank DESC, kind, tiebreak DESC, id LIMIT %s OFFSET %s'
+    )
+    params = [param for _, part_params in parts for param in part_params] + [limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = [(kind, uuid.UUID(str(id)), rank) for kind, id, rank, _ in cursor.fetchall()]
+
+        snippets = {}
+        for index in indexes:
+            ids = [_uuid.get_db_prep_value(id, connection) for kind, id, _ in rows if kind == index.kind]
+            if ids:
+                cursor.execute(*snippets_sql(index, match, ids))
+                snippets.update(
+                    ((index.kind, uuid.UUID(str(id))), highlight(snippet))
+                    for id, snippet in cursor.fetchall()
+                )
+    return [Hit(kind, id, rank, snippets.get((kind, id), '')) for kind, id, rank in rows]
+
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+from apps.search.index import install, uninstall
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_project_indexes'),
+        ('tasks', '0003_project_task_stats'),
+    ]
+
+    operations = [
+        # PostgreSQL: generated tsvector columns + GIN indexes;
+        # SQLite: FTS5 tables kept in sync by triggers (see apps/search/index.py)
+        migrations.RunPython(install, uninstall),
+    ]
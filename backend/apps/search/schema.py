@@ -0,0 +1,106 @@
+import graphene
+from asgiref.sync import sync_to_async
+from graphene.relay import PageInfo
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError
+from graphql_relay import cursor_to_offset, offset_to_cursor
+
+from apps.core.aio import running_async, then
+from apps.core.dataloader import get_loader
+from apps.core.pagination import check_limit
+from apps.core.response_cache import depends_on, project_scope
+from apps.projects.loaders import ProjectLoader
+from apps.projects.schema import ProjectType
+from apps.tasks.loaders import TaskLoader
+from apps.tasks.schema import TaskType
+
+from .index import PROJECTS, TASKS, search
+
+
+class SearchResultKindEnum(graphene.Enum):
+    TASK = TASKS.kind
+    PROJECT = PROJECTS.kind
+
+
+class SearchResultType(graphene.ObjectType):
+    kind = graphene.Field(SearchResultKindEnum, required=True)
+    id = graphene.UUID(required=True)
+    rank = graphene.Float(required=True, description='Relevance; higher is better')
+    snippet = graphene.String(
+        required=True,
+        description='Matching text, HTML-escaped, with the matched words in <mark> tags',
+    )
+    task = graphene.Field(TaskType, description='Null unless kind is TASK')
+    project = graphene.Field(ProjectType, description='Null unless kind is PROJECT')
+
+    def resolve_task(self, info):
+        if self.kind != TASKS.kind:
+            return None
+        return get_loader(info.context, TaskLoader).load(self.id)
+
+    def resolve_project(self, info):
+        if self.kind != PROJECTS.kind:
+            return None
+        return get_loader(info.context, ProjectLoader).load(self.id)
+
+
+class SearchResultConnection(graphene.relay.Connection):
+    class Meta:
+        node = SearchResultType
+
+
+class Query(graphene.ObjectType):
+    search = graphene.Field(
+        SearchResultConnection,
+        query=graphene.String(required=True),
+        project_id=graphene.UUID(description="Only search this project's tasks"),
+        first=graphene.Int(),
+        after=graphene.String(),
+    )
+
+    def resolve_search(self, info, query, project_id=None, first=None, after=None):
+        max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+        check_limit('first', first, max_limit)
+        limit = max_limit if first is None else first
+        offset = 0
+        if after:
+            position = cursor_to_offset(after)
+            if position is None or position < 0:
+                raise GraphQLError(f'Invalid cursor "{after}"')
+            offset = position + 1
+
+        if project_id is not None:
+            depends_on(info.context, project_scope(project_id))
+        else:
+            depends_on(info.context, 'tasks', 'projects')
+
+        # one extra row tells whether there is a next page
+        run = sync_to_async(search) if running_async() else search
+        hits = run(query, project_id=project_id, limit=limit + 1, offset=offset)
+        return then(hits, lambda hits: _connection(info, hits, limit, offset))
+
+
+def _connection(info, hits, limit, offset):
+    has_next_page = len(hits) > limit
+    hits = hits[:limit]
+    # fetched together by the first task / project resolved
+    for hit in hits:
+        loader = TaskLoader if hit.kind == TASKS.kind else ProjectLoader
+        get_loader(info.context, loader).queue(hit.id)
+
+    edges = [
+        SearchResultConnection.Edge(
+            node=SearchResultType(kind=hit.kind, id=hit.id, rank=hit.rank, snippet=hit.snippet),
+            cursor=offset_to_cursor(offset + position),
+        )
+        for position, hit in enumerate(hits)
+    ]
+    return SearchResultConnection(
+        edges=edges,
+        page_info=PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=offset > 0,
+            has_next_page=has_next_page,
+        ),
+    )
@@ -0,0 +1,110 @@
+from django.db import connection
+from django.test import TestCase
+
+from apps.accounts.models import User
+from apps.core.db import update_returning
+from apps.core.testing import capture_sql, execute
+from apps.projects.models import Project
+from apps.tasks.models import Task
+
+from .index import TASKS, ensure_indexes, search
+
+SEARCH = '''
+query Search($query: String!, $projectId: UUID, $first: Int, $after: String) {
+  search(query: $query, projectId: $projectId, first: $first, after: $after) {
+    edges { cursor node { kind rank snippet task { title project { name } } project { name } } }
+    pageInfo { hasNextPage endCursor }
+  }
+}
+'''
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        cls.billing = Project.objects.create(name='Billing revamp', owner=cls.user)
+        cls.mobile = Project.objects.create(
+            name='Mobile app', description='Login and billing on phones', owner=cls.user
+        )
+        Task.objects.bulk_create([
+            Task(title='Fix login flow', description='Users are logged out', project=cls.billing),
+            Task(title='Migrate invoices', description='Move the login audit later', project=cls.billing),
+            Task(title='Login screen <b>layout</b>', project=cls.mobile),
+        ])
+
+    def search(self, query, **variables):
+        result = execute(SEARCH, variables={'query': query, **variables})
+        self.assertIsNone(result.errors)
+        return result.data['search']
+
+    def test_title_matches_rank_first(self):
+        edges = self.search('login')['edges']
+        names = [
+            edge['node']['task']['title'] if edge['node']['task'] else edge['node']['project']['name']
+            for edge in edges
+        ]
+        # title matches outrank description matches
+        self.assertEqual(set(names[:2]), {'Fix login flow', 'Login screen <b>layout</b>'})
+        self.assertEqual(len(edges), 4)
+        ranks = [edge['node']['rank'] for edge in edges]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        node = self.search('layout')['edges'][0]['node']
+        self.assertEqual(node['kind'], 'TASK')
+        self.assertEqual(node['snippet'], 'Login screen &lt;b&gt;<mark>layout</mark>&lt;/b&gt;')
+
+    def test_projects_are_searched(self):
+        node = self.search('phones')['edges'][0]['node']
+        self.assertEqual(node['kind'], 'PROJECT')
+        self.assertEqual(node['project'], {'name': 'Mobile app'})
+        self.assertIsNone(node['task'])
+
+    def test_every_word_must_match_and_the_last_is_a_prefix(self):
+        self.assertEqual(len(self.search('login flo')['edges']), 1)
+        # stemmed: "migrating" finds "Migrate"
+        self.assertEqual(len(self.search('migrating invoices')['edges']), 1)
+        self.assertEqual(self.search('<>!')['edges'], [])
+
+    def test_project_filter_and_pagination(self):
+        page = self.search('login', projectId=str(self.billing.id), first=1)
+        self.assertTrue(page['pageInfo']['hasNextPage'])
+        rest = self.search(
+            'login', projectId=str(self.billing.id), after=page['pageInfo']['endCursor']
+        )
+        titles = [edge['node']['task']['title'] for edge in page['edges'] + rest['edges']]
+        self.assertEqual(titles, ['Fix login flow', 'Migrate invoices'])
+        self.assertFalse(rest['pageInfo']['hasNextPage'])
+
+    def test_results_are_loaded_in_batches(self):
+        result, statements = capture_sql(SEARCH, variables={'query': 'login'})
+        self.assertIsNone(result.errors)
+        # hits, task snippets, project snippets, tasks, projects
+        self.assertEqual(len(statements), 5)
+
+    def test_index_follows_writes(self):
+        task = Task.objects.create(title='Rotate keys', project=self.billing)
+        self.assertEqual([hit.id for hit in search('rotate')], [task.id])
+
+        update_returning(Task.objects.filter(id=task.id), title='Renew certificates')
+        self.assertEqual(search('rotate'), [])
+        self.assertEqual([hit.id for hit in search('certificates')], [task.id])
+
+        Project.objects.filter(id=self.billing.id).delete()
+        self.assertEqual(search('certificates'), [])
+        self.assertEqual({hit.kind for hit in search('login')}, {'TASK', 'PROJECT'})
+
+    def test_lost_sqlite_triggers_are_restored_after_migrate(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        # what a table rebuild during a migration does to them
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {TASKS.fts_table}_insert')
+        Task.objects.create(title='Rotate keys', project=self.billing)
+        self.assertEqual(search('rotate'), [])
+
+        ensure_indexes()
+        self.assertEqual(len(search('rotate')), 1)
+        self.assertEqual(len(search('login')), 4)
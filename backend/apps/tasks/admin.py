@@ -1,5 +1,11 @@
+from collections import Counter
+
 from django.contrib import admin
-from .models import Task
+
+from apps.core.response_cache import invalidate, project_scope, user_scope
+
+from . import history
+from .models import ProjectTaskStats, Task
 
 
 @admin.register(Task)
@@ -17,3 +23,40 @@ class TaskAdmin(admin.ModelAdmin):
         ('Relationships', {'fields': ('project', 'assignee')}),
         ('Timestamps', {'fields': ('created_at', 'updated_at')}),
     )
+    
+    def save_model(self, request, obj, form, change):
+        scopes = obj.invalidation_scopes()
+        if form.initial.get('project'):
+            scopes.append(project_scope(form.initial['project']))
+        if form.initial.get('assignee'):
+            scopes.append(user_scope(form.initial['assignee']))
+        # new tasks, and tasks moved to another column, go to its bottom
+        if not change or {'project', 'status'} & set(form.changed_data):
+            Task.objects.assign_ranks([obj])
+        super().save_model(request, obj, form, change)
+        
+        # the changelist's list_editable forms have no project field
+        deltas = Counter({(obj.project_id, obj.status): 1})
+        if change:
+            deltas[form.initial.get('project', obj.project_id), form.initial['status']] -= 1
+        ProjectTaskStats.objects.apply(deltas)
+        invalidate(*scopes)
+        if change:
+            history.record(obj, {
+                field.attname: form.initial.get(field.name)
+                for field in map(Task._meta.get_field, form.changed_data)
+                if field.attname in history.TRACKED_FIELDS
+            }, actor=request.user)
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        ProjectTaskStats.objects.apply({(obj.project_id, obj.status): -1})
+        invalidate(*obj.invalidation_scopes())
+    
+    def delete_queryset(self, request, queryset):
+        tasks = list(queryset.only('id', 'project_id', 'assignee_id', 'status'))
+        scopes = [scope for obj in tasks for scope in obj.invalidation_scopes()]
+        removed = Counter((obj.project_id, obj.status) for obj in tasks)
+        super().delete_queryset(request, queryset)
+        ProjectTaskStats.objects.apply({key: -n for key, n in removed.items()})
+        invalidate(*scopes)
@@ -1,3 +1,5 @@
+import atexit
+
 from django.apps import AppConfig
 
 
@@ -5,3 +7,11 @@ class TasksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.tasks'
     verbose_name = 'Tasks'
+
+    def ready(self):
+        from django.core.signals import request_finished
+
+        from . import history
+
+        request_finished.connect(history.flush_due)
+        atexit.register(history.flush)
@@ -0,0 +1,172 @@
+"""
+Streaming task export as NDJSON or CSV.
+
+Rows are read with ``values_list(...).iterator()``, which uses a server-side
+cursor on PostgreSQL and ``fetchmany()`` elsewhere, and are encoded in
+chunks as the response is written. Memory stays flat however large the
+project is.
+"""
+
+import csv
+import io
+import itertools
+import json
+import uuid
+import zlib
+from datetime import datetime
+
+from django.utils.dateparse import parse_date, parse_datetime
+
+from apps.core.conf import graphene_setting
+
+from .models import Task
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# (output column, values_list lookup)
+COLUMNS = (
+    ('id', 'id'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('status', 'status'),
+    ('priority', 'priority'),
+    ('project_id', 'project_id'),
+    ('assignee_id', 'assignee_id'),
+    ('assignee_email', 'assignee__email'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+)
+
+# bytes buffered before a chunk is sent
+CHUNK_BYTES = 64 * 1024
+
+
+class ExportError(ValueError):
+    """Invalid export parameters; the message is shown to the client."""
+
+
+def _parse_uuid(name, value):
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        raise ExportError(f'{name} must be a UUID')
+
+
+def _parse_moment(name, value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ExportError(f'{name} must be an ISO 8601 date or datetime')
+        return day
+    return moment
+
+
+def filter_tasks(params, model=Task):
+    """
+    The tasks selected by the query parameters: ``project`` (required),
+    ``status`` (comma separated), ``assignee`` (a user id, or ``none``),
+    ``created_after`` and ``created_before`` (dates or datetimes, inclusive).
+    ``model`` is ``Task`` or ``ArchivedTask``.
+    """
+    project_id = params.get('project')
+    if not project_id:
+        raise ExportError('project is required')
+    queryset = model.objects.filter(project_id=_parse_uuid('project', project_id))
+
+    if params.get('status'):
+        statuses = params['status'].upper().split(',')
+        unknown = set(statuses) - set(Task.Status.values)
+        if unknown:
+            raise ExportError(f'Unknown status: {", ".join(sorted(unknown))}')
+        queryset = queryset.filter(status__in=statuses)
+
+    assignee = params.get('assignee')
+    if assignee == 'none':
+        queryset = queryset.filter(assignee__isnull=True)
+    elif assignee:
+        queryset = queryset.filter(assignee_id=_parse_uuid('assignee', assignee))
+
+    for name, lookup in (('created_after', 'gte'), ('created_before', 'lte')):
+        if params.get(name):
+            moment = _parse_moment(name, params[name])
+            # a bare date covers the whole day
+            field = 'created_at' if isinstance(moment, datetime) else 'created_at__date'
+            queryset = queryset.filter(**{f'{field}__{lookup}': moment})
+
+    # oldest first, from the (project, created_at, id) index
+    return queryset.order_by('created_at', 'id')
+
+
+def _text(value):
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value if isinstance(value, str) else str(value)
+
+
+def _ndjson_lines(rows):
+    names = [name for name, _ in COLUMNS]
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    for row in rows:
+        yield encode(dict(zip(names, map(_text, row)))) + '\n'
+
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in COLUMNS])
+    for row in rows:
+        writer.writerow(['' if value is None else _text(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _chunks(lines):
+    parts, size = [], 0
+    for line in lines:
+        data = line.encode()
+        parts.append(data)
+        size += len(data)
+        if size >= CHUNK_BYTES:
+            yield b''.join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b''.join(parts)
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def include_archived(params):
+    """True when the ``include_archived`` parameter asks for archived tasks too."""
+    return params.get('include_archived', '').lower() in ('1', 'true', 'yes')
+
+
+def export_tasks(queryset, format='ndjson', compress=False):
+    """
+    Byte chunks of ``queryset`` (or of several querysets, one after the
+    other) encoded as ``format``, gzipped if ``compress``.
+    """
+    querysets = queryset if isinstance(queryset, (list, tuple)) else (queryset,)
+    chunk_size = graphene_setting('EXPORT_CHUNK_SIZE', 2000)
+    rows = itertools.chain.from_iterable(
+        queryset.values_list(*(lookup for _, lookup in COLUMNS)).iterator(chunk_size=chunk_size)
+        for queryset in querysets
+    )
+    lines = _csv_lines(rows) if format == 'csv' else _ndjson_lines(rows)
+    chunks = _chunks(lines)
+    return _gzip(chunks) if compress else chunks
@@ -0,0 +1,124 @@
+"""
+Buffered task history.
+
+Writers call ``record()`` with a task's values before and after a change.
+Once the transaction commits, one ``TaskEvent`` per changed field goes into
+a per-process buffer, which is written with a single ``bulk_create``:
+
+- as soon as it holds ``GRAPHENE['TASK_HISTORY_BUFFER_SIZE']`` events;
+- at the end of a request, once its oldest event has waited
+  ``GRAPHENE['TASK_HISTORY_FLUSH_SECONDS']`` (0 flushes after every request);
+- when the process exits.
+
+So a busy worker inserts history about once per interval instead of once
+per change, and never while a mutation holds its row locks. The cost is
+that history lags behind by up to the interval on each worker, and that a
+worker killed without a clean exit loses its buffered events.
+``GRAPHENE['TASK_HISTORY'] = False`` turns recording off.
+"""
+
+import logging
+import threading
+import time
+
+from django.db import DatabaseError, transaction
+
+from apps.core.conf import graphene_setting
+from apps.core.response_cache import invalidate, project_scope
+
+logger = logging.getLogger(__name__)
+
+# fields recorded, by attribute name
+TRACKED_FIELDS = ('title', 'description', 'status', 'priority', 'assignee_id')
+
+
+def enabled():
+    return graphene_setting('TASK_HISTORY', True)
+
+
+def _value(value):
+    return None if value is None else str(value)
+
+
+class Buffer:
+
+    def __init__(self):
+        self._events = []
+        self._oldest = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._events)
+
+    def add(self, events):
+        """Buffer ``events``; True once the buffer has reached its size limit."""
+        with self._lock:
+            if not self._events:
+                self._oldest = time.monotonic()
+            self._events.extend(events)
+            return len(self._events) >= graphene_setting('TASK_HISTORY_BUFFER_SIZE', 500)
+
+    def due(self):
+        with self._lock:
+            return bool(self._events) and (
+                len(self._events) >= graphene_setting('TASK_HISTORY_BUFFER_SIZE', 500)
+                or time.monotonic() - self._oldest >= graphene_setting('TASK_HISTORY_FLUSH_SECONDS', 1.0)
+            )
+
+    def take(self):
+        with self._lock:
+            events, self._events = self._events, []
+            return events
+
+
+buffer = Buffer()
+
+
+def record(task, previous, actor=None, at=None):
+    """
+    Log the fields of ``task`` that differ from ``previous`` ({attname:
+    value}, e.g. from ``.values()`` before the update) once the current
+    transaction commits. ``at`` defaults to the task's ``updated_at``.
+    """
+    from .models import TaskEvent
+
+    if not enabled():
+        return
+    events = [
+        TaskEvent(
+            task_id=task.pk,
+            project_id=task.project_id,
+            actor_id=actor.pk if actor is not None and actor.is_authenticated else None,
+            field=name.removesuffix('_id'),
+            old_value=_value(previous[name]),
+            new_value=_value(getattr(task, name)),
+            created_at=at or task.updated_at,
+        )
+        for name in TRACKED_FIELDS
+        if name in previous and _value(previous[name]) != _value(getattr(task, name))
+    ]
+    if events:
+        transaction.on_commit(lambda: buffer.add(events) and flush())
+
+
+def flush():
+    """Write every buffered event. Returns how many were written."""
+    from .models import TaskEvent
+
+    events = buffer.take()
+    if not events:
+        return 0
+    try:
+        TaskEvent.objects.bulk_create(events)
+    except DatabaseError:
+        logger.exception('Dropped %d task history events', len(events))
+        return 0
+    # history queries are cached under the project scopes and 'task_events'
+    invalidate('task_events', *{project_scope(event.project_id) for event in events})
+    return len(events)
+
+
+def flush_due(**kwargs):
+    """``request_finished`` receiver: flush when the buffer is full or old enough."""
+    if buffer.due():
+        flush()
@@ -0,0 +1,83 @@
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from apps.core.dataloader import DataLoader
+
+from .models import ProjectTaskStats, Task
+
+
+class TaskLoader(DataLoader):
+    model = 'tasks.Task'
+
+    def batch_load(self, keys):
+        return Task.objects.in_bulk(keys)
+
+    async def abatch_load(self, keys):
+        return await Task.objects.ain_bulk(keys)
+
+
+class TasksByProjectLoader(DataLoader):
+    """
+    The newest tasks per project, up to the limit passed to ``select()``,
+    with only the columns passed to it. A selection that needs more columns
+    or more tasks than the loaded rows have refetches those projects once,
+    with both.
+    """
+    sources = (
+        ('projects.Project', 'id'),
+    )
+    many = True
+
+    def __init__(self, context):
+        super().__init__(context)
+        # empty until select() is called; None means every column
+        self.columns = set()
+        self.limit = 0
+
+    def select(self, columns, limit):
+        """Load at least ``columns`` (None: every column) and ``limit`` tasks per project from now on."""
+        wider = self.columns is not None and (columns is None or not columns <= self.columns)
+        if not wider and limit <= self.limit:
+            return
+        if wider:
+            self.columns = None if columns is None else self.columns | columns
+        self.limit = max(self.limit, limit)
+        for key in self._cache:
+            self._queue.add(key)
+        self._cache.clear()
+
+    def _queryset(self, keys):
+        tasks = Task.objects.filter(project_id__in=keys).annotate(
+            position=Window(
+                RowNumber(), partition_by=F('project_id'), order_by=(F('created_at').desc(), F('id').desc())
+            ),
+        ).filter(position__lte=self.limit)
+        return tasks.only('project_id', *self.columns) if self.columns else tasks
+
+    def batch_load(self, keys):
+        tasks = {}
+        for task in self._queryset(keys):
+            tasks.setdefault(task.project_id, []).append(task)
+        return tasks
+
+    async def abatch_load(self, keys):
+        tasks = {}
+        async for task in self._queryset(keys):
+            tasks.setdefault(task.project_id, []).append(task)
+        return tasks
+
+
+class ProjectTaskStatsLoader(DataLoader):
+    """Status counters per project; projects without a counter row count zero."""
+    sources = (
+        ('projects.Project', 'id'),
+    )
+
+    def default(self):
+        return ProjectTaskStats()
+
+    def batch_load(self, keys):
+        return ProjectTaskStats.objects.in_bulk(keys)
+
+    async def abatch_load(self, keys):
+        return await ProjectTaskStats.objects.ain_bulk(keys)
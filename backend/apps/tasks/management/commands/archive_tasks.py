@@ -0,0 +1,77 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.core.response_cache import invalidate, project_scope, user_scope
+from apps.tasks.models import ArchivedTask, Task
+
+
+class Command(BaseCommand):
+    help = (
+        'Move DONE tasks that have not changed for --older-than days into the '
+        'archive table, a chunk per transaction, so the task table and its '
+        'indexes only hold live work. Safe to run while the site is up; '
+        'updating an archived task moves it back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=30, metavar='DAYS',
+            help='Archive tasks last updated at least this many days ago.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--sleep', type=float, default=0.0, metavar='SECONDS',
+            help='Pause between chunks, to leave room for other writers.',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        candidates = Task.objects.filter(status=Task.Status.DONE, updated_at__lte=cutoff)
+        # rows locked by a running mutation are left for the next run
+        skip_locked = connection.features.has_select_for_update_skip_locked
+
+        archived = 0
+        scopes = set()
+        started = reported = time.perf_counter()
+        cursor = None
+        while True:
+            chunk = candidates
+            if cursor is not None:
+                created_at, id = cursor
+                chunk = chunk.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=id))
+            with transaction.atomic():
+                rows = list(
+                    chunk.select_for_update(skip_locked=skip_locked)
+                    .order_by('created_at', 'id')
+                    .values_list('id', 'created_at', 'project_id', 'assignee_id')[:chunk_size]
+                )
+                if not rows:
+                    break
+                archived += ArchivedTask.objects.archive([id for id, _, _, _ in rows])
+            cursor = rows[-1][1], rows[-1][0]
+            for _, _, project_id, assignee_id in rows:
+                scopes.add(project_scope(project_id))
+                if assignee_id:
+                    scopes.add(user_scope(assignee_id))
+
+            now = time.perf_counter()
+            if now - reported >= 5:
+                reported = now
+                self.stdout.write(f'{archived} archived ({archived / (now - started):,.0f}/s)')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        if archived:
+            invalidate('tasks', *scopes)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} tasks in {elapsed:.1f}s.'
+        ))
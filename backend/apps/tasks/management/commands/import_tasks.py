@@ -0,0 +1,379 @@
+import csv
+import gzip
+import io
+import json
+import sys
+import time
+import uuid
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.accounts.models import User
+from apps.core.bulk import copy_rows, explicit_timestamps, supports_copy
+from apps.core.response_cache import invalidate, project_scope, user_scope
+from apps.projects.models import Project
+from apps.tasks.models import ArchivedTask, ProjectTaskStats, Task
+
+# written with COPY, in this order
+COLUMNS = (
+    'id', 'title', 'description', 'status', 'priority', 'project_id', 'assignee_id',
+    'created_at', 'updated_at', 'rank',
+)
+
+TITLE_LENGTH = Task._meta.get_field('title').max_length
+
+
+class Reject(ValueError):
+    """A row that cannot be imported; the message says why."""
+
+
+def _choices(choices):
+    """{spelling: value} for the values (any case) and labels of ``choices``."""
+    names = {}
+    for value, label in choices.choices:
+        names[value.lower()] = names[label.lower()] = value
+    return choices.__name__.lower(), names
+
+
+STATUSES = _choices(Task.Status)
+PRIORITIES = _choices(Task.Priority)
+
+
+def _choice(choices, value, default):
+    if not value:
+        return default
+    kind, names = choices
+    try:
+        return names[str(value).strip().lower()]
+    except KeyError:
+        raise Reject(f'unknown {kind} {value!r}')
+
+
+def _uuid(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def _moment(value, name, default):
+    if not value:
+        return default
+    moment = parse_datetime(str(value))
+    if moment is None:
+        raise Reject(f'{name} is not an ISO 8601 datetime')
+    return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+
+
+class Command(BaseCommand):
+    help = (
+        'Import tasks from a CSV or NDJSON file (or stdin), streamed in batches. '
+        'Columns: title (required), description, status, priority, project or '
+        'project_id, assignee_email or assignee_id, id, created_at, updated_at; '
+        'the output of /export/tasks is accepted as is. Rows that cannot be '
+        'imported are counted and skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file, optionally .gz; - reads stdin.')
+        parser.add_argument(
+            '--format', choices=('csv', 'ndjson'),
+            help='Default: from the file extension, else ndjson.',
+        )
+        parser.add_argument(
+            '--owner', metavar='EMAIL',
+            help='Project names are looked up among (and created for) this user\'s projects.',
+        )
+        parser.add_argument(
+            '--create-projects', action='store_true',
+            help='Create projects named in the file that --owner does not have.',
+        )
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help='Create assignees that do not exist, without a usable password.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Use bulk_create() on PostgreSQL too, instead of COPY.',
+        )
+        parser.add_argument(
+            '--rejects', metavar='PATH',
+            help='Write rejected rows to this NDJSON file, with the line and the reason.',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        if self.batch_size < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        self.owner = None
+        if options['owner']:
+            self.owner = User.objects.filter(
+                email=User.objects.normalize_email(options['owner'])
+            ).first()
+            if self.owner is None:
+                raise CommandError(f"No user with email {options['owner']!r}.")
+        elif options['create_projects']:
+            raise CommandError('--create-projects needs --owner.')
+        self.create_projects = options['create_projects']
+        self.create_users = options['create_users']
+        self.use_copy = supports_copy() and not options['no_copy']
+        self.now = timezone.now()
+
+        # reference -> id, filled one batch at a time
+        self.projects = {}
+        self.users = {}
+        # (project_id, status) -> last rank written
+        self.last_ranks = {}
+        self.touched = set()
+        # users whose myTasks / myProjects change
+        self.touched_users = set()
+        self.imported = 0
+        self.rejected = Counter()
+        self.created = Counter()
+
+        path, format = options['path'], options['format']
+        if format is None:
+            format = 'csv' if path.removesuffix('.gz').endswith('.csv') else 'ndjson'
+        self.started = self.reported = time.perf_counter()
+        rejects = open(options['rejects'], 'w', encoding='utf-8') if options['rejects'] else None
+        try:
+            with self.open(path) as source:
+                rows = self.read_csv(source) if format == 'csv' else self.read_ndjson(source)
+                batch = []
+                for line, row in rows:
+                    batch.append((line, row))
+                    if len(batch) >= self.batch_size:
+                        self.import_batch(batch, rejects)
+                        batch = []
+                if batch:
+                    self.import_batch(batch, rejects)
+        finally:
+            if rejects:
+                rejects.close()
+            if self.touched or self.created['users']:
+                invalidate(
+                    'tasks', 'projects', *(['users'] if self.created['users'] else []),
+                    *(project_scope(project_id) for project_id in self.touched),
+                    *(user_scope(user_id) for user_id in self.touched_users),
+                )
+
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.imported} tasks in {elapsed:.1f}s '
+            f'({self.imported / max(elapsed, 1e-6):,.0f}/s) with '
+            f"{'COPY' if self.use_copy else 'bulk_create'}; created "
+            f"{self.created['projects']} projects and {self.created['users']} users; "
+            f'rejected {sum(self.rejected.values())} rows.'
+        ))
+        for reason, count in self.rejected.most_common():
+            self.stdout.write(f'  {count:>8}  {reason}')
+
+    # reading
+
+    def open(self, path):
+        if path == '-':
+            return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig', newline='')
+        opener = gzip.open if path.endswith('.gz') else open
+        try:
+            return opener(path, 'rt', encoding='utf-8-sig', newline='')
+        except OSError as e:
+            raise CommandError(str(e))
+
+    def read_csv(self, source):
+        reader = csv.DictReader(source)
+        for row in reader:
+            yield reader.line_num, row
+
+    def read_ndjson(self, source):
+        for line, text in enumerate(source, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError:
+                row = None
+            if not isinstance(row, dict):
+                row = {'__error__': 'not a JSON object', 'text': text.rstrip('\n')}
+            yield line, row
+
+    # resolving references
+
+    def project_ref(self, row):
+        value = row.get('project_id') or row.get('project')
+        if not value:
+            raise Reject('no project')
+        value = str(value).strip()
+        project_id = _uuid(value)
+        return ('id', project_id) if project_id else ('name', value)
+
+    def user_ref(self, row):
+        if row.get('assignee_id'):
+            user_id = _uuid(row['assignee_id'])
+            if user_id is None:
+                raise Reject('assignee_id is not a UUID')
+            return ('id', user_id)
+        email = row.get('assignee_email') or row.get('assignee')
+        if not email:
+            return None
+        return ('email', User.objects.normalize_email(str(email).strip()))
+
+    def resolve_projects(self, refs):
+        refs = {ref for ref in refs if ref not in self.projects}
+        ids = [value for kind, value in refs if kind == 'id']
+        names = [value for kind, value in refs if kind == 'name']
+        if ids:
+            for project_id in Project.objects.filter(id__in=ids).values_list('id', flat=True):
+                self.projects[('id', project_id)] = project_id
+        if names and self.owner is not None:
+            # the oldest project wins when the owner has several with one name
+            found = (
+                Project.objects.filter(owner=self.owner, name__in=names)
+                .order_by('-created_at').values_list('name', 'id')
+            )
+            self.projects.update((('name', name), project_id) for name, project_id in found)
+            missing = [name for name in names if ('name', name) not in self.projects]
+            if missing and self.create_projects:
+                created = Project.objects.bulk_create(
+                    Project(name=name[:Project._meta.get_field('name').max_length], owner=self.owner)
+                    for name in missing
+                )
+                self.projects.update((('name', name), project.id) for name, project in zip(missing, created))
+                self.created['projects'] += len(created)
+                self.touched_users.add(self.owner.id)
+
+    def resolve_users(self, refs):
+        refs = {ref for ref in refs if ref is not None and ref not in self.users}
+        ids = [value for kind, value in refs if kind == 'id']
+        emails = [value for kind, value in refs if kind == 'email']
+        if ids:
+            for user_id in User.objects.filter(id__in=ids).values_list('id', flat=True):
+                self.users[('id', user_id)] = user_id
+        if emails:
+            found = User.objects.filter(email__in=emails).values_list('email', 'id')
+            self.users.update((('email', email), user_id) for email, user_id in found)
+            missing = [email for email in emails if ('email', email) not in self.users]
+            if missing and self.create_users:
+                password = make_password(None)
+                created = User.objects.bulk_create(
+                    User(email=email, password=password) for email in missing
+                )
+                self.users.update((('email', user.email), user.id) for user in created)
+                self.created['users'] += len(created)
+
+    # writing
+
+    def import_batch(self, batch, rejects):
+        parsed = []
+        for line, row in batch:
+            try:
+                if '__error__' in row:
+                    raise Reject(row['__error__'])
+                parsed.append((line, row, self.project_ref(row), self.user_ref(row)))
+            except Reject as e:
+                self.reject(rejects, line, row, e)
+
+        with transaction.atomic():
+            self.resolve_projects(ref for _, _, ref, _ in parsed)
+            self.resolve_users(ref for _, _, _, ref in parsed)
+            # ids from earlier batches are committed, so the lookup covers them;
+            # archived tasks and those of deleted projects keep their ids too
+            given_ids = [_uuid(row['id']) for _, row, _, _ in parsed if row.get('id')]
+            given_ids = [id for id in given_ids if id]
+            taken = {
+                id
+                for model in (Task, ArchivedTask)
+                for id in model._base_manager.filter(id__in=given_ids).values_list('id', flat=True)
+            } if given_ids else set()
+
+            tasks = []
+            for line, row, project_ref, user_ref in parsed:
+                try:
+                    tasks.append(self.build(row, project_ref, user_ref, taken))
+                except Reject as e:
+                    self.reject(rejects, line, row, e)
+            tasks = self.rank(tasks)
+
+            if self.use_copy:
+                copy_rows(Task, COLUMNS, tasks)
+            else:
+                with explicit_timestamps(Task):
+                    Task.objects.bulk_create(Task(**dict(zip(COLUMNS, task))) for task in tasks)
+            deltas = Counter((task[5], task[3]) for task in tasks)
+            ProjectTaskStats.objects.apply(deltas)
+
+        self.touched.update(project_id for project_id, _ in deltas)
+        self.touched_users.update(task[6] for task in tasks if task[6] is not None)
+        self.imported += len(tasks)
+        self.progress()
+
+    def build(self, row, project_ref, user_ref, taken):
+        project_id = self.projects.get(project_ref)
+        if project_id is None:
+            raise Reject('unknown project')
+        assignee_id = None
+        if user_ref is not None:
+            assignee_id = self.users.get(user_ref)
+            if assignee_id is None:
+                raise Reject('unknown assignee')
+
+        title = str(row.get('title') or '').strip()
+        if not title:
+            raise Reject('no title')
+        if len(title) > TITLE_LENGTH:
+            raise Reject(f'title longer than {TITLE_LENGTH} characters')
+
+        task_id = uuid.uuid4()
+        if row.get('id'):
+            task_id = _uuid(row['id'])
+            if task_id is None:
+                raise Reject('id is not a UUID')
+            if task_id in taken:
+                raise Reject('id already exists')
+            taken.add(task_id)
+
+        created_at = _moment(row.get('created_at'), 'created_at', self.now)
+        return (
+            task_id,
+            title,
+            str(row.get('description') or ''),
+            _choice(STATUSES, row.get('status'), Task.Status.BACKLOG),
+            _choice(PRIORITIES, row.get('priority'), Task.Priority.MEDIUM),
+            project_id,
+            assignee_id,
+            created_at,
+            _moment(row.get('updated_at'), 'updated_at', created_at),
+        )
+
+    def rank(self, tasks):
+        """``tasks`` with ranks appended, at the bottom of their columns in file order."""
+        columns = {}
+        for index, task in enumerate(tasks):
+            columns.setdefault((task[5], task[3]), []).append(index)
+        ranks = [None] * len(tasks)
+        for (project_id, status), indexes in columns.items():
+            keys = Task.objects.bottom_ranks(project_id, status, len(indexes), self.last_ranks)
+            for index, key in zip(indexes, keys):
+                ranks[index] = key
+        return [task + (rank,) for task, rank in zip(tasks, ranks)]
+
+    def reject(self, rejects, line, row, error):
+        self.rejected[str(error)] += 1
+        if rejects:
+            rejects.write(json.dumps({'line': line, 'error': str(error), 'row': row}) + '\n')
+
+    def progress(self):
+        now = time.perf_counter()
+        if now - self.reported < 5:
+            return
+        self.reported = now
+        elapsed = now - self.started
+        self.stdout.write(
+            f'{self.imported} imported, {sum(self.rejected.values())} rejected '
+            f'({self.imported / elapsed:,.0f}/s)'
+        )
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core.conf import graphene_setting
+from apps.core.response_cache import invalidate, project_scope
+from apps.tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = (
+        'Respace the rank keys of board columns that hold unranked tasks or '
+        'keys longer than GRAPHENE["RANK_REBALANCE_LENGTH"], keeping their '
+        'order. Meant to run from cron; moveTask only rebalances a column '
+        'itself when it runs out of room.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-length', type=int,
+            help='Rebalance columns with keys longer than this (default: the setting).',
+        )
+
+    def handle(self, *args, **options):
+        max_length = options['max_length'] or graphene_setting('RANK_REBALANCE_LENGTH', 16)
+        started = time.perf_counter()
+        columns = list(Task.objects.unbalanced_columns(max_length))
+        tasks = 0
+        for project_id, status in columns:
+            tasks += Task.objects.rebalance(project_id, status)
+            # every rank in the column changed
+            invalidate(project_scope(project_id))
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebalanced {len(columns)} column(s), {tasks} tasks, '
+            f'in {time.perf_counter() - started:.1f}s.'
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.response_cache import invalidate, project_scope
+from apps.tasks.models import ProjectTaskStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-project task status counters from the task table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'project_ids',
+            nargs='*',
+            metavar='project_id',
+            help='Only recount these projects (default: every project).',
+        )
+
+    def handle(self, *args, project_ids, **options):
+        repaired = ProjectTaskStats.objects.recount(project_ids or None)
+        invalidate('projects', *(project_scope(project_id) for project_id in project_ids))
+        self.stdout.write(self.style.SUCCESS(f'Repaired counters for {repaired} project(s).'))
@@ -0,0 +1,234 @@
+from collections import Counter
+
+from django.db import connections, models, router, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from apps.core import ranking
+
+
+class ProjectTaskStatsManager(models.Manager):
+    def apply(self, deltas):
+        """
+        Add ``deltas`` ({(project_id, status): n}) to the counters with one
+        ``F()`` update per project. Projects without a counter row yet are
+        recounted, which creates the row.
+        """
+        by_project = {}
+        for (project_id, status), n in deltas.items():
+            if n:
+                changes = by_project.setdefault(project_id, {})
+                field = self.model.field_for(status)
+                changes[field] = changes.get(field, 0) + n
+        
+        missing = []
+        for project_id, changes in by_project.items():
+            updated = self.filter(project_id=project_id).update(**{
+                field: F(field) + n for field, n in changes.items()
+            })
+            if not updated:
+                missing.append(project_id)
+        if missing:
+            self.recount(missing)
+
+    def recount(self, project_ids=None):
+        """
+        Rebuild the counters from the task table, for ``project_ids`` or every
+        project. Returns the number of projects whose counters changed.
+        """
+        from apps.projects.models import Project
+        from .models import ArchivedTask, Task
+        
+        projects = Project.objects.all()
+        if project_ids is not None:
+            projects = projects.filter(id__in=project_ids)
+        project_ids = list(projects.values_list('id', flat=True))
+        
+        counts = {project_id: Counter() for project_id in project_ids}
+        for model in (Task, ArchivedTask):
+            rows = (
+                model.objects.filter(project_id__in=project_ids)
+                .values_list('project_id', 'status')
+                .annotate(count=Count('id'))
+                .order_by()
+            )
+            for project_id, status, count in rows:
+                counts[project_id][status] += count
+        
+        current = self.in_bulk(project_ids)
+        fields = [self.model.field_for(status) for status in Task.Status.values]
+        stale = []
+        for project_id, by_status in counts.items():
+            stats = self.model(project_id=project_id, **{
+                self.model.field_for(status): by_status[status]
+                for status in Task.Status.values
+            })
+            existing = current.get(project_id)
+            if existing is None or any(
+                getattr(existing, field) != getattr(stats, field) for field in fields
+            ):
+                stale.append(stats)
+        
+        self.bulk_create(
+            stale,
+            update_conflicts=True,
+            unique_fields=['project'],
+            update_fields=fields,
+        )
+        return len(stale)
+
+
+class ProjectRowsManager(models.Manager):
+    """
+    Leaves out the rows of deleted projects until the purge worker removes
+    them. The subquery only reads the partial index of deleted projects.
+    """
+
+    def get_queryset(self):
+        from apps.projects.models import Project
+
+        deleted = Project._base_manager.filter(deleted_at__isnull=False).values('id')
+        return super().get_queryset().exclude(project_id__in=deleted)
+
+
+class TaskManager(ProjectRowsManager):
+
+    def last_rank(self, project_id, status):
+        """The highest rank in a project's status column, or None."""
+        # '' (never ranked) sorts first, so it is only last in an unranked column
+        return (
+            self.filter(project_id=project_id, status=status)
+            .order_by('-rank').values_list('rank', flat=True).first()
+        ) or None
+
+    def bottom_ranks(self, project_id, status, count, last_ranks=None):
+        """
+        ``count`` increasing ranks below the last task of a column. The
+        column is rebalanced first if they would not fit the rank field.
+        ``last_ranks`` is as for ``assign_ranks()``.
+        """
+        if last_ranks is None:
+            last_ranks = {}
+        column = (project_id, status)
+        if column not in last_ranks:
+            last_ranks[column] = self.last_rank(*column)
+        ranks = ranking.keys_after(last_ranks[column], count)
+        if ranks and max(map(len, ranks)) > self.model._meta.get_field('rank').max_length:
+            # only after keys left by moves: respacing leaves short ones
+            self.rebalance(*column)
+            ranks = ranking.keys_after(self.last_rank(*column), count)
+        if ranks:
+            last_ranks[column] = ranks[-1]
+        return ranks
+
+    def assign_ranks(self, tasks, last_ranks=None):
+        """
+        Give the unsaved ``tasks`` ranks at the bottom of their columns, in
+        the order given. One query per column, except for the columns found
+        in ``last_ranks``, a {(project_id, status): rank} dict that callers
+        writing in batches keep and this method updates.
+        """
+        columns = {}
+        for task in tasks:
+            columns.setdefault((task.project_id, task.status), []).append(task)
+        for (project_id, status), members in columns.items():
+            ranks = self.bottom_ranks(project_id, status, len(members), last_ranks)
+            for task, rank in zip(members, ranks):
+                task.rank = rank
+
+    def rebalance(self, project_id, status):
+        """
+        Rewrite the ranks of a project's status column as short, evenly
+        spaced keys in the same order. Returns the number of tasks.
+        """
+        with transaction.atomic():
+            ids = list(
+                self.select_for_update()
+                .filter(project_id=project_id, status=status)
+                .order_by('rank', 'created_at', 'id')
+                .values_list('id', flat=True)
+            )
+            self.bulk_update(
+                [self.model(id=id, rank=rank) for id, rank in zip(ids, ranking.spread(len(ids)))],
+                ['rank'],
+                batch_size=1000,
+            )
+        return len(ids)
+
+    def unbalanced_columns(self, max_length):
+        """(project_id, status) of the columns with unranked tasks or keys over ``max_length``."""
+        return (
+            self.annotate(rank_length=Length('rank'))
+            .filter(Q(rank='') | Q(rank_length__gt=max_length))
+            .values_list('project_id', 'status')
+            .distinct()
+            .order_by()
+        )
+
+
+class ArchivedTaskManager(TaskManager):
+    """
+    Moves rows between the task table and the archive with one
+    ``INSERT ... SELECT`` and one ``DELETE`` per call, so descriptions never
+    travel through Python. Callers lock the rows first and run both in a
+    transaction. No signals are sent.
+    """
+
+    def _move(self, source, target, ids, **values):
+        using = router.db_for_write(target)
+        connection = connections[using]
+        quote_name = connection.ops.quote_name
+        pk = source._meta.pk
+        shared = [
+            quote_name(field.column) for field in target._meta.concrete_fields
+            if field.name not in values
+        ]
+        columns = ', '.join(shared)
+        extra_columns = ''.join(
+            f', {quote_name(target._meta.get_field(name).column)}' for name in values
+        )
+        extra_values = [
+            target._meta.get_field(name).get_db_prep_value(value, connection)
+            for name, value in values.items()
+        ]
+        keys = [pk.get_db_prep_value(id, connection) for id in ids]
+        placeholders = ', '.join(['%s'] * len(keys))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {quote_name(target._meta.db_table)} ({columns}{extra_columns}) '
+                f'SELECT {columns}{", %s" * len(extra_values)} FROM {quote_name(source._meta.db_table)} '
+                f'WHERE {quote_name(pk.column)} IN ({placeholders})',
+                extra_values + keys,
+            )
+            moved = cursor.rowcount
+            cursor.execute(
+                f'DELETE FROM {quote_name(source._meta.db_table)} '
+                f'WHERE {quote_name(pk.column)} IN ({placeholders})',
+                keys,
+            )
+        return moved
+
+    def archive(self, task_ids):
+        """Move the tasks ``task_ids`` into the archive. Returns the number moved."""
+        from .models import Task
+
+        if not task_ids:
+            return 0
+        return self._move(Task, self.model, task_ids, archived_at=timezone.now())
+
+    def restore(self, task_ids):
+        """
+        Move the archived tasks ``task_ids`` back to the task table. Returns
+        ``{id: status}`` for the tasks restored.
+        """
+        from .models import Task
+
+        if not task_ids:
+            return {}
+        restored = dict(
+            self.select_for_update().filter(id__in=task_ids).values_list('id', 'status').order_by()
+        )
+        if restored:
+            self._move(self.model, Task, list(restored))
+        return restored
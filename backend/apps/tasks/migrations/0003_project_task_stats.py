@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_existing_tasks(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Task = apps.get_model('tasks', 'Task')
+    ProjectTaskStats = apps.get_model('tasks', 'ProjectTaskStats')
+    
+    stats = {
+        project_id: ProjectTaskStats(project_id=project_id)
+        for project_id in Project.objects.values_list('id', flat=True)
+    }
+    rows = Task.objects.values_list('project_id', 'status').annotate(count=Count('id')).order_by()
+    for project_id, status, count in rows:
+        setattr(stats[project_id], status.lower(), count)
+    ProjectTaskStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_project_indexes'),
+        ('tasks', '0002_task_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectTaskStats',
+            fields=[
+                ('project', models.OneToOneField(help_text='Project these counters belong to', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_stats', serialize=False, to='projects.project')),
+                ('backlog', models.IntegerField(default=0)),
+                ('todo', models.IntegerField(default=0)),
+                ('doing', models.IntegerField(default=0)),
+                ('done', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'project task stats',
+                'verbose_name_plural': 'project task stats',
+            },
+        ),
+        migrations.RunPython(count_existing_tasks, migrations.RunPython.noop),
+    ]
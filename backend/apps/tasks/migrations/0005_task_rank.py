@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.core.ranking import spread
+
+
+def rank_existing_tasks(apps, schema_editor):
+    # columns keep the order the API listed them in: newest first
+    Project = apps.get_model('projects', 'Project')
+    Task = apps.get_model('tasks', 'Task')
+    for project_id in Project.objects.values_list('id', flat=True).iterator():
+        rows = (
+            Task.objects.filter(project_id=project_id)
+            .order_by('status', '-created_at', '-id')
+            .values_list('id', 'status')
+        )
+        columns = {}
+        for task_id, status in rows:
+            columns.setdefault(status, []).append(task_id)
+        ranked = [
+            Task(id=task_id, rank=rank)
+            for ids in columns.values()
+            for task_id, rank in zip(ids, spread(len(ids)))
+        ]
+        Task.objects.bulk_update(ranked, ['rank'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_soft_delete'),
+        ('tasks', '0004_archived_task'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedtask',
+            name='rank',
+            field=models.CharField(default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='rank',
+            field=models.CharField(default='', help_text="Position within the project's status column (apps.core.ranking)", max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'status', 'rank'], name='task_column_rank_idx'),
+        ),
+        migrations.RunPython(rank_existing_tasks, migrations.RunPython.noop),
+    ]
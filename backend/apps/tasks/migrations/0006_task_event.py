@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:32
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_task_rank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('task_id', models.UUIDField()),
+                ('project_id', models.UUIDField()),
+                ('actor_id', models.UUIDField(blank=True, null=True)),
+                ('field', models.CharField(max_length=30)),
+                ('old_value', models.TextField(blank=True, null=True)),
+                ('new_value', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'task event',
+                'verbose_name_plural': 'task events',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['task_id', '-created_at', '-id'], name='task_event_task_idx'), models.Index(fields=['project_id', '-created_at', '-id'], name='task_event_project_idx')],
+            },
+        ),
+    ]
@@ -2,8 +2,14 @@ import uuid
 from django.db import models
 from django.conf import settings
 
+from apps.core.response_cache import project_scope, user_scope
 from apps.projects.models import Project
 
+from .managers import ArchivedTaskManager, ProjectRowsManager, ProjectTaskStatsManager, TaskManager
+
+# moveTask rebalances a column inline rather than write a longer key
+RANK_MAX_LENGTH = 64
+
 
 class Task(models.Model):
     class Status(models.TextChoices):
@@ -66,6 +72,12 @@ class Task(models.Model):
         help_text="User assigned to this task"
     )
     
+    rank = models.CharField(
+        max_length=RANK_MAX_LENGTH,
+        default='',
+        help_text="Position within the project's status column (apps.core.ranking)"
+    )
+    
     created_at = models.DateTimeField(
         auto_now_add=True,
         help_text="When this task was created"
@@ -76,10 +88,165 @@ class Task(models.Model):
         help_text="When this task was last modified"
     )
     
+    objects = TaskManager()
+    
     class Meta:
         verbose_name = 'task'
         verbose_name_plural = 'tasks'
         ordering = ['-created_at']
+        indexes = [
+            # allTasks
+            models.Index(fields=['-created_at', '-id'], name='task_created_idx'),
+            # tasksByProject
+            models.Index(fields=['project', '-created_at', '-id'], name='task_project_created_idx'),
+            # per-project status columns and task counts
+            models.Index(fields=['project', 'status', '-created_at'], name='task_project_status_idx'),
+            # tasksByStatus
+            models.Index(fields=['status', '-created_at', '-id'], name='task_status_created_idx'),
+            # myTasks
+            models.Index(fields=['assignee', '-created_at', '-id'], name='task_assignee_created_idx'),
+            # boardColumn and moveTask's neighbour lookups
+            models.Index(fields=['project', 'status', 'rank'], name='task_column_rank_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.status})"
+    
+    def cache_scope(self):
+        if 'project_id' in self.get_deferred_fields():
+            return 'tasks'
+        return project_scope(self.project_id)
+    
+    def invalidation_scopes(self):
+        scopes = ['tasks', project_scope(self.project_id)]
+        if self.assignee_id:
+            scopes.append(user_scope(self.assignee_id))
+        return scopes
+
+
+
+class ArchivedTask(models.Model):
+    """
+    A finished task moved out of the task table by ``manage.py archive_tasks``,
+    so the table and indexes behind the task lists only hold live work.
+    Same columns as ``Task`` plus ``archived_at``; updating the task moves it
+    back. Archived tasks still count in ``ProjectTaskStats``.
+    """
+    
+    id = models.UUIDField(primary_key=True, editable=False)
+    title = models.CharField(max_length=300)
+    description = models.TextField(blank=True, default='')
+    status = models.CharField(max_length=20, choices=Task.Status.choices)
+    priority = models.CharField(max_length=20, choices=Task.Priority.choices)
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='archived_tasks'
+    )
+    assignee = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name='archived_tasks',
+        null=True,
+        blank=True
+    )
+    rank = models.CharField(max_length=RANK_MAX_LENGTH, default='')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = ArchivedTaskManager()
+    
+    class Meta:
+        verbose_name = 'archived task'
+        verbose_name_plural = 'archived tasks'
+        ordering = ['-created_at']
+        indexes = [
+            # the same keyset orderings as Task, for includeArchived
+            models.Index(fields=['-created_at', '-id'], name='archived_created_idx'),
+            models.Index(fields=['project', '-created_at', '-id'], name='archived_project_created_idx'),
+            models.Index(fields=['assignee', '-created_at', '-id'], name='archived_assignee_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} (archived)"
+    
+    cache_scope = Task.cache_scope
+    invalidation_scopes = Task.invalidation_scopes
+
+
+class ProjectTaskStats(models.Model):
+    """
+    Per-status task counters for a project, so board headers do not group
+    over the task table. Every task write path adjusts them with ``F()``
+    increments; ``manage.py recount_task_stats`` rebuilds them.
+    """
+    
+    project = models.OneToOneField(
+        Project,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='task_stats',
+        help_text="Project these counters belong to"
+    )
+    
+    backlog = models.IntegerField(default=0)
+    todo = models.IntegerField(default=0)
+    doing = models.IntegerField(default=0)
+    done = models.IntegerField(default=0)
+    
+    objects = ProjectTaskStatsManager()
+    
+    class Meta:
+        verbose_name = 'project task stats'
+        verbose_name_plural = 'project task stats'
+    
+    def __str__(self):
+        return f"Task stats for {self.project_id}"
+    
+    @staticmethod
+    def field_for(status):
+        return status.lower()
+    
+    @property
+    def total(self):
+        return self.backlog + self.todo + self.doing + self.done
+
+
+class TaskEvent(models.Model):
+    """
+    One field of a task changed by updateTask or the admin. Appended in
+    batches by ``apps.tasks.history`` and never updated. The ids are plain
+    columns rather than foreign keys: events outlive deleted tasks and
+    users, follow tasks into the archive, and a batch is never rejected
+    because a row went away before it was flushed.
+    """
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task_id = models.UUIDField()
+    project_id = models.UUIDField()
+    actor_id = models.UUIDField(null=True, blank=True)
+    field = models.CharField(max_length=30)
+    old_value = models.TextField(null=True, blank=True)
+    new_value = models.TextField(null=True, blank=True)
+    # when the change was made, not when the event was flushed
+    created_at = models.DateTimeField()
+    
+    objects = ProjectRowsManager()
+    
+    class Meta:
+        verbose_name = 'task event'
+        verbose_name_plural = 'task events'
+        ordering = ['-created_at']
+        indexes = [
+            # taskHistory
+            models.Index(fields=['task_id', '-created_at', '-id'], name='task_event_task_idx'),
+            # projectActivity
+            models.Index(fields=['project_id', '-created_at', '-id'], name='task_event_project_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.field} of {self.task_id}"
+    
+    def cache_scope(self):
+        return project_scope(self.project_id)
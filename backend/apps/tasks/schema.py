@@ -1,9 +1,26 @@
+from collections import Counter
+
 import graphene
+from django.db import transaction
+from django.db.models import Case, F, Subquery, Value, When
+from django.utils import timezone
 from graphene_django import DjangoObjectType
 
-from .models import Task
+from . import history
+from .models import ArchivedTask, ProjectTaskStats, Task, TaskEvent
+from apps.projects.loaders import ProjectLoader
 from apps.projects.models import Project
+from apps.accounts.loaders import UserLoader
 from apps.accounts.schema import UserType
+from apps.core import ranking
+from apps.core.conf import graphene_setting
+from apps.core.aio import fetch_all, then
+from apps.core.dataloader import get_loader, prime
+from apps.core.db import delete_returning, update_returning
+from apps.core.pagination import KeysetConnectionField
+from apps.core.projection import only_selected
+from apps.core.response_cache import depends_on, invalidate, project_scope, user_scope
+from apps.core.subscriptions import ChangeActionEnum, changes, publish_change
 
 
 class TaskStatusEnum(graphene.Enum):
@@ -32,12 +49,27 @@ class TaskType(DjangoObjectType):
             'priority',
             'project',
             'assignee',
+            'rank',
             'created_at',
             'updated_at',
         )
     
     status = graphene.String()
     priority = graphene.String()
+    archived = graphene.Boolean(
+        description='True for a finished task moved to the archive; updating it restores it'
+    )
+    
+    # keeps cached responses scoped to the task's project
+    required_columns = ('project_id',)
+    column_dependencies = {'archived': ()}
+    
+    @classmethod
+    def is_type_of(cls, root, info):
+        return isinstance(root, ArchivedTask) or super().is_type_of(root, info)
+    
+    def resolve_archived(self, info):
+        return isinstance(self, ArchivedTask)
 
     def resolve_status(self, info):
         return str(self.status)
@@ -45,44 +77,166 @@ class TaskType(DjangoObjectType):
     def resolve_priority(self, info):
         return str(self.priority)
 
+    def resolve_project(self, info):
+        return get_loader(info.context, ProjectLoader).load(self.project_id)
+
+    def resolve_assignee(self, info):
+        return get_loader(info.context, UserLoader).load(self.assignee_id)
+
+
+class TaskConnection(graphene.relay.Connection):
+    class Meta:
+        node = TaskType
+
+
+class TaskEventType(DjangoObjectType):
+    class Meta:
+        model = TaskEvent
+        fields = (
+            'id',
+            'task_id',
+            'project_id',
+            'field',
+            'old_value',
+            'new_value',
+            'created_at',
+        )
+    
+    actor = graphene.Field(UserType, description='Who made the change; null for deleted users')
+    
+    required_columns = ('project_id',)
+    column_dependencies = {'actor': ('actor_id',)}
+    
+    def resolve_actor(self, info):
+        if self.actor_id is None:
+            return None
+        return get_loader(info.context, UserLoader).load(self.actor_id)
+
+
+class TaskEventConnection(graphene.relay.Connection):
+    class Meta:
+        node = TaskEventType
+
+def task_group(project_id):
+    return f'project:{project_id}:tasks'
+
+
+class TaskChangedType(graphene.ObjectType):
+    action = graphene.Field(ChangeActionEnum, required=True)
+    id = graphene.UUID(required=True)
+    project_id = graphene.UUID(required=True)
+    task = graphene.Field(TaskType, description='Null when the task was deleted')
+
+def _include_archived():
+    return graphene.Boolean(
+        default_value=False,
+        description='Also return finished tasks moved to the archive'
+    )
+
+
+def _tasks(include_archived, **filters):
+    """Live tasks matching ``filters``, plus archived ones if asked for."""
+    tasks = Task.objects.filter(**filters)
+    if include_archived:
+        return tasks, ArchivedTask.objects.filter(**filters)
+    return tasks
+
+
 #query 
 class Query(graphene.ObjectType):
-    all_tasks = graphene.List(TaskType)
+    all_tasks = KeysetConnectionField(TaskConnection, include_archived=_include_archived())
     
-    tasks_by_project = graphene.List(
-        TaskType,
-        project_id=graphene.UUID(required=True)
+    tasks_by_project = KeysetConnectionField(
+        TaskConnection,
+        project_id=graphene.UUID(required=True),
+        include_archived=_include_archived()
     )
     
-    tasks_by_status = graphene.List(
+    tasks_by_status = KeysetConnectionField(
+        TaskConnection,
+        status=graphene.Argument(TaskStatusEnum, required=True),
+        include_archived=_include_archived()
+    )
+    
+    task = graphene.Field(
         TaskType,
-        status=graphene.Argument(TaskStatusEnum, required=True)
+        id=graphene.UUID(required=True),
+        include_archived=_include_archived()
     )
     
-    task = graphene.Field(TaskType, id=graphene.UUID(required=True))
+    my_tasks = KeysetConnectionField(TaskConnection, include_archived=_include_archived())
     
-    my_tasks = graphene.List(TaskType)
+    board_column = KeysetConnectionField(
+        TaskConnection,
+        project_id=graphene.UUID(required=True),
+        status=graphene.Argument(TaskStatusEnum, required=True),
+        ordering=['rank'],
+        description='The tasks of a board column in their manual order (see moveTask)'
+    )
     
-    def resolve_all_tasks(self, info):
-        return Task.objects.select_related('project', 'assignee').all()
+    task_history = KeysetConnectionField(
+        TaskEventConnection,
+        task_id=graphene.UUID(required=True),
+        description='Changes made to a task, newest first; written in batches, so it may lag a little'
+    )
     
-    def resolve_tasks_by_project(self, info, project_id):
-        return Task.objects.filter(project_id=project_id).select_related('assignee')
+    project_activity = KeysetConnectionField(
+        TaskEventConnection,
+        project_id=graphene.UUID(required=True),
+        description='Changes made to the tasks of a project, newest first'
+    )
     
-    def resolve_tasks_by_status(self, info, status):
-        return Task.objects.filter(status=status).select_related('project', 'assignee')
+    def resolve_all_tasks(self, info, include_archived):
+        depends_on(info.context, 'tasks')
+        return _tasks(include_archived)
     
-    def resolve_task(self, info, id):
-        try:
-            return Task.objects.select_related('project', 'assignee').get(id=id)
-        except Task.DoesNotExist:
-            return None
+    def resolve_tasks_by_project(self, info, project_id, include_archived):
+        depends_on(info.context, project_scope(project_id))
+        return _tasks(include_archived, project_id=project_id)
+    
+    def resolve_tasks_by_status(self, info, status, include_archived):
+        depends_on(info.context, 'tasks')
+        # only finished tasks are archived
+        return _tasks(include_archived and status.value == Task.Status.DONE, status=status.value)
+    
+    def resolve_task(self, info, id, include_archived):
+        def found(results):
+            task = next((rows[0] for rows in results if rows), None)
+            if task is None:
+                depends_on(info.context, 'tasks')
+                return None
+            return prime(info.context, [task])[0]
+        
+        models = (Task, ArchivedTask) if include_archived else (Task,)
+        querysets = [
+            only_selected(model.objects.filter(id=id), info, TaskType)[:1] for model in models
+        ]
+        return then(fetch_all(querysets), found)
     
-    def resolve_my_tasks(self, info):
+    def resolve_my_tasks(self, info, include_archived):
         user = info.context.user
         if user.is_authenticated:
-            return Task.objects.filter(assignee=user).select_related('project')
-        return []
+            depends_on(info.context, user_scope(user.id))
+            get_loader(info.context, UserLoader).prime_value(user.id, user)
+            return _tasks(include_archived, assignee=user)
+        return Task.objects.none()
+    
+    def resolve_board_column(self, info, project_id, status):
+        depends_on(info.context, project_scope(project_id))
+        return Task.objects.filter(project_id=project_id, status=status.value)
+    
+    def resolve_task_history(self, info, task_id):
+        if not info.context.user.is_authenticated:
+            return TaskEvent.objects.none()
+        # flushes bump 'task_events' and the events' project scopes
+        depends_on(info.context, 'task_events')
+        return TaskEvent.objects.filter(task_id=task_id)
+    
+    def resolve_project_activity(self, info, project_id):
+        if not info.context.user.is_authenticated:
+            return TaskEvent.objects.none()
+        depends_on(info.context, project_scope(project_id))
+        return TaskEvent.objects.filter(project_id=project_id)
 
 #mutations
 class CreateTaskMutation(graphene.Mutation):
@@ -134,14 +288,20 @@ class CreateTaskMutation(graphene.Mutation):
             priority_val = priority.value if hasattr(priority, 'value') else priority
             if not priority_val: priority_val = Task.Priority.MEDIUM
 
-            task = Task.objects.create(
-                project=project,
-                title=title,
-                description=description,
-                status=status_val,
-                priority=priority_val,
-                assignee=assignee
-            )
+            with transaction.atomic():
+                task = Task.objects.create(
+                    project=project,
+                    title=title,
+                    description=description,
+                    status=status_val,
+                    priority=priority_val,
+                    assignee=assignee,
+                    # bottom of its column
+                    rank=Task.objects.bottom_ranks(project.id, status_val, 1)[0]
+                )
+                ProjectTaskStats.objects.apply({(project.id, task.status): 1})
+            invalidate(*task.invalidation_scopes())
+            publish_change(task_group(task.project_id), ChangeActionEnum.CREATED.value, task)
             
             return CreateTaskMutation(
                 task=task,
@@ -180,31 +340,71 @@ class UpdateTaskMutation(graphene.Mutation):
                 message='Authentication required'
             )
         
-        try:
-            task = Task.objects.get(id=id)
-        except Task.DoesNotExist:
-            return UpdateTaskMutation(
-                task=None,
-                success=False,
-                message='Task not found'
-            )
-        
+        changes = {'updated_at': timezone.now()}
         if title is not None:
-            task.title = title
+            changes['title'] = title
         if description is not None:
-            task.description = description
+            changes['description'] = description
         if status is not None:
-            task.status = status.value if hasattr(status, 'value') else status
+            changes['status'] = status.value if hasattr(status, 'value') else status
         if priority is not None:
-            task.priority = priority.value if hasattr(priority, 'value') else priority
+            changes['priority'] = priority.value if hasattr(priority, 'value') else priority
         if assignee_id is not None:
             from apps.accounts.models import User
-            try:
-                task.assignee = User.objects.get(id=assignee_id)
-            except User.DoesNotExist:
-                task.assignee = None
+            # an unknown assignee unassigns the task
+            changes['assignee_id'] = Subquery(User.objects.filter(id=assignee_id).values('id'))
+        
+        # the old values, for the stats counters, the task's history and its rank
+        tracked = [name for name in changes if name in history.TRACKED_FIELDS] if history.enabled() else []
+        if 'status' in changes:
+            tracked += [name for name in ('status', 'project_id') if name not in tracked]
+        
+        def previous():
+            return (
+                Task.objects.select_for_update()
+                .filter(id=id)
+                .values(*tracked)
+                .order_by()
+                .first()
+            )
+        
+        def update(before):
+            values = dict(changes)
+            if before is not None and 'status' in changes and before['status'] != changes['status']:
+                # a new column: the bottom of it, as for new tasks
+                values['rank'] = Task.objects.bottom_ranks(before['project_id'], changes['status'], 1)[0]
+            return update_returning(Task.objects.filter(id=id), **values)
+        
+        with transaction.atomic():
+            before = previous() if tracked else None
+            updated = update(before)
+            if not updated:
+                # editing an archived task (typically reopening it) moves it back
+                restored = ArchivedTask.objects.restore([id])
+                if restored:
+                    if tracked:
+                        before = previous()
+                    updated = update(before)
+            if updated and 'status' in changes and before['status'] != changes['status']:
+                ProjectTaskStats.objects.apply({
+                    (updated[0].project_id, before['status']): -1,
+                    (updated[0].project_id, changes['status']): 1,
+                })
+            if updated:
+                history.record(updated[0], before or {}, actor=user)
+        
+        if not updated:
+            return UpdateTaskMutation(
+                task=None,
+                success=False,
+                message='Task not found'
+            )
         
-        task.save()
+        task = updated[0]
+        # rows already cached carry their project's scope, so the new values
+        # are enough to reach every response that contained the task
+        invalidate(*task.invalidation_scopes())
+        publish_change(task_group(task.project_id), ChangeActionEnum.UPDATED.value, task)
         
         return UpdateTaskMutation(
             task=task,
@@ -229,20 +429,437 @@ class DeleteTaskMutation(graphene.Mutation):
                 message='Authentication required'
             )
         
-        try:
-            task = Task.objects.get(id=id)
-        except Task.DoesNotExist:
+        with transaction.atomic():
+            deleted = (
+                delete_returning(Task.objects.filter(id=id))
+                or delete_returning(ArchivedTask.objects.filter(id=id))
+            )
+            if deleted:
+                ProjectTaskStats.objects.apply({(deleted[0].project_id, deleted[0].status): -1})
+        
+        if not deleted:
             return DeleteTaskMutation(
                 success=False,
                 message='Task not found'
             )
         
-        task_title = task.title
-        task.delete()
+        task = deleted[0]
+        invalidate(*task.invalidation_scopes())
+        publish_change(task_group(task.project_id), ChangeActionEnum.DELETED.value, task)
         
         return DeleteTaskMutation(
             success=True,
-            message=f'Task "{task_title}" deleted successfully'
+            message=f'Task "{task.title}" deleted successfully'
+        )
+
+
+class MoveTaskMutation(graphene.Mutation):
+    """
+    Place a task between two neighbours of a board column, optionally
+    changing its status. Only the moved task's rank is written.
+    """
+    
+    class Arguments:
+        id = graphene.UUID(required=True)
+        status = graphene.Argument(TaskStatusEnum, description='Column to move to (default: the current one)')
+        before_id = graphene.UUID(description='The task that will come right after it')
+        after_id = graphene.UUID(description='The task that will come right before it')
+    
+    task = graphene.Field(TaskType)
+    success = graphene.Boolean()
+    message = graphene.String()
+    
+    def mutate(self, info, id, status=None, before_id=None, after_id=None):
+        user = info.context.user
+        
+        if not user.is_authenticated:
+            return MoveTaskMutation(
+                task=None,
+                success=False,
+                message='Authentication required'
+            )
+        
+        if id in (before_id, after_id):
+            return MoveTaskMutation(
+                task=None,
+                success=False,
+                message='A task cannot be placed next to itself'
+            )
+        
+        with transaction.atomic():
+            current = (
+                Task.objects.select_for_update()
+                .filter(id=id)
+                .values_list('project_id', 'status')
+                .order_by()
+                .first()
+            )
+            if current is None:
+                # dragging an archived task back onto the board restores it
+                restored = ArchivedTask.objects.restore([id])
+                if restored:
+                    current = Task.objects.filter(id=id).values_list('project_id', 'status').first()
+            if current is None:
+                return MoveTaskMutation(
+                    task=None,
+                    success=False,
+                    message='Task not found'
+                )
+            project_id, previous_status = current
+            target = status.value if status is not None else previous_status
+            
+            try:
+                try:
+                    rank = _rank_between(id, project_id, target, after_id, before_id)
+                except ValueError:
+                    # equal, unranked or overlong neighbouring keys leave no valid
+                    # key, so the column is respaced now rather than failing the
+                    # move; routine respacing is left to rebalance_task_ranks
+                    Task.objects.rebalance(project_id, target)
+                    rank = _rank_between(id, project_id, target, after_id, before_id)
+            except ValueError:
+                return MoveTaskMutation(
+                    task=None,
+                    success=False,
+                    message='afterId must come before beforeId'
+                )
+            except LookupError as e:
+                return MoveTaskMutation(
+                    task=None,
+                    success=False,
+                    message=str(e)
+                )
+            
+            updated = update_returning(
+                Task.objects.filter(id=id),
+                rank=rank, status=target, updated_at=timezone.now()
+            )
+            if target != previous_status:
+                ProjectTaskStats.objects.apply({
+                    (project_id, previous_status): -1,
+                    (project_id, target): 1,
+                })
+        
+        task = updated[0]
+        invalidate(*task.invalidation_scopes())
+        publish_change(task_group(task.project_id), ChangeActionEnum.UPDATED.value, task)
+        
+        return MoveTaskMutation(
+            task=task,
+            success=True,
+            message='Task moved successfully'
+        )
+
+
+def _rank_between(task_id, project_id, status, after_id, before_id):
+    """
+    A rank for ``task_id`` right after ``after_id`` and before ``before_id``
+    in the column; a missing neighbour is the adjacent task of the other one
+    (or the column's end). Raises LookupError for a neighbour outside the
+    column and ValueError when the keys leave no room.
+    """
+    column = Task.objects.filter(project_id=project_id, status=status).exclude(id=task_id)
+    given = [task for task in (after_id, before_id) if task is not None]
+    ranks = dict(column.filter(id__in=given).values_list('id', 'rank')) if given else {}
+    for name, task in (('afterId', after_id), ('beforeId', before_id)):
+        if task is not None and task not in ranks:
+            raise LookupError(f'{name} is not a task of the target column')
+    
+    low = ranks.get(after_id)
+    high = ranks.get(before_id)
+    if after_id is None and before_id is None:
+        # the bottom of the column
+        low = column.order_by('-rank').values_list('rank', flat=True).first()
+    elif before_id is None:
+        high = column.filter(rank__gt=low).order_by('rank').values_list('rank', flat=True).first()
+    elif after_id is None:
+        low = column.filter(rank__lt=high).order_by('-rank').values_list('rank', flat=True).first()
+    
+    rank = ranking.between(low or None, high) if high is not None else ranking.after(low or None)
+    if len(rank) > Task._meta.get_field('rank').max_length:
+        raise ValueError('rank key too long')
+    return rank
+
+
+class TaskInput(graphene.InputObjectType):
+    project_id = graphene.UUID(required=True)
+    title = graphene.String(required=True)
+    description = graphene.String()
+    status = graphene.Argument(TaskStatusEnum)
+    priority = graphene.Argument(TaskPriorityEnum)
+    assignee_id = graphene.UUID()
+
+
+class BulkTaskResultType(graphene.ObjectType):
+    id = graphene.UUID()
+    task = graphene.Field(TaskType)
+    success = graphene.Boolean()
+    message = graphene.String()
+
+
+def _check_bulk_size(count):
+    limit = graphene_setting('BULK_MUTATION_LIMIT', 1000)
+    if count > limit:
+        return f'At most {limit} tasks can be changed in one request'
+    return None
+
+
+class BulkCreateTasksMutation(graphene.Mutation):
+    class Arguments:
+        tasks = graphene.List(graphene.NonNull(TaskInput), required=True)
+    
+    results = graphene.List(BulkTaskResultType)
+    success = graphene.Boolean()
+    message = graphene.String()
+    
+    def mutate(self, info, tasks):
+        user = info.context.user
+        
+        if not user.is_authenticated:
+            return BulkCreateTasksMutation(
+                results=[],
+                success=False,
+                message='Authentication required to create tasks'
+            )
+        
+        error = _check_bulk_size(len(tasks))
+        if error:
+            return BulkCreateTasksMutation(results=[], success=False, message=error)
+        
+        from apps.accounts.models import User
+        
+        projects = Project.objects.only('id').in_bulk({item.project_id for item in tasks})
+        assignee_ids = {item.assignee_id for item in tasks if item.assignee_id}
+        assignees = User.objects.only('id').in_bulk(assignee_ids) if assignee_ids else {}
+        
+        results = []
+        new_tasks = []
+        for item in tasks:
+            if item.project_id not in projects:
+                results.append(BulkTaskResultType(success=False, message='Project not found'))
+                continue
+            
+            status_val = item.status.value if item.status else Task.Status.BACKLOG
+            priority_val = item.priority.value if item.priority else Task.Priority.MEDIUM
+            
+            task = Task(
+                project_id=item.project_id,
+                title=item.title,
+                description=item.description or '',
+                status=status_val,
+                priority=priority_val,
+                assignee_id=item.assignee_id if item.assignee_id in assignees else None,
+            )
+            new_tasks.append(task)
+            results.append(BulkTaskResultType(
+                id=task.id,
+                task=task,
+                success=True,
+                message='Task created successfully'
+            ))
+        
+        try:
+            with transaction.atomic():
+                Task.objects.assign_ranks(new_tasks)
+                Task.objects.bulk_create(new_tasks)
+                ProjectTaskStats.objects.apply(
+                    Counter((task.project_id, task.status) for task in new_tasks)
+                )
+        except Exception as e:
+            return BulkCreateTasksMutation(
+                results=[],
+                success=False,
+                message=f'Error creating tasks: {str(e)}'
+            )
+        
+        invalidate(*(scope for task in new_tasks for scope in task.invalidation_scopes()))
+        for task in new_tasks:
+            publish_change(task_group(task.project_id), ChangeActionEnum.CREATED.value, task)
+        prime(info.context, new_tasks)
+        
+        return BulkCreateTasksMutation(
+            results=results,
+            success=len(new_tasks) == len(tasks),
+            message=f'{len(new_tasks)} of {len(tasks)} tasks created'
+        )
+
+
+class BulkUpdateTasksMutation(graphene.Mutation):
+    """Apply the same changes (e.g. move to DONE, reassign) to many tasks."""
+    
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.UUID), required=True)
+        status = graphene.Argument(TaskStatusEnum)
+        priority = graphene.Argument(TaskPriorityEnum)
+        assignee_id = graphene.UUID()
+        unassign = graphene.Boolean()
+    
+    results = graphene.List(BulkTaskResultType)
+    success = graphene.Boolean()
+    message = graphene.String()
+    
+    def mutate(self, info, ids, status=None, priority=None, assignee_id=None, unassign=False):
+        user = info.context.user
+        
+        if not user.is_authenticated:
+            return BulkUpdateTasksMutation(
+                results=[],
+                success=False,
+                message='Authentication required'
+            )
+        
+        error = _check_bulk_size(len(ids))
+        if error:
+            return BulkUpdateTasksMutation(results=[], success=False, message=error)
+        
+        changes = {}
+        if status is not None:
+            changes['status'] = status.value
+        if priority is not None:
+            changes['priority'] = priority.value
+        if unassign:
+            changes['assignee_id'] = None
+        elif assignee_id is not None:
+            from apps.accounts.models import User
+            if not User.objects.filter(id=assignee_id).exists():
+                return BulkUpdateTasksMutation(
+                    results=[],
+                    success=False,
+                    message='Assignee not found'
+                )
+            changes['assignee_id'] = assignee_id
+        
+        if not changes:
+            return BulkUpdateTasksMutation(
+                results=[],
+                success=False,
+                message='Nothing to update'
+            )
+        changes['updated_at'] = timezone.now()
+        
+        with transaction.atomic():
+            existing = list(
+                Task.objects.select_for_update()
+                .filter(id__in=ids)
+                .values_list('id', 'project_id', 'assignee_id', 'status')
+            )
+            found = [task_id for task_id, _, _, _ in existing]
+            restored = ArchivedTask.objects.restore(set(ids) - set(found))
+            if restored:
+                existing += (
+                    Task.objects.filter(id__in=restored)
+                    .values_list('id', 'project_id', 'assignee_id', 'status')
+                )
+                found += restored
+            ranks = {}
+            if 'status' in changes:
+                # tasks that change column go to its bottom, in the order given
+                position = {task_id: index for index, task_id in enumerate(ids)}
+                moved = sorted(
+                    (
+                        Task(id=task_id, project_id=project_id, status=changes['status'])
+                        for task_id, project_id, _, old_status in existing
+                        if old_status != changes['status']
+                    ),
+                    key=lambda task: position[task.id],
+                )
+                Task.objects.assign_ranks(moved)
+                if moved:
+                    ranks['rank'] = Case(
+                        *(When(id=task.id, then=Value(task.rank)) for task in moved),
+                        default=F('rank'),
+                    )
+            Task.objects.filter(id__in=found).update(**changes, **ranks)
+            if 'status' in changes:
+                deltas = Counter()
+                for _, project_id, _, old_status in existing:
+                    deltas[project_id, old_status] -= 1
+                    deltas[project_id, changes['status']] += 1
+                ProjectTaskStats.objects.apply(deltas)
+        
+        scopes = ['tasks']
+        for _, project_id, old_assignee_id, _ in existing:
+            scopes.append(project_scope(project_id))
+            scopes.append(user_scope(old_assignee_id) if old_assignee_id else None)
+        if changes.get('assignee_id'):
+            scopes.append(user_scope(changes['assignee_id']))
+        invalidate(*scopes)
+        
+        updated = Task.objects.in_bulk(found)
+        for task in updated.values():
+            publish_change(task_group(task.project_id), ChangeActionEnum.UPDATED.value, task)
+        prime(info.context, updated.values())
+        results = [
+            BulkTaskResultType(id=task_id, task=updated[task_id], success=True,
+                               message='Task updated successfully')
+            if task_id in updated else
+            BulkTaskResultType(id=task_id, success=False, message='Task not found')
+            for task_id in ids
+        ]
+        
+        return BulkUpdateTasksMutation(
+            results=results,
+            success=len(updated) == len(ids),
+            message=f'{len(updated)} of {len(ids)} tasks updated'
+        )
+
+
+class BulkDeleteTasksMutation(graphene.Mutation):
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.UUID), required=True)
+    
+    results = graphene.List(BulkTaskResultType)
+    success = graphene.Boolean()
+    message = graphene.String()
+    
+    def mutate(self, info, ids):
+        user = info.context.user
+        
+        if not user.is_authenticated:
+            return BulkDeleteTasksMutation(
+                results=[],
+                success=False,
+                message='Authentication required'
+            )
+        
+        error = _check_bulk_size(len(ids))
+        if error:
+            return BulkDeleteTasksMutation(results=[], success=False, message=error)
+        
+        with transaction.atomic():
+            existing = {}
+            for model in (Task, ArchivedTask):
+                missing = set(ids) - set(existing)
+                if not missing:
+                    break
+                found = {
+                    task.id: task
+                    for task in model.objects.select_for_update()
+                    .filter(id__in=missing)
+                    .only('id', 'title', 'project_id', 'assignee_id', 'status')
+                }
+                if found:
+                    model.objects.filter(id__in=found).delete()
+                    existing.update(found)
+            removed = Counter((task.project_id, task.status) for task in existing.values())
+            ProjectTaskStats.objects.apply({key: -n for key, n in removed.items()})
+        
+        invalidate(*(scope for task in existing.values() for scope in task.invalidation_scopes()))
+        for task in existing.values():
+            publish_change(task_group(task.project_id), ChangeActionEnum.DELETED.value, task)
+        
+        results = [
+            BulkTaskResultType(id=task_id, success=True,
+                               message=f'Task "{existing[task_id].title}" deleted successfully')
+            if task_id in existing else
+            BulkTaskResultType(id=task_id, success=False, message='Task not found')
+            for task_id in ids
+        ]
+        
+        return BulkDeleteTasksMutation(
+            results=results,
+            success=len(existing) == len(ids),
+            message=f'{len(existing)} of {len(ids)} tasks deleted'
         )
 
 
@@ -250,3 +867,19 @@ class Mutation(graphene.ObjectType):
     create_task = CreateTaskMutation.Field()
     update_task = UpdateTaskMutation.Field()
     delete_task = DeleteTaskMutation.Field()
+    move_task = MoveTaskMutation.Field()
+    bulk_create_tasks = BulkCreateTasksMutation.Field()
+    bulk_update_tasks = BulkUpdateTasksMutation.Field()
+    bulk_delete_tasks = BulkDeleteTasksMutation.Field()
+
+
+class Subscription(graphene.ObjectType):
+    task_changed = graphene.Field(
+        TaskChangedType,
+        project_id=graphene.UUID(required=True),
+        description='Tasks of the project created, updated or deleted from now on'
+    )
+    
+    async def subscribe_task_changed(root, info, project_id):
+        async for action, task_id, task in changes(info, task_group(project_id), Task):
+            yield TaskChangedType(action=action, id=task_id, project_id=project_id, task=task)
@@ -1,3 +1,813 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import tempfile
+from io import StringIO
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from graphql_jwt.shortcuts import get_token
+
+from apps.accounts.models import User
+from apps.core.response_cache import user_scope
+from apps.core.testing import capture_sql, explain, is_scan_and_sort
+from apps.projects.deletion import purge, soft_delete
+from apps.projects.models import Project, ProjectDeletion
+
+from . import history
+from .models import ArchivedTask, ProjectTaskStats, Task, TaskEvent
+
+
+class TaskQueryPlanTests(TestCase):
+    """Each list resolver must be answered from an index, not a scan plus sort."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        cls.project = Project.objects.create(name='Board', owner=cls.user)
+        Task.objects.bulk_create([
+            Task(
+                title=f'Task {i}',
+                project=cls.project,
+                status=Task.Status.values[i % 4],
+                assignee=cls.user if i % 2 else None,
+            )
+            for i in range(20)
+        ])
+
+    def assertIndexedPlan(self, query, variables=None):
+        result, statements = capture_sql(query, user=self.user, variables=variables)
+        self.assertIsNone(result.errors)
+        table = Task._meta.db_table
+        sql = next(s for s in statements if f'FROM "{table}"' in s)
+        plan = explain(sql)
+        self.assertFalse(is_scan_and_sort(plan, table), f'{sql}\n{plan}')
+
+    def test_all_tasks(self):
+        self.assertIndexedPlan('{ allTasks(first: 10) { edges { node { id } } } }')
+
+    def test_tasks_by_project(self):
+        self.assertIndexedPlan(
+            'query($id: UUID!) { tasksByProject(projectId: $id, first: 10) { edges { node { id } } } }',
+            {'id': str(self.project.id)},
+        )
+
+    def test_tasks_by_status(self):
+        self.assertIndexedPlan('{ tasksByStatus(status: DONE, first: 10) { edges { node { id } } } }')
+
+    def test_my_tasks(self):
+        self.assertIndexedPlan('{ myTasks(first: 10) { edges { node { id } } } }')
+
+
+class TaskProjectionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        cls.project = Project.objects.create(name='Board', owner=cls.user)
+        Task.objects.create(title='Write docs', description='x' * 10000, project=cls.project)
+
+    def test_unselected_description_is_not_loaded(self):
+        result, statements = capture_sql('{ allTasks { edges { node { id title status } } } }')
+        self.assertIsNone(result.errors)
+        self.assertNotIn('"description"', statements[0])
+
+    def test_selected_description_is_loaded(self):
+        result, statements = capture_sql('{ allTasks { edges { node { title description } } } }')
+        self.assertEqual(
+            result.data['allTasks']['edges'][0]['node']['description'], 'x' * 10000
+        )
+        self.assertEqual(len(statements), 1)
+
+
+class BulkTaskMutationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        cls.helper = User.objects.create_user(email='helper@example.com', password='secret')
+        cls.project = Project.objects.create(name='Board', owner=cls.user)
+        cls.other = Project.objects.create(name='Other', owner=cls.user)
+        ProjectTaskStats.objects.recount()
+
+    def test_bulk_create_validates_references_once(self):
+        items = [
+            {'projectId': str(project.id), 'title': f'Task {i}', 'assigneeId': str(self.helper.id)}
+            for i, project in enumerate([self.project, self.other] * 10)
+        ]
+        items.append({'projectId': '00000000-0000-0000-0000-000000000000', 'title': 'Orphan'})
+        result, statements = capture_sql(
+            'mutation($tasks: [TaskInput!]!) { bulkCreateTasks(tasks: $tasks) '
+            '{ success message results { success task { title } } } }',
+            user=self.user, variables={'tasks': items},
+        )
+        self.assertIsNone(result.errors)
+        payload = result.data['bulkCreateTasks']
+        self.assertEqual(payload['message'], '20 of 21 tasks created')
+        self.assertEqual([r['success'] for r in payload['results']], [True] * 20 + [False])
+        self.assertEqual(Task.objects.filter(assignee=self.helper).count(), 20)
+        inserts = [s for s in statements if s.startswith('INSERT INTO "tasks_task"')]
+        self.assertEqual(len(inserts), 1)
+        # plus one last-rank lookup per board column (two projects, BACKLOG)
+        self.assertLessEqual(len(statements), 8)
+
+    def test_bulk_update_moves_tasks_in_one_statement(self):
+        tasks = Task.objects.bulk_create([
+            Task(title=f'Task {i}', project=self.project) for i in range(5)
+        ])
+        ids = [str(task.id) for task in tasks]
+        missing = '00000000-0000-0000-0000-000000000000'
+        result, statements = capture_sql(
+            'mutation($ids: [UUID!]!, $assignee: UUID) { bulkUpdateTasks(ids: $ids, status: DONE, assigneeId: $assignee) '
+            '{ success results { id success task { status } } } }',
+            user=self.user, variables={'ids': ids + [missing], 'assignee': str(self.helper.id)},
+        )
+        self.assertIsNone(result.errors)
+        results = result.data['bulkUpdateTasks']['results']
+        self.assertEqual([r['success'] for r in results], [True] * 5 + [False])
+        self.assertEqual(results[0]['task']['status'], 'DONE')
+        self.assertEqual(Task.objects.filter(status='DONE', assignee=self.helper).count(), 5)
+        updates = [s for s in statements if s.startswith('UPDATE "tasks_task"')]
+        self.assertEqual(len(updates), 1)
+
+    def test_bulk_delete(self):
+        tasks = Task.objects.bulk_create([
+            Task(title=f'Task {i}', project=self.project) for i in range(3)
+        ])
+        result, statements = capture_sql(
+            'mutation($ids: [UUID!]!) { bulkDeleteTasks(ids: $ids) { success message } }',
+            user=self.user, variables={'ids': [str(task.id) for task in tasks]},
+        )
+        self.assertEqual(result.data['bulkDeleteTasks']['message'], '3 of 3 tasks deleted')
+        self.assertFalse(Task.objects.exists())
+        deletes = [s for s in statements if s.startswith('DELETE FROM "tasks_task"')]
+        self.assertEqual(len(deletes), 1)
+
+    def test_requires_authentication(self):
+        result, _ = capture_sql('mutation { bulkDeleteTasks(ids: []) { success message } }')
+        self.assertFalse(result.data['bulkDeleteTasks']['success'])
+
+
+class TaskMutationQueryCountTests(TestCase):
+    """Single-task writes are conditional statements, not SELECT + save()."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        cls.helper = User.objects.create_user(email='helper@example.com', password='secret')
+        cls.project = Project.objects.create(name='Board', owner=cls.user)
+
+    def setUp(self):
+        self.task = Task.objects.create(title='Draft', project=self.project, assignee=self.user)
+        ProjectTaskStats.objects.recount()
+
+    def assertStats(self, **expected):
+        stats = ProjectTaskStats.objects.get(project=self.project)
+        self.assertEqual({field: getattr(stats, field) for field in expected}, expected)
+
+    def test_create_task(self):
+        result, statements = capture_sql(
+            'mutation($project: UUID!, $assignee: UUID) { createTask(projectId: $project, '
+            'title: "New", assigneeId: $assignee) { success task { title } } }',
+            user=self.user,
+            variables={'project': str(self.project.id), 'assignee': str(self.helper.id)},
+        )
+        self.assertTrue(result.data['createTask']['success'])
+        # project and assignee lookups, the column's last rank, the INSERT
+        # and the counter UPDATE
+        self.assertEqual(len(statements), 5)
+        self.assertStats(backlog=2)
+
+    def test_update_task(self):
+        result, statements = capture_sql(
+            'mutation($id: UUID!, $assignee: UUID) { updateTask(id: $id, title: "Final", '
+            'assigneeId: $assignee) { success task { title status } } }',
+            user=self.user, variables={'id': str(self.task.id), 'assignee': str(self.helper.id)},
+        )
+        self.assertEqual(result.data['updateTask']['task'], {'title': 'Final', 'status': 'BACKLOG'})
+        # lock the old values for the task's history, UPDATE ... RETURNING
+        self.assertEqual(len(statements), 2)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.assignee, self.helper)
+
+    def test_update_task_status(self):
+        result, statements = capture_sql(
+            'mutation($id: UUID!) { updateTask(id: $id, status: DONE) { success task { status } } }',
+            user=self.user, variables={'id': str(self.task.id)},
+        )
+        self.assertEqual(result.data['updateTask']['task'], {'status': 'DONE'})
+        # lock the old status, find the new column's bottom, UPDATE ... RETURNING, move the counter
+        self.assertEqual(len(statements), 4)
+        self.assertStats(backlog=0, done=1)
+
+    def test_update_task_with_unknown_assignee_unassigns(self):
+        with override_settings(GRAPHENE={**settings.GRAPHENE, 'TASK_HISTORY': False}):
+            _, statements = capture_sql(
+                'mutation($id: UUID!) { updateTask(id: $id, '
+                'assigneeId: "00000000-0000-0000-0000-000000000000") { success } }',
+                user=self.user, variables={'id': str(self.task.id)},
+            )
+        # without history there is nothing to read first
+        self.assertEqual(len(statements), 1)
+        self.task.refresh_from_db()
+        self.assertIsNone(self.task.assignee)
+
+    def test_update_missing_task(self):
+        result, _ = capture_sql(
+            'mutation { updateTask(id: "00000000-0000-0000-0000-000000000000", title: "x") '
+            '{ success message } }',
+            user=self.user,
+        )
+        self.assertEqual(result.data['updateTask']['message'], 'Task not found')
+
+    def test_delete_task(self):
+        result, statements = capture_sql(
+            'mutation($id: UUID!) { deleteTask(id: $id) { success message } }',
+            user=self.user, variables={'id': str(self.task.id)},
+        )
+        self.assertEqual(result.data['deleteTask']['message'], 'Task "Draft" deleted successfully')
+        self.assertEqual([s.split()[0] for s in statements], ['DELETE', 'UPDATE'])
+        self.assertFalse(Task.objects.exists())
+        self.assertStats(backlog=0)
+
+
+class ProjectTaskStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        cls.project = Project.objects.create(name='Board', owner=cls.user)
+        cls.other = Project.objects.create(name='Other', owner=cls.user)
+
+    def counts(self, project):
+        result, _ = capture_sql(
+            'query($id: UUID!) { project(id: $id) { taskCount '
+            'taskCountByStatus { backlog todo doing done } } }',
+            user=self.user, variables={'id': str(project.id)},
+        )
+        self.assertIsNone(result.errors)
+        return result.data['project']
+
+    def test_project_without_counter_row_counts_zero(self):
+        self.assertEqual(self.counts(self.project), {
+            'taskCount': 0,
+            'taskCountByStatus': {'backlog': 0, 'todo': 0, 'doing': 0, 'done': 0},
+        })
+
+    def test_bulk_paths_keep_counters_in_sync(self):
+        result, _ = capture_sql(
+            'mutation($tasks: [TaskInput!]!) { bulkCreateTasks(tasks: $tasks) { results { id } } }',
+            user=self.user,
+            variables={'tasks': [
+                {'projectId': str(project.id), 'title': f'Task {i}', 'status': status}
+                for i, (project, status) in enumerate([
+                    (self.project, 'TODO'), (self.project, 'TODO'),
+                    (self.project, 'DOING'), (self.other, 'TODO'),
+                ])
+            ]},
+        )
+        ids = [r['id'] for r in result.data['bulkCreateTasks']['results']]
+        capture_sql(
+            'mutation($ids: [UUID!]!) { bulkUpdateTasks(ids: $ids, status: DONE) { success } }',
+            user=self.user, variables={'ids': ids[1:3]},
+        )
+        capture_sql(
+            'mutation($ids: [UUID!]!) { bulkDeleteTasks(ids: $ids) { success } }',
+            user=self.user, variables={'ids': ids[2:]},
+        )
+        self.assertEqual(self.counts(self.project), {
+            'taskCount': 2,
+            'taskCountByStatus': {'backlog': 0, 'todo': 1, 'doing': 0, 'done': 1},
+        })
+        self.assertEqual(self.counts(self.other)['taskCount'], 0)
+
+    def test_counts_are_read_without_grouping_tasks(self):
+        Task.objects.create(title='Draft', project=self.project)
+        ProjectTaskStats.objects.recount()
+        result, statements = capture_sql(
+            '{ allProjects { edges { node { name taskCountByStatus { backlog } } } } }',
+            user=self.user,
+        )
+        self.assertIsNone(result.errors)
+        self.assertEqual(len(statements), 2)
+        self.assertFalse(any('GROUP BY' in s for s in statements))
+
+    def test_recount_command_repairs_drift(self):
+        Task.objects.create(title='Draft', project=self.project, status=Task.Status.DOING)
+        ProjectTaskStats.objects.recount()
+        ProjectTaskStats.objects.filter(project=self.project).update(doing=7, done=3)
+        out = StringIO()
+        call_command('recount_task_stats', stdout=out)
+        self.assertIn('Repaired counters for 1 project(s).', out.getvalue())
+        stats = ProjectTaskStats.objects.get(project=self.project)
+        self.assertEqual((stats.doing, stats.done), (1, 0))
+
+
+class TaskExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        cls.project = Project.objects.create(name='Board', owner=cls.user)
+        other = Project.objects.create(name='Other', owner=cls.user)
+        Task.objects.bulk_create([
+            Task(
+                title=f'Task {i}',
+                description='Line one\nLine "two", three',
+                project=cls.project,
+                status=Task.Status.values[i % 4],
+                assignee=cls.user if i % 2 else None,
+            )
+            for i in range(10)
+        ] + [Task(title='Elsewhere', project=other)])
+
+    def export(self, token=True, headers=None, **params):
+        headers = dict(headers or {})
+        if token:
+            headers['Authorization'] = f'JWT {get_token(self.user)}'
+        return self.client.get(
+            '/export/tasks', {'project': str(self.project.id), **params}, headers=headers
+        )
+
+    def rows(self, response):
+        body = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return [json.loads(line) for line in body.decode().splitlines()]
+
+    def test_ndjson(self):
+        response = self.export()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = self.rows(response)
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[1]['assignee_email'], 'owner@example.com')
+        self.assertIsNone(rows[0]['assignee_id'])
+        self.assertEqual(rows[0]['description'], 'Line one\nLine "two", three')
+
+    def test_csv(self):
+        response = self.export(format='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(lines)))
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[0]['description'], 'Line one\nLine "two", three')
+        self.assertEqual(rows[0]['assignee_email'], '')
+
+    def test_filters(self):
+        self.assertEqual(len(self.rows(self.export(status='done,todo'))), 5)
+        self.assertEqual(len(self.rows(self.export(assignee=str(self.user.id)))), 5)
+        self.assertEqual(len(self.rows(self.export(assignee='none', status='BACKLOG'))), 3)
+        today = Task.objects.first().created_at.date()
+        self.assertEqual(len(self.rows(self.export(created_after=today.isoformat()))), 10)
+        self.assertEqual(len(self.rows(self.export(created_before='2000-01-01T00:00:00Z'))), 0)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.export(token=False).status_code, 401)
+        self.assertEqual(self.export(format='xml').status_code, 400)
+        self.assertEqual(self.export(status='LATER').status_code, 400)
+        self.assertEqual(self.export(project='nope').status_code, 400)
+        self.assertEqual(self.export(created_after='yesterday').status_code, 400)
+
+    @override_settings(GRAPHENE={'EXPORT_CHUNK_SIZE': 3})
+    def test_gzip_and_chunked_reads(self):
+        response = self.export(headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(self.rows(response)), 10)
+
+    def test_async_streaming(self):
+        async def export():
+            response = await AsyncClient().get(
+                '/export/tasks', {'project': str(self.project.id), 'format': 'csv'},
+                headers={'Authorization': f'JWT {get_token(self.user)}'},
+            )
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        rows = list(csv.DictReader(StringIO(async_to_sync(export)().decode())))
+        self.assertEqual(len(rows), 10)
+
+
+class ImportTasksTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        cls.project = Project.objects.create(name='Board', owner=cls.user)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def run_import(self, name, content, *args):
+        path = self.directory / name
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8') as f:
+            f.write(content)
+        out = StringIO()
+        call_command('import_tasks', str(path), *args, stdout=out)
+        return out.getvalue()
+
+    def test_ndjson_with_new_projects_and_users(self):
+        rows = [
+            {'title': 'Fix login', 'project': 'Board', 'status': 'done', 'assignee_email': 'owner@EXAMPLE.com'},
+            {'title': 'Write docs', 'project': 'Imported', 'priority': 'Urgent', 'assignee': 'new@example.com'},
+            {'title': 'Ship it', 'project': 'Imported', 'created_at': '2020-05-01T10:00:00Z'},
+        ]
+        output = self.run_import(
+            'tasks.ndjson.gz', ''.join(json.dumps(row) + '\n' for row in rows),
+            '--owner', 'owner@example.com', '--create-projects', '--create-users', '--batch-size', '2',
+        )
+        self.assertIn('Imported 3 tasks', output)
+        self.assertIn('created 1 projects and 1 users', output)
+
+        imported = Project.objects.get(name='Imported')
+        self.assertEqual(imported.owner, self.user)
+        task = Task.objects.get(title='Write docs')
+        self.assertEqual((task.priority, task.assignee.email), ('URGENT', 'new@example.com'))
+        self.assertFalse(task.assignee.has_usable_password())
+        self.assertEqual(Task.objects.get(title='Ship it').created_at.year, 2020)
+        self.assertEqual(Task.objects.get(title='Fix login').assignee, self.user)
+        # counters follow, for existing and new projects
+        self.assertEqual(ProjectTaskStats.objects.get(project=self.project).done, 1)
+        self.assertEqual(ProjectTaskStats.objects.get(project=imported).backlog, 2)
+
+    def test_rejected_rows_are_counted_and_written(self):
+        existing = Task.objects.create(title='Existing', project=self.project)
+        content = (
+            'title,project_id,status,id\n'
+            f'Good,{self.project.id},TODO,\n'
+            f',{self.project.id},TODO,\n'
+            f'Bad status,{self.project.id},LATER,\n'
+            'No project,00000000-0000-0000-0000-000000000000,TODO,\n'
+            f'Duplicate,{self.project.id},TODO,{existing.id}\n'
+        )
+        rejects = self.directory / 'rejects.ndjson'
+        output = self.run_import('tasks.csv', content, '--rejects', str(rejects))
+        self.assertIn('Imported 1 tasks', output)
+        self.assertIn('rejected 4 rows', output)
+        lines = [json.loads(line) for line in rejects.read_text().splitlines()]
+        self.assertEqual(
+            [(line['line'], line['error']) for line in lines],
+            [(3, 'no title'), (4, "unknown status 'LATER'"), (5, 'unknown project'),
+             (6, 'id already exists')],
+        )
+        self.assertEqual(ProjectTaskStats.objects.get(project=self.project).todo, 1)
+
+    def test_ranks_stay_short_over_many_batches(self):
+        content = ''.join(
+            json.dumps({'title': f'Task {i}', 'project_id': str(self.project.id)}) + '\n' for i in range(1000)
+        )
+        self.run_import('tasks.ndjson', content, '--batch-size', '10')
+        titles = list(Task.objects.order_by('rank').values_list('title', flat=True))
+        self.assertEqual(titles, [f'Task {i}' for i in range(1000)])
+        self.assertLessEqual(max(len(rank) for rank in Task.objects.values_list('rank', flat=True)), 3)
+
+    def test_assignees_and_owner_caches_are_invalidated(self):
+        rows = [
+            {'title': 'Fix login', 'project': 'Board', 'assignee_email': 'helper@example.com'},
+            {'title': 'Write docs', 'project': 'Imported'},
+        ]
+        helper = User.objects.create_user(email='helper@example.com', password='secret')
+        with mock.patch('apps.tasks.management.commands.import_tasks.invalidate') as invalidate:
+            self.run_import(
+                'tasks.ndjson', ''.join(json.dumps(row) + '\n' for row in rows),
+                '--owner', 'owner@example.com', '--create-projects',
+            )
+        scopes = set(invalidate.call_args.args)
+        self.assertLessEqual({user_scope(helper.id), user_scope(self.user.id)}, scopes)
+
+    def test_archived_ids_are_taken(self):
+        task = Task.objects.create(title='Archived', project=self.project, status=Task.Status.DONE)
+        ArchivedTask.objects.archive([task.id])
+        output = self.run_import('tasks.csv', f'title,project_id,id\nAgain,{self.project.id},{task.id}\n')
+        self.assertIn('rejected 1 rows', output)
+        self.assertIn('id already exists', output)
+        self.assertFalse(Task.objects.exists())
+
+    def test_export_round_trip(self):
+        Task.objects.create(title='Exported', description='a, "b"', project=self.project,
+                            assignee=self.user, status=Task.Status.DOING)
+        response = self.client.get(
+            '/export/tasks', {'project': str(self.project.id), 'format': 'csv'},
+            headers={'Authorization': f'JWT {get_token(self.user)}'},
+        )
+        exported = b''.join(response.streaming_content).decode()
+        Task.objects.all().delete()
+
+        self.run_import('export.csv', exported)
+        task = Task.objects.get()
+        self.assertEqual(
+            (task.title, task.description, task.status, task.assignee),
+            ('Exported', 'a, "b"', 'DOING', self.user),
+        )
+
+
+class ArchivedTaskTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        cls.project = Project.objects.create(name='Board', owner=cls.user)
+
+    def setUp(self):
+        self.tasks = [
+            Task.objects.create(title=f'Task {i}', project=self.project, assignee=self.user,
+                                status=status)
+            for i, status in enumerate(['DONE', 'TODO', 'DONE', 'DONE', 'DOING'])
+        ]
+        # all but the last finished task were done long ago
+        Task.objects.filter(id__in=[self.tasks[i].id for i in (0, 1, 2)]).update(
+            updated_at=timezone.now() - timedelta(days=60)
+        )
+        ProjectTaskStats.objects.recount()
+        out = StringIO()
+        call_command('archive_tasks', '--chunk-size', '1', stdout=out)
+        self.assertIn('Archived 2 tasks', out.getvalue())
+
+    def titles(self, query, **variables):
+        result, _ = capture_sql(query, user=self.user, variables=variables)
+        self.assertIsNone(result.errors)
+        return result.data
+
+    def test_archive_moves_old_finished_tasks(self):
+        self.assertEqual(
+            set(ArchivedTask.objects.values_list('title', flat=True)), {'Task 0', 'Task 2'}
+        )
+        self.assertEqual(Task.objects.count(), 3)
+        archived = ArchivedTask.objects.get(title='Task 0')
+        self.assertEqual((archived.id, archived.created_at), (self.tasks[0].id, self.tasks[0].created_at))
+        # archived tasks still count, before and after a recount
+        self.assertEqual(ProjectTaskStats.objects.get(project=self.project).done, 3)
+        self.assertEqual(ProjectTaskStats.objects.recount(), 0)
+
+    def test_include_archived_merges_pages(self):
+        query = (
+            'query($project: UUID!, $after: String) { tasksByProject(projectId: $project, '
+            'first: 2, after: $after, includeArchived: true) { edges { node { title archived '
+            'project { name } } } pageInfo { endCursor hasNextPage } } }'
+        )
+        titles, after = [], None
+        while True:
+            page = self.titles(query, project=str(self.project.id), after=after)['tasksByProject']
+            titles += [(edge['node']['title'], edge['node']['archived']) for edge in page['edges']]
+            self.assertEqual({edge['node']['project']['name'] for edge in page['edges']}, {'Board'})
+            if not page['pageInfo']['hasNextPage']:
+                break
+            after = page['pageInfo']['endCursor']
+        self.assertEqual(titles, [
+            ('Task 4', False), ('Task 3', False), ('Task 2', True), ('Task 1', False), ('Task 0', True),
+        ])
+
+        live = self.titles('{ allTasks { edges { node { title } } } }')['allTasks']['edges']
+        self.assertEqual(len(live), 3)
+        task = self.titles(
+            'query($id: UUID!) { a: task(id: $id) { title } b: task(id: $id, includeArchived: true) '
+            '{ title archived } }',
+            id=str(self.tasks[0].id),
+        )
+        self.assertEqual(task, {'a': None, 'b': {'title': 'Task 0', 'archived': True}})
+
+    def test_update_task_restores_archived_task(self):
+        result, _ = capture_sql(
+            'mutation($id: UUID!) { updateTask(id: $id, status: TODO) { success task { status archived } } }',
+            user=self.user, variables={'id': str(self.tasks[0].id)},
+        )
+        self.assertEqual(result.data['updateTask']['task'], {'status': 'TODO', 'archived': False})
+        self.assertFalse(ArchivedTask.objects.filter(id=self.tasks[0].id).exists())
+        restored = Task.objects.get(id=self.tasks[0].id)
+        self.assertEqual((restored.title, restored.created_at), ('Task 0', self.tasks[0].created_at))
+        stats = ProjectTaskStats.objects.get(project=self.project)
+        self.assertEqual((stats.todo, stats.done), (2, 2))
+
+        capture_sql(
+            'mutation($id: UUID!) { deleteTask(id: $id) { success } }',
+            user=self.user, variables={'id': str(self.tasks[2].id)},
+        )
+        self.assertFalse(ArchivedTask.objects.exists())
+        self.assertEqual(ProjectTaskStats.objects.recount(), 0)
+
+
+class MoveTaskTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='secret')
+        cls.project = Project.objects.create(name='Board', owner=cls.user)
+
+    def setUp(self):
+        self.tasks = []
+        for i in range(4):
+            result, _ = capture_sql(
+                'mutation($project: UUID!, $title: String!) { createTask(projectId: $project, '
+                'title: $title) { task { id } } }',
+                user=self.user, variables={'project': str(self.project.id), 'title': f'Task {i}'},
+            )
+            self.tasks.append(result.data['createTask']['task']['id'])
+
+    def column(self, status='BACKLOG'):
+        result, _ = capture_sql(
+            'query($project: UUID!, $status: TaskStatusEnum!) { boardColumn(projectId: $project, '
+            'status: $status) { edges { node { title } } } }',
+            user=self.user, variables={'project': str(self.project.id), 'status': status},
+        )
+        self.assertIsNone(result.errors)
+        return [edge['node']['title'] for edge in result.data['boardColumn']['edges']]
+
+    def move(self, id, **variables):
+        result, queries = capture_sql(
+            'mutation($id: UUID!, $status: TaskStatusEnum, $before: UUID, $after: UUID) { '
+            'moveTask(id: $id, status: $status, beforeId: $before, afterId: $after) '
+            '{ success message task { status rank } } }',
+            user=self.user, variables={'id': id, **variables},
+        )
+        self.assertIsNone(result.errors)
+        return result.data['moveTask'], queries
+
+    def test_move_writes_only_the_moved_task(self):
+        self.assertEqual(self.column(), ['Task 0', 'Task 1', 'Task 2', 'Task 3'])
+        moved, queries = self.move(self.tasks[3], after=self.tasks[0], before=self.tasks[1])
+        self.assertTrue(moved['success'])
+        updates = [sql for sql in queries if sql.startswith('UPDATE "tasks_task"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.column(), ['Task 0', 'Task 3', 'Task 1', 'Task 2'])
+
+        # one neighbour is enough; none moves the task to the bottom
+        self.move(self.tasks[2], before=self.tasks[0])
+        self.move(self.tasks[0])
+        self.assertEqual(self.column(), ['Task 2', 'Task 3', 'Task 1', 'Task 0'])
+
+    def test_move_to_another_column(self):
+        moved, _ = self.move(self.tasks[1], status='DOING')
+        self.assertEqual(moved['task']['status'], 'DOING')
+        self.move(self.tasks[2], status='DOING', before=self.tasks[1])
+        self.assertEqual(self.column('DOING'), ['Task 2', 'Task 1'])
+        self.assertEqual(self.column(), ['Task 0', 'Task 3'])
+        stats = ProjectTaskStats.objects.get(project=self.project)
+        self.assertEqual((stats.backlog, stats.doing), (2, 2))
+
+        moved, _ = self.move(self.tasks[0], before=self.tasks[1])
+        self.assertEqual(
+            (moved['success'], moved['message']), (False, 'beforeId is not a task of the target column')
+        )
+        moved, _ = self.move(self.tasks[0], after=self.tasks[3], before=self.tasks[0])
+        self.assertEqual(moved['message'], 'A task cannot be placed next to itself')
+
+    def test_status_changes_go_to_the_bottom_of_the_column(self):
+        self.move(self.tasks[3], status='DOING')
+        result, _ = capture_sql(
+            'mutation($id: UUID!) { updateTask(id: $id, status: DOING) { success } }',
+            user=self.user, variables={'id': self.tasks[0]},
+        )
+        self.assertTrue(result.data['updateTask']['success'])
+        result, _ = capture_sql(
+            'mutation($ids: [UUID!]!) { bulkUpdateTasks(ids: $ids, status: DOING) { success } }',
+            user=self.user, variables={'ids': [self.tasks[2], self.tasks[3], self.tasks[1]]},
+        )
+        self.assertTrue(result.data['bulkUpdateTasks']['success'])
+        self.assertEqual(self.column('DOING'), ['Task 3', 'Task 0', 'Task 2', 'Task 1'])
+
+    def test_appends_keep_ranks_short(self):
+        for i in range(4, 450):
+            Task.objects.create(
+                title=f'Task {i}', project=self.project,
+                rank=Task.objects.bottom_ranks(self.project.id, 'BACKLOG', 1)[0],
+            )
+        titles = list(Task.objects.order_by('rank').values_list('title', flat=True))
+        self.assertEqual(titles, [f'Task {i}' for i in range(450)])
+        self.assertLessEqual(max(len(rank) for rank in Task.objects.values_list('rank', flat=True)), 3)
+
+    def test_append_after_an_overlong_key_rebalances(self):
+        Task.objects.filter(id=self.tasks[3]).update(rank='z' * 40)
+        result, _ = capture_sql(
+            'mutation($project: UUID!) { createTask(projectId: $project, title: "Task 4") '
+            '{ task { rank } } }',
+            user=self.user, variables={'project': str(self.project.id)},
+        )
+        self.assertLessEqual(len(result.data['createTask']['task']['rank']), 2)
+        self.assertEqual(self.column(), ['Task 0', 'Task 1', 'Task 2', 'Task 3', 'Task 4'])
+
+    def test_rebalance(self):
+        # tasks created outside the mutations have no rank yet
+        Task.objects.filter(id__in=self.tasks[1:3]).update(rank='')
+        moved, _ = self.move(self.tasks[0], after=self.tasks[1], before=self.tasks[2])
+        self.assertTrue(moved['success'])
+        self.assertEqual(self.column(), ['Task 1', 'Task 0', 'Task 2', 'Task 3'])
+        self.assertNotIn('', Task.objects.values_list('rank', flat=True))
+
+        moved, _ = self.move(self.tasks[3], after=self.tasks[2], before=self.tasks[1])
+        self.assertEqual((moved['success'], moved['message']), (False, 'afterId must come before beforeId'))
+
+        Task.objects.filter(id=self.tasks[3]).update(rank='z' * 30)
+        out = StringIO()
+        call_command('rebalance_task_ranks', stdout=out)
+        self.assertIn('Rebalanced 1 column(s), 4 tasks', out.getvalue())
+        self.assertEqual(self.column(), ['Task 1', 'Task 0', 'Task 2', 'Task 3'])
+        self.assertLessEqual(max(len(rank) for rank in Task.objects.values_list('rank', flat=True)), 1)
+
+
+class TaskHistoryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(email='owner@example.com', password='secret')
+        cls.helper = User.objects.create_user(email='helper@example.com', password='secret')
+        cls.project = Project.objects.create(name='Board', owner=cls.user)
+
+    def setUp(self):
+        self.task = Task.objects.create(title='Draft', project=self.project, priority='HIGH')
+        ProjectTaskStats.objects.recount()
+        self.addCleanup(history.buffer.take)
+
+    def update(self, **changes):
+        arguments = ', '.join(f'{name}: ${name}' for name in changes)
+        types = ''.join(f', ${name}: {kind}' for name, (kind, _) in changes.items())
+        with self.captureOnCommitCallbacks(execute=True):
+            result, _ = capture_sql(
+                f'mutation($id: UUID!{types}) {{ updateTask(id: $id, {arguments}) {{ success }} }}',
+                user=self.user,
+                variables={'id': str(self.task.id), **{name: value for name, (_, value) in changes.items()}},
+            )
+        self.assertTrue(result.data['updateTask']['success'])
+
+    def events(self, query, **variables):
+        result, _ = capture_sql(query, user=self.user, variables=variables)
+        self.assertIsNone(result.errors)
+        return result.data
+
+    def test_changes_are_buffered_then_written_in_one_insert(self):
+        self.update(title=('String', 'Final'), priority=('TaskPriorityEnum', 'HIGH'))
+        self.update(status=('TaskStatusEnum', 'DONE'), assigneeId=('UUID', str(self.helper.id)))
+        # an unchanged priority is not an event
+        self.assertEqual(len(history.buffer), 3)
+        self.assertFalse(TaskEvent.objects.exists())
+
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(history.flush(), 3)
+        self.assertEqual(len(captured), 1)
+
+        query = (
+            'query($task: UUID!, $after: String) { taskHistory(taskId: $task, first: 2, after: $after) '
+            '{ edges { node { field oldValue newValue actor { email } } } pageInfo { endCursor } } }'
+        )
+        page = self.events(query, task=str(self.task.id))['taskHistory']
+        after = page['pageInfo']['endCursor']
+        page = page['edges'] + self.events(query, task=str(self.task.id), after=after)['taskHistory']['edges']
+        # newest first; the fields of one change share its time
+        self.assertEqual(page[-1]['node']['field'], 'title')
+        self.assertCountEqual([edge['node'] for edge in page], [
+            {'field': 'status', 'oldValue': 'BACKLOG', 'newValue': 'DONE', 'actor': {'email': 'owner@example.com'}},
+            {'field': 'assignee', 'oldValue': None, 'newValue': str(self.helper.id),
+             'actor': {'email': 'owner@example.com'}},
+            {'field': 'title', 'oldValue': 'Draft', 'newValue': 'Final', 'actor': {'email': 'owner@example.com'}},
+        ])
+        activity = self.events(
+            'query($project: UUID!) { projectActivity(projectId: $project) { edges { node { taskId } } } }',
+            project=str(self.project.id),
+        )['projectActivity']['edges']
+        self.assertEqual(len(activity), 3)
+
+    @override_settings(GRAPHENE={**settings.GRAPHENE, 'TASK_HISTORY_BUFFER_SIZE': 2})
+    def test_flush_thresholds(self):
+        self.update(title=('String', 'Final'))
+        self.assertEqual(len(history.buffer), 1)
+        # not due yet at the end of a request
+        history.flush_due()
+        self.assertEqual(len(history.buffer), 1)
+        self.update(title=('String', 'Again'))
+        self.assertEqual(len(history.buffer), 0)
+        self.assertEqual(TaskEvent.objects.count(), 2)
+
+        self.update(title=('String', 'Late'))
+        with override_settings(GRAPHENE={**settings.GRAPHENE, 'TASK_HISTORY_FLUSH_SECONDS': 0}):
+            history.flush_due()
+        self.assertEqual(TaskEvent.objects.count(), 3)
+
+    def test_admin_changes_and_purge(self):
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/admin/tasks/task/{self.task.id}/change/', {
+                'title': 'Draft', 'description': 'Details', 'status': 'TODO', 'priority': 'HIGH',
+                'project': str(self.project.id), 'assignee': '',
+            })
+        self.assertEqual(response.status_code, 302)
+        history.flush()
+        self.assertEqual(
+            set(TaskEvent.objects.values_list('field', 'old_value', 'new_value', 'actor_id')),
+            {('description', '', 'Details', self.user.id), ('status', 'BACKLOG', 'TODO', self.user.id)},
+        )
+
+        # deleting the project hides its history, and the purge removes it
+        deletion = soft_delete(Project.objects.filter(id=self.project.id))[0].deletion
+        self.assertFalse(TaskEvent.objects.exists())
+        purge(deletion)
+        self.assertFalse(TaskEvent._base_manager.exists())
+        self.assertEqual(ProjectDeletion.objects.get().tasks_deleted, 1)
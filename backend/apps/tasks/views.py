@@ -1,3 +1,57 @@
-from django.shortcuts import render
+from asgiref.sync import sync_to_async
+from django.contrib.auth import authenticate
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from graphql_jwt.exceptions import JSONWebTokenError
 
-# Create your views here.
+from .export import FORMATS, ExportError, export_tasks, filter_tasks, include_archived
+from .models import ArchivedTask
+
+
+async def _aiterate(chunks):
+    # ASGI responses would otherwise read a sync iterator into a list first;
+    # every step runs in the thread that holds the database connection
+    step = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await step(chunks, None)) is not None:
+        yield chunk
+
+
+def export_view(request):
+    """
+    ``GET /export/tasks?project=<id>&format=ndjson|csv`` streams a project's
+    tasks; see ``apps.tasks.export.filter_tasks`` for the filters. With
+    ``include_archived=true`` archived tasks follow the live ones. Requires
+    ``Authorization: JWT <token>``. The body is gzipped when the client
+    accepts it.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    try:
+        user = authenticate(request=request)
+    except JSONWebTokenError:
+        user = None
+    if user is None:
+        return HttpResponse('Authentication required', status=401)
+
+    format = request.GET.get('format', 'ndjson')
+    if format not in FORMATS:
+        return HttpResponseBadRequest(f'format must be one of: {", ".join(FORMATS)}')
+    try:
+        querysets = [filter_tasks(request.GET)]
+        if include_archived(request.GET):
+            querysets.append(filter_tasks(request.GET, ArchivedTask))
+    except ExportError as e:
+        return HttpResponseBadRequest(str(e))
+
+    compress = 'gzip' in request.headers.get('Accept-Encoding', '')
+    chunks = export_tasks(querysets, format, compress)
+    response = StreamingHttpResponse(
+        _aiterate(chunks) if isinstance(request, ASGIRequest) else chunks,
+        content_type=f'{FORMATS[format]}; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="tasks.{format}"'
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
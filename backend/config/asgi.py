@@ -13,4 +13,19 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+# under ASGI, /graphql/ runs queries on the event loop (AsyncGraphQLView)
+os.environ.setdefault('GRAPHQL_ASYNC_VIEW', 'true')
+
+django_application = get_asgi_application()
+
+from apps.core.websocket import GraphQLWebSocketApp  # noqa: E402  (needs the app registry)
+
+websocket_application = GraphQLWebSocketApp()
+
+
+async def application(scope, receive, send):
+    # subscriptions arrive as WebSocket connections; everything else is Django
+    if scope['type'] == 'websocket':
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
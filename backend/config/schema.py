@@ -1,14 +1,24 @@
 import graphene
 
 from apps.accounts.schema import Query as AccountsQuery, Mutation as AccountsMutation
-from apps.projects.schema import Query as ProjectsQuery, Mutation as ProjectsMutation
-from apps.tasks.schema import Query as TasksQuery, Mutation as TasksMutation
+from apps.projects.schema import (
+    Query as ProjectsQuery,
+    Mutation as ProjectsMutation,
+    Subscription as ProjectsSubscription,
+)
+from apps.search.schema import Query as SearchQuery
+from apps.tasks.schema import (
+    Query as TasksQuery,
+    Mutation as TasksMutation,
+    Subscription as TasksSubscription,
+)
 
 
 class Query(
     AccountsQuery,
     ProjectsQuery,
     TasksQuery,
+    SearchQuery,
     graphene.ObjectType
 ):
     pass
@@ -23,4 +33,12 @@ class Mutation(
     pass
 
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
+class Subscription(
+    ProjectsSubscription,
+    TasksSubscription,
+    graphene.ObjectType
+):
+    pass
+
+
+schema = graphene.Schema(query=Query, mutation=Mutation, subscription=Subscription)
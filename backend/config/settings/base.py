@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -22,9 +23,11 @@ INSTALLED_APPS = [
     'graphql_jwt.refresh_token.apps.RefreshTokenConfig',
     
     # local apps
+    'apps.core',
     'apps.accounts',
     'apps.projects',
     'apps.tasks',
+    'apps.search',
 ]
 
 MIDDLEWARE = [
@@ -91,12 +94,80 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # custom user model
 AUTH_USER_MODEL = 'accounts.User'
 
+# GraphQL queries may read from GRAPHENE['DATABASE_REPLICAS']; see apps/core/routing.py
+DATABASE_ROUTERS = ['apps.core.routing.ReplicaRouter']
+
+# cache (per-process; production overrides with a shared backend)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 # graphql configuration
 GRAPHENE = {
     'SCHEMA': 'config.schema.schema',
     'MIDDLEWARE': [
+        # outermost, so resolver timings include lazy JWT authentication
+        'apps.core.tracing.TracingMiddleware',
         'graphql_jwt.middleware.JSONWebTokenMiddleware',
     ],
+    # parsed + validated documents kept in memory, per process
+    'DOCUMENT_CACHE_SIZE': 512,
+    # automatic persisted queries; hashes are stored in this cache alias
+    'PERSISTED_QUERIES': True,
+    'PERSISTED_QUERIES_CACHE': 'default',
+    # seconds a registered query is kept, and the longest text registered
+    'PERSISTED_QUERIES_TIMEOUT': 86400,
+    'PERSISTED_QUERY_MAX_LENGTH': 20000,
+    # cached read responses, invalidated by version bumps from writes
+    'RESPONSE_CACHE': True,
+    'RESPONSE_CACHE_ALIAS': 'default',
+    'RESPONSE_CACHE_TIMEOUT': 300,
+    # max items per bulkCreateTasks / bulkUpdateTasks / bulkDeleteTasks call
+    'BULK_MUTATION_LIMIT': 1000,
+    # serve /graphql/ with the async view; config/asgi.py turns this on
+    'ASYNC_VIEW': os.environ.get('GRAPHQL_ASYNC_VIEW', '').lower() in ('1', 'true'),
+    # operations over these limits are rejected before execution; see
+    # apps/core/cost.py for how cost is estimated
+    'QUERY_MAX_DEPTH': 10,
+    'QUERY_MAX_COST': 5000,
+    # assumed length of list fields without first/last arguments
+    'QUERY_LIST_SIZE': 10,
+    # resolver / SQL / latency histograms served on /metrics
+    'METRICS': True,
+    # when set, /metrics requires "Authorization: Bearer <token>"
+    'METRICS_TOKEN': os.environ.get('METRICS_TOKEN'),
+    # add a per-operation timing summary to responses (extensions.tracing)
+    'TRACING_EXTENSION': False,
+    # fan-out for subscriptions; the in-memory layer only reaches this process
+    'CHANNEL_LAYER': {
+        'BACKEND': 'apps.core.pubsub.InMemoryChannelLayer',
+    },
+    # seconds a WebSocket may stay open without sending connection_init
+    'WEBSOCKET_INIT_TIMEOUT': 3,
+    # verified JWT payloads kept in memory per process, until the token expires
+    'AUTH_TOKEN_CACHE_SIZE': 1024,
+    # ... or for at most this many seconds (tokens without "exp" included)
+    'AUTH_TOKEN_CACHE_TIMEOUT': 300,
+    # seconds a user resolved from a JWT stays in the default cache; saving or
+    # deleting the user drops it sooner (0 turns the cache off)
+    'AUTH_USER_CACHE_TIMEOUT': 300,
+    # database aliases that serve GraphQL queries; writes use 'default'
+    'DATABASE_REPLICAS': [],
+    # seconds a viewer's queries stay on the primary after their mutation;
+    # should exceed the replicas' usual lag
+    'REPLICA_PIN_SECONDS': 5,
+    # rows fetched per round trip by /export/tasks
+    'EXPORT_CHUNK_SIZE': 2000,
+    # rebalance_task_ranks respaces board columns with longer rank keys
+    'RANK_REBALANCE_LENGTH': 16,
+    # task history (apps/tasks/history.py): events are buffered per process and
+    # inserted once this many are waiting, or at the end of a request once
+    # the oldest has waited this many seconds
+    'TASK_HISTORY': True,
+    'TASK_HISTORY_BUFFER_SIZE': 500,
+    'TASK_HISTORY_FLUSH_SECONDS': 1.0,
 }
 
 
@@ -114,4 +185,7 @@ GRAPHQL_JWT = {
     'JWT_REFRESH_EXPIRATION_DELTA': timedelta(days=7),
     'JWT_ALLOW_REFRESH': True,
     'JWT_LONG_RUNNING_REFRESH_TOKEN': True,
+    # cached token verification and user lookup, see apps/accounts/auth.py
+    'JWT_DECODE_HANDLER': 'apps.accounts.auth.decode_token',
+    'JWT_GET_USER_BY_NATURAL_KEY_HANDLER': 'apps.accounts.auth.get_user_by_natural_key',
 }
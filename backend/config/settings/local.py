@@ -25,3 +25,4 @@ CORS_ALLOWED_ORIGINS = [
 CORS_ALLOW_CREDENTIALS = True
 
 GRAPHENE['GRAPHIQL'] = True
+GRAPHENE['TRACING_EXTENSION'] = True
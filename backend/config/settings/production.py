@@ -1,4 +1,7 @@
 import os
+
+from django.core.exceptions import ImproperlyConfigured
+
 from .base import *
 
 
@@ -25,6 +28,67 @@ DATABASES = {
     }
 }
 
+# Connection pooling (psycopg_pool, one pool per worker process). Requests
+# borrow a connection and hand it back when they finish, under WSGI and
+# ASGI alike, instead of connecting (and negotiating TLS) every time.
+# DB_POOL=false keeps one persistent connection per thread instead, e.g.
+# behind PgBouncer.
+if os.environ.get('DB_POOL', 'true').lower() in ('1', 'true'):
+    from psycopg_pool import ConnectionPool
+
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 4))
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            # connections kept open
+            'min_size': DB_POOL_SIZE,
+            # extra connections opened under load, closed after max_idle
+            'max_size': DB_POOL_SIZE + int(os.environ.get('DB_POOL_OVERFLOW', 6)),
+            # seconds a request waits for a connection before failing
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'max_idle': 300,
+            # connections are replaced after this many seconds
+            'max_lifetime': 1800,
+            # checked on checkout; broken connections are replaced, not handed out
+            'check': ConnectionPool.check_connection,
+        },
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Read replicas for GraphQL queries: DB_REPLICA_HOSTS=host1,host2 (same
+# name, user and password as the primary). Each one gets its own pool.
+REPLICA_HOSTS = [host for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host]
+for index, host in enumerate(REPLICA_HOSTS, start=1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'], 'HOST': host,
+        'OPTIONS': {**DATABASES['default'].get('OPTIONS', {})},
+    }
+GRAPHENE['DATABASE_REPLICAS'] = [f'replica{index}' for index in range(1, len(REPLICA_HOSTS) + 1)]
+
+# the response cache must be shared by all workers for invalidation to
+# reach them, so it is only enabled with a shared cache backend
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+    GRAPHENE['CHANNEL_LAYER'] = {
+        'BACKEND': 'apps.core.pubsub.RedisChannelLayer',
+        'OPTIONS': {'url': REDIS_URL},
+    }
+
+GRAPHENE['RESPONSE_CACHE'] = bool(REDIS_URL)
+
 CORS_ALLOWED_ORIGINS = os.environ.get('CORS_ORIGINS', '').split(',')
 
-GRAPHENE['GRAPHIQL'] = False
\ No newline at end of file
+GRAPHENE['GRAPHIQL'] = False
+
+# /metrics exposes operation names, timings and pool state, so it is never
+# served unauthenticated in production
+if not GRAPHENE['METRICS_TOKEN']:
+    raise ImproperlyConfigured('Set METRICS_TOKEN to protect the /metrics endpoint')
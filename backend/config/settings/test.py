@@ -0,0 +1,26 @@
+from .base import *
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['testserver', 'localhost', '127.0.0.1']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test.sqlite3',
+    },
+    # a second file standing in for a read replica; only the routing tests
+    # use it, replication is simulated by writing to both
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_replica.sqlite3',
+    },
+}
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
+
+# test databases are rolled back without sending delete signals, so a user
+# cached by one test could answer for a different row in the next
+GRAPHENE['AUTH_USER_CACHE_TIMEOUT'] = 0
@@ -1,12 +1,23 @@
 from django.contrib import admin
 from django.urls import path
-from graphene_django.views import GraphQLView
 from django.views.decorators.csrf import csrf_exempt
 
+from apps.core.conf import graphene_setting
+from apps.core.views import AsyncGraphQLView, GraphQLView, metrics_view
+from apps.tasks.views import export_view
+
+graphql_view = AsyncGraphQLView if graphene_setting('ASYNC_VIEW', False) else GraphQLView
+
 urlpatterns = [
     # Django admin interface
     path('admin/', admin.site.urls),
     
     # GraphQL endpoint
-    path('graphql/', csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    path('graphql/', csrf_exempt(graphql_view.as_view(graphiql=True))),
+    
+    # Streaming task export (NDJSON / CSV)
+    path('export/tasks', export_view),
+    
+    # Prometheus metrics (per process)
+    path('metrics', metrics_view),
 ]
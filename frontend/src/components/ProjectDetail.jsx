@@ -1,13 +1,43 @@
-import { useState } from 'react';
+import { useEffect, useState } from 'react';
 import { useQuery, useMutation } from '@apollo/client';
-import { GET_PROJECT, CREATE_TASK, UPDATE_TASK, DELETE_TASK, GET_USERS } from '../graphql/queries';
+import { GET_PROJECT, CREATE_TASK, UPDATE_TASK, DELETE_TASK, GET_USERS, TASK_CHANGED } from '../graphql/queries';
+
+// Apply one taskChanged event to the cached project instead of refetching it.
+const applyTaskChange = (prev, { subscriptionData }) => {
+    const change = subscriptionData.data?.taskChanged;
+    if (!change || !prev.project) return prev;
+
+    const { tasks: current } = prev.project;
+    let tasks;
+    if (change.action === 'DELETED') {
+        tasks = current.filter(task => task.id !== change.id);
+    } else if (current.some(task => task.id === change.id)) {
+        tasks = current.map(task => (task.id === change.id ? { ...task, ...change.task } : task));
+    } else {
+        tasks = [change.task, ...current];
+    }
+
+    return {
+        ...prev,
+        project: {
+            ...prev.project,
+            tasks,
+            taskCount: prev.project.taskCount + tasks.length - current.length,
+        },
+    };
+};
 
 export default function ProjectDetail({ projectId, onBack }) {
-    const { loading: projectLoading, error: projectError, data: projectData, refetch } = useQuery(GET_PROJECT, {
+    const { loading: projectLoading, error: projectError, data: projectData, refetch, subscribeToMore } = useQuery(GET_PROJECT, {
         variables: { id: projectId },
-        pollInterval: 5000,
     });
 
+    useEffect(() => subscribeToMore({
+        document: TASK_CHANGED,
+        variables: { projectId },
+        updateQuery: applyTaskChange,
+    }), [projectId, subscribeToMore]);
+
     const { data: userData } = useQuery(GET_USERS);
 
     const [createTask] = useMutation(CREATE_TASK, {
@@ -38,7 +68,7 @@ export default function ProjectDetail({ projectId, onBack }) {
     if (!projectData?.project) return <div className="error-screen">Project not found</div>;
 
     const { project } = projectData;
-    const users = userData?.users || [];
+    const users = userData?.users?.edges.map(edge => edge.node) || [];
 
     const handleCreateTask = (e) => {
         e.preventDefault();
@@ -29,13 +29,15 @@ export default function ProjectList({ onProjectSelect }) {
         });
     };
 
+    const projects = data?.allProjects?.edges.map(edge => edge.node) || [];
+
     if (loading) return <div className="loading-container"><div className="loading-spinner"></div><p>Loading projects...</p></div>;
     if (error) return <div className="error-container"><h3>Error</h3><p>{error.message}</p><button onClick={() => refetch()} className="retry-button">Try Again</button></div>;
 
     return (
         <div className="project-list">
             <div className="project-list-header">
-                <h2>📋 Projects ({data?.allProjects?.length || 0})</h2>
+                <h2>📋 Projects ({projects.length})</h2>
                 <div className="header-actions">
                     <button onClick={() => setShowCreateForm(true)} className="create-button">
                         + New Project
@@ -70,7 +72,7 @@ export default function ProjectList({ onProjectSelect }) {
                 </div>
             )}
 
-            {(!data?.allProjects?.length && !showCreateForm) ? (
+            {(!projects.length && !showCreateForm) ? (
                 <div className="empty-container">
                     <h3>📁 No Projects Yet</h3>
                     <p>Create your first project to get started!</p>
@@ -80,7 +82,7 @@ export default function ProjectList({ onProjectSelect }) {
                 </div>
             ) : (
                 <div className="project-grid">
-                    {data?.allProjects.map((project) => (
+                    {projects.map((project) => (
                         <div
                             key={project.id}
                             className="project-card"
@@ -16,12 +16,16 @@ export const GET_ME = gql`
 
 export const GET_USERS = gql`
   query GetUsers {
-    users {
-      id
-      email
-      firstName
-      lastName
-      fullName
+    users(first: 100) {
+      edges {
+        node {
+          id
+          email
+          firstName
+          lastName
+          fullName
+        }
+      }
     }
   }
 `;
@@ -80,18 +84,26 @@ export const REFRESH_TOKEN = gql`
 `;
 
 export const GET_ALL_PROJECTS = gql`
-  query GetAllProjects {
-    allProjects {
-      id
-      name
-      description
-      taskCount
-      createdAt
-      updatedAt
-      owner {
-        id
-        email
-        fullName
+  query GetAllProjects($first: Int, $after: String) {
+    allProjects(first: $first, after: $after) {
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      edges {
+        node {
+          id
+          name
+          description
+          taskCount
+          createdAt
+          updatedAt
+          owner {
+            id
+            email
+            fullName
+          }
+        }
       }
     }
   }
@@ -99,14 +111,22 @@ export const GET_ALL_PROJECTS = gql`
 
 
 export const GET_MY_PROJECTS = gql`
-  query GetMyProjects {
-    myProjects {
-      id
-      name
-      description
-      taskCount
-      createdAt
-      updatedAt
+  query GetMyProjects($first: Int, $after: String) {
+    myProjects(first: $first, after: $after) {
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      edges {
+        node {
+          id
+          name
+          description
+          taskCount
+          createdAt
+          updatedAt
+        }
+      }
     }
   }
 `;
@@ -140,6 +160,26 @@ export const GET_PROJECT = gql`
   }
 `;
 
+export const TASK_CHANGED = gql`
+  subscription TaskChanged($projectId: UUID!) {
+    taskChanged(projectId: $projectId) {
+      action
+      id
+      task {
+        id
+        title
+        status
+        priority
+        assignee {
+          id
+          email
+          fullName
+        }
+      }
+    }
+  }
+`;
+
 export const CREATE_PROJECT = gql`
   mutation CreateProject($name: String!, $description: String) {
     createProject(name: $name, description: $description) {
@@ -180,78 +220,110 @@ export const DELETE_PROJECT = gql`
 `;
 
 export const GET_ALL_TASKS = gql`
-  query GetAllTasks {
-    allTasks {
-      id
-      title
-      description
-      status
-      priority
-      createdAt
-      updatedAt
-      project {
-        id
-        name
+  query GetAllTasks($first: Int, $after: String) {
+    allTasks(first: $first, after: $after) {
+      pageInfo {
+        hasNextPage
+        endCursor
       }
-      assignee {
-        id
-        email
-        fullName
+      edges {
+        node {
+          id
+          title
+          description
+          status
+          priority
+          createdAt
+          updatedAt
+          project {
+            id
+            name
+          }
+          assignee {
+            id
+            email
+            fullName
+          }
+        }
       }
     }
   }
 `;
 
 export const GET_TASKS_BY_PROJECT = gql`
-  query GetTasksByProject($projectId: UUID!) {
-    tasksByProject(projectId: $projectId) {
-      id
-      title
-      description
-      status
-      priority
-      createdAt
-      updatedAt
-      assignee {
-        id
-        email
-        fullName
+  query GetTasksByProject($projectId: UUID!, $first: Int, $after: String) {
+    tasksByProject(projectId: $projectId, first: $first, after: $after) {
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      edges {
+        node {
+          id
+          title
+          description
+          status
+          priority
+          createdAt
+          updatedAt
+          assignee {
+            id
+            email
+            fullName
+          }
+        }
       }
     }
   }
 `;
 
 export const GET_TASKS_BY_STATUS = gql`
-  query GetTasksByStatus($status: TaskStatusEnum!) {
-    tasksByStatus(status: $status) {
-      id
-      title
-      description
-      priority
-      project {
-        id
-        name
+  query GetTasksByStatus($status: TaskStatusEnum!, $first: Int, $after: String) {
+    tasksByStatus(status: $status, first: $first, after: $after) {
+      pageInfo {
+        hasNextPage
+        endCursor
       }
-      assignee {
-        id
-        fullName
+      edges {
+        node {
+          id
+          title
+          description
+          priority
+          project {
+            id
+            name
+          }
+          assignee {
+            id
+            fullName
+          }
+        }
       }
     }
   }
 `;
 
 export const GET_MY_TASKS = gql`
-  query GetMyTasks {
-    myTasks {
-      id
-      title
-      description
-      status
-      priority
-      createdAt
-      project {
-        id
-        name
+  query GetMyTasks($first: Int, $after: String) {
+    myTasks(first: $first, after: $after) {
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      edges {
+        node {
+          id
+          title
+          description
+          status
+          priority
+          createdAt
+          project {
+            id
+            name
+          }
+        }
       }
     }
   }
@@ -1,5 +1,21 @@
-import { ApolloClient, InMemoryCache, createHttpLink } from '@apollo/client';
+import { ApolloClient, InMemoryCache, createHttpLink, split } from '@apollo/client';
 import { setContext } from '@apollo/client/link/context';
+import { createPersistedQueryLink } from '@apollo/client/link/persisted-queries';
+import { GraphQLWsLink } from '@apollo/client/link/subscriptions';
+import { getMainDefinition } from '@apollo/client/utilities';
+import { createClient } from 'graphql-ws';
+
+const sha256 = async (query) => {
+    const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(query));
+    return Array.from(new Uint8Array(digest))
+        .map((byte) => byte.toString(16).padStart(2, '0'))
+        .join('');
+};
+
+// Send query hashes instead of full documents; the server asks for the
+// text once per hash and caches it.
+const persistedQueryLink = createPersistedQueryLink({ sha256 });
+
 const httpLink = createHttpLink({
     uri: import.meta.env.VITE_API_URL || '/graphql/',
 });
@@ -14,8 +30,31 @@ const authLink = setContext((_, { headers }) => {
     };
 });
 
+// Subscriptions go over a WebSocket to the same /graphql/ path (served by
+// the ASGI app); the token is sent once when the connection opens.
+const wsUrl = () => {
+    if (import.meta.env.VITE_WS_URL) return import.meta.env.VITE_WS_URL;
+    const url = new URL(import.meta.env.VITE_API_URL || '/graphql/', window.location.href);
+    url.protocol = url.protocol === 'https:' ? 'wss:' : 'ws:';
+    return url.toString();
+};
+
+const wsLink = new GraphQLWsLink(createClient({
+    url: wsUrl,
+    lazy: true,
+    connectionParams: () => {
+        const token = localStorage.getItem('jira-mini-token');
+        return token ? { authorization: `JWT ${token}` } : {};
+    },
+}));
+
+const isSubscription = ({ query }) => {
+    const definition = getMainDefinition(query);
+    return definition.kind === 'OperationDefinition' && definition.operation === 'subscription';
+};
+
 const client = new ApolloClient({
-    link: authLink.concat(httpLink),
+    link: split(isSubscription, wsLink, authLink.concat(persistedQueryLink).concat(httpLink)),
 
     cache: new InMemoryCache({
         typePolicies: {
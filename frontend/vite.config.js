@@ -17,6 +17,7 @@ export default defineConfig(({ mode }) => {
                 '/graphql': {
                     target: env.VITE_BACKEND_BASE_URL || 'http://localhost:8000',
                     changeOrigin: true,
+                    ws: true,
                 },
             },
         },